@@ -0,0 +1,219 @@
+"""
+Offline fixtures for agent benchmarks: scripted LLMs and a local HTTP server standing in for
+Google Custom Search, GOV.UK guidance pages, GOV.UK service search and the bank holidays JSON.
+
+Responses are deterministic: a page is generated from its path (or picked from a directory of
+saved GOV.UK pages), so every run of a scenario does exactly the same work.
+
+Example:
+    with FixtureServer() as server:
+        server.point_tools_at()
+        brain = ScriptedLLM(["Thought: ...\\nAction: search_govuk\\nAction Input: ...", "Final Answer: ..."])
+        react_agent(question, brain, prompt_template, tools)
+"""
+import asyncio
+import json
+import random
+import sys
+import threading
+import time
+import zlib
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.bench_bank_holidays import synthetic_bank_holidays
+from benchmarks.bench_html_extract import load_corpus, synthetic_page
+
+# Custom Search queries containing this word get a 403 error
+QUOTA_EXCEEDED_WORD = "quota"
+# result pages are named after the query: they are missing (404), or long, if it contains these words
+MISSING_PAGES_WORD = "missing"
+LONG_PAGES_WORD = "long"
+SHORT_PAGE_PARAGRAPHS = 12
+LONG_PAGE_PARAGRAPHS = 250
+SEARCH_RESULTS = 10
+
+
+class ScriptedLLM:
+    """
+    An LLM brain returning scripted completions in order, after an optional fixed latency.
+
+    Once the script is used up, the last completion is repeated.
+    """
+
+    def __init__(self, completions: list[str], latency: float = 0.0):
+        self.completions = completions
+        self.latency = latency
+        self.calls = 0
+        self.prompt_chars: list[int] = []
+
+    def __call__(self, prompt) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        self.prompt_chars.append(len(str(prompt)))
+        completion = self.completions[min(self.calls, len(self.completions) - 1)]
+        self.calls += 1
+        return completion
+
+
+class AsyncScriptedLLM:
+    """
+    An async LLM brain returning the scripted completion of the step the prompt is at.
+
+    The step is counted from the observations in the prompt, so one brain can serve many
+    concurrent runs, including runs resumed from a saved state. Waits with `asyncio.sleep`.
+    """
+
+    def __init__(self, completions: list[str], latency: float = 0.0):
+        self.completions = completions
+        self.latency = latency
+        self.calls = 0
+
+    async def __call__(self, prompt) -> str:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.calls += 1
+        step = str(prompt).count("\nObservation : ")
+        return self.completions[min(step, len(self.completions) - 1)]
+
+
+def _seed(text: str) -> int:
+    return zlib.crc32(text.encode("utf-8"))
+
+
+def _services_page(query: str) -> str:
+    items = "".join(
+        '<li class="gem-c-document-list__item">'
+        f'<a class="govuk-link" href="/service-{i}">{escape(query.title())} service {i}</a>'
+        f'<p class="gem-c-document-list__item-description">Apply online for {escape(query)} ({i}).</p>'
+        + (f'<ul><li class="gem-c-document-list-child"><a href="/service-{i}/eligibility">Eligibility</a><p>Who can apply</p></li></ul>' if i % 2 == 0 else "")
+        + "</li>"
+        for i in range(1, 11)
+    )
+    return f'<html><body><main><ul class="gem-c-document-list">{items}</ul></main></body></html>'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "FixtureServer"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        fixture = self.server
+        endpoint = url.path.split("/")[1]
+        with fixture.lock:
+            fixture.requests[endpoint] = fixture.requests.get(endpoint, 0) + 1
+        if url.path == "/customsearch/v1":
+            self._custom_search(query.get("q", [""])[0])
+        elif url.path == "/search/services":
+            self._send(200, _services_page(query.get("keywords", [""])[0]), "text/html; charset=utf-8")
+        elif url.path == "/bank-holidays.json":
+            self._send(200, fixture.bank_holidays_json, "application/json")
+        elif url.path.startswith("/guidance/"):
+            page = fixture.page(url.path)
+            if page is None:
+                self._send(404, "<html><body><h1>Page not found</h1></body></html>", "text/html; charset=utf-8")
+            else:
+                self._send(200, page, "text/html; charset=utf-8")
+        else:
+            self._send(404, "Not found", "text/plain")
+
+    def _custom_search(self, q: str) -> None:
+        if QUOTA_EXCEEDED_WORD in q:
+            self._send(403, json.dumps({"error": {"code": 403, "message": "Quota exceeded"}}), "application/json")
+            return
+        slug = "-".join(q.lower().split()) or "empty"
+        items = [
+            {"link": f"{self.server.base_url}/guidance/{slug}-{i}", "title": f"{q.title()} ({i}) - GOV.UK"}
+            for i in range(1, SEARCH_RESULTS + 1)
+        ]
+        self._send(200, json.dumps({"items": items}), "application/json")
+
+    def _send(self, status: int, body: str, content_type: str) -> None:
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureServer(ThreadingHTTPServer):
+    """
+    Local HTTP server with the endpoints the agent's tools call, run in a background thread.
+
+    - /customsearch/v1?q=...: Custom Search JSON, with links to /guidance/... pages
+    - /guidance/<slug>: a GOV.UK guidance page (long if the slug contains "long", 404 if "missing")
+    - /search/services?keywords=...: GOV.UK service search results
+    - /bank-holidays.json: bank holidays in the GOV.UK format
+    """
+
+    daemon_threads = True
+
+    def __init__(self, pages_dir: Optional[str] = None, bank_holidays_path: Optional[str] = None):
+        """
+        Args:
+            pages_dir: Directory of saved GOV.UK pages served for /guidance/... (synthetic pages if None)
+            bank_holidays_path: A saved copy of bank-holidays.json (synthetic data for 2015-2035 if None)
+        """
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.base_url = f"http://127.0.0.1:{self.server_port}"
+        self.saved_pages = list(load_corpus(pages_dir).values()) if pages_dir else []
+        if bank_holidays_path:
+            with open(bank_holidays_path, encoding="utf-8") as file:
+                self.bank_holidays_json = file.read()
+        else:
+            self.bank_holidays_json = json.dumps(synthetic_bank_holidays(2015, 2035))
+        self._pages: dict[str, Optional[str]] = {}
+        self.lock = threading.Lock()
+        self.requests: dict[str, int] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    def page(self, path: str) -> Optional[str]:
+        """The page served at `path`, generated once and then kept."""
+        with self.lock:
+            if path not in self._pages:
+                slug = path.rsplit("/", 1)[-1]
+                if MISSING_PAGES_WORD in slug:
+                    self._pages[path] = None
+                elif self.saved_pages:
+                    self._pages[path] = self.saved_pages[_seed(slug) % len(self.saved_pages)]
+                else:
+                    paragraphs = LONG_PAGE_PARAGRAPHS if LONG_PAGES_WORD in slug else SHORT_PAGE_PARAGRAPHS
+                    self._pages[path] = synthetic_page(random.Random(_seed(slug)), paragraphs)
+            return self._pages[path]
+
+    def handle_error(self, request, client_address) -> None:
+        # clients reading only the start of a page (see `utils._PageBody`) close the connection early
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def start(self) -> "FixtureServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def point_tools_at(self) -> None:
+        """Send the requests of `react_agents_from_scratch.tools` to this server."""
+        from react_agents_from_scratch import tools
+        tools.GOOGLE_CSE_URL = f"{self.base_url}/customsearch/v1"
+        tools.GOVUK_BASE_URL = self.base_url
+        # the server does not check them, but aiohttp refuses None query parameters
+        tools.GOOGLE_API_KEY = tools.GOOGLE_API_KEY or "fixture-key"
+        tools.GOOGLE_CSE_ID = tools.GOOGLE_CSE_ID or "fixture-cse"
+
+    def __enter__(self) -> "FixtureServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
@@ -0,0 +1,244 @@
+"""
+Benchmark: the whole agent loop, offline. `react_agent` runs with the real tools (Google search,
+page fetching and parsing with `parse_several_pages`, GOV.UK service search, bank holidays)
+against a local fixture server, with a scripted LLM in place of OpenAI, so that changes to the
+loop, the prompt buffer, the HTTP client or the page parser can be measured end to end.
+
+Scenarios:
+    short             one search, then the final answer
+    long_observation  a search returning long pages, a service search and a bank holidays query
+    max_iterations    a search at every step until max_iterations ends the run
+    error_path        a Custom Search error, pages that are missing and an invalid action
+
+Reports per scenario: latency percentiles of a run, iterations per second, peak traced
+allocations (tracemalloc) of a run, and the peak RSS of the process.
+
+Usage:
+    python -m benchmarks.bench_agent
+    python -m benchmarks.bench_agent --runs 50 --llm-latency 0.2
+    python -m benchmarks.bench_agent --pages path/to/saved/govuk/pages --bank-holidays-json bank-holidays.json
+    python -m benchmarks.bench_agent --save-baseline agent_baseline.json
+    python -m benchmarks.bench_agent --baseline agent_baseline.json --threshold 0.2   # exits with 1 on a regression
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from functools import partial
+from typing import Callable, Optional
+
+from benchmarks.agent_fixtures import FixtureServer, ScriptedLLM
+from react_agents_from_scratch import tools as agent_tools
+from react_agents_from_scratch.parse_executor import configure_parse_executor
+from react_agents_from_scratch.prompt_buffer import PromptBuffer
+from react_agents_from_scratch.react_agent_naive import format_react_loop, react_agent
+from react_agents_from_scratch.tool_cache import set_tool_cache
+from react_agents_from_scratch.utils import read_prompt_from_txt
+
+PROMPT = "react_agents_from_scratch/openai_react/prompts/react_agent_prompt.txt"
+# metrics compared with a baseline, all "lower is better"
+COMPARED_METRICS = ("p50_ms", "p90_ms", "peak_alloc_kb")
+
+
+def _step(thought: str, action: str, action_input: str) -> str:
+    return f"Thought: {thought}\nAction: {action}\nAction Input: {action_input}\n"
+
+
+def _final(answer: str) -> str:
+    return f"Thought: I now know the final answer.\nFinal Answer: {answer}"
+
+
+@dataclass
+class Scenario:
+    name: str
+    question: str
+    completions: list[str]
+    max_iterations: int
+    # checks the answer, the steps and their observations
+    check: Callable[[Optional[str], PromptBuffer], bool]
+
+
+def _observations(buffer: PromptBuffer) -> list[str]:
+    return [step.get('observation') or "" for step in buffer.steps]
+
+
+SCENARIOS = [
+    Scenario(
+        name="short",
+        question="How do I register for Self Assessment?",
+        completions=[
+            _step("I should search GOV.UK.", "search_govuk", "register for self assessment"),
+            _final("Register online with HMRC by 5 October."),
+        ],
+        max_iterations=5,
+        check=lambda answer, buffer: answer is not None and _observations(buffer)[0].count("Title:") == 3,
+    ),
+    Scenario(
+        name="long_observation",
+        question="Which childcare support can I get, and is 25 December 2026 a bank holiday?",
+        completions=[
+            _step("I should search GOV.UK.", "search_govuk", "long childcare support guidance"),
+            _step("I should look for the services.", "search_govuk_services", "childcare"),
+            _step("I should check the bank holidays.", "uk_bank_holidays", "Is 2026-12-25 a bank holiday?"),
+            _final("Tax-Free Childcare, and yes, it is Christmas Day."),
+        ],
+        max_iterations=6,
+        check=lambda answer, buffer: (
+            answer is not None
+            and len(_observations(buffer)[0]) > 20_000
+            and "Childcare service 1" in _observations(buffer)[1]
+            and "Christmas" in _observations(buffer)[2]
+        ),
+    ),
+    Scenario(
+        name="max_iterations",
+        question="What is the exact rule for something that is not on GOV.UK?",
+        completions=[_step("I should search again.", "search_govuk", f"obscure rule attempt {i}") for i in range(6)],
+        max_iterations=6,
+        check=lambda answer, buffer: answer is None and len(buffer.steps) == 6,
+    ),
+    Scenario(
+        name="error_path",
+        question="How do I apply for a passport?",
+        completions=[
+            _step("I should search GOV.UK.", "search_govuk", "passport quota"),
+            _step("The search failed, I will try again.", "search_govuk", "missing passport pages"),
+            _step("I will try another tool.", "search_passports", "apply"),
+            _final("Apply online on GOV.UK."),
+        ],
+        max_iterations=6,
+        check=lambda answer, buffer: (
+            answer is not None
+            and _observations(buffer)[0].startswith("Google Search error: 403")
+            and _observations(buffer)[1].count(agent_tools.MISSING_CONTENT_MARKER) == 3
+            and _observations(buffer)[2].startswith("Error: Invalid action")
+        ),
+    ),
+]
+
+
+def make_tools() -> dict:
+    return {
+        'search_govuk': partial(agent_tools.search_govuk, min_results=3),
+        'search_govuk_services': partial(agent_tools.search_govuk_services, page=1, top_n_results=6),
+        'uk_bank_holidays': agent_tools.uk_bank_holidays,
+        'ask_user': lambda question: "I don't know.",
+    }
+
+
+def run_scenario(scenario: Scenario, prompt_template: str, tools: dict, llm_latency: float) -> tuple[float, int, bool]:
+    """Run a scenario once; returns (seconds, iterations, whether the checks passed)."""
+    brain = ScriptedLLM(scenario.completions, latency=llm_latency)
+    buffer = PromptBuffer(prompt_template, scenario.question, format_step=format_react_loop)
+    # the agent prints its progress
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = react_agent(scenario.question, brain, prompt_template, tools, max_iterations=scenario.max_iterations, prompt_buffer=buffer)
+        elapsed = time.perf_counter() - start
+    answer = result[0] if result else None
+    return elapsed, len(buffer.steps), scenario.check(answer, buffer)
+
+
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def bench(prompt_template: str, runs: int, llm_latency: float) -> dict[str, dict]:
+    tools = make_tools()
+    results = {}
+    print(f"{'scenario':<18}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'mean ms':>9}{'iter/s':>9}{'alloc KB':>10}{'ok':>5}")
+    for scenario in SCENARIOS:
+        # warm-up: connections, the bank holiday calendar, the parse pool
+        run_scenario(scenario, prompt_template, tools, llm_latency)
+        times, iterations, ok = [], 0, True
+        for _ in range(runs):
+            elapsed, steps, passed = run_scenario(scenario, prompt_template, tools, llm_latency)
+            times.append(elapsed)
+            iterations += steps
+            ok = ok and passed
+        tracemalloc.start()
+        run_scenario(scenario, prompt_template, tools, llm_latency)
+        peak_alloc = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        results[scenario.name] = {
+            "p50_ms": _percentile(times, 0.5) * 1000,
+            "p90_ms": _percentile(times, 0.9) * 1000,
+            "p99_ms": _percentile(times, 0.99) * 1000,
+            "mean_ms": statistics.mean(times) * 1000,
+            "iterations_per_s": iterations / sum(times),
+            "peak_alloc_kb": peak_alloc / 1024,
+            "ok": ok,
+        }
+        r = results[scenario.name]
+        print(f"{scenario.name:<18}{r['p50_ms']:>9.1f}{r['p90_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['mean_ms']:>9.1f}"
+              f"{r['iterations_per_s']:>9.1f}{r['peak_alloc_kb']:>10.0f}{'yes' if ok else 'NO':>5}")
+    return results
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if platform.system() == "Darwin" else 1024)
+
+
+def compare(results: dict[str, dict], baseline: dict[str, dict], threshold: float) -> list[str]:
+    """The metrics more than `threshold` (a fraction) worse than in the baseline."""
+    regressions = []
+    for name, metrics in results.items():
+        if name not in baseline:
+            continue
+        for metric in COMPARED_METRICS:
+            before, after = baseline[name][metric], metrics[metric]
+            if before and after > before * (1 + threshold):
+                regressions.append(f"{name}.{metric}: {before:.1f} -> {after:.1f} (+{(after / before - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20, help="Timed runs per scenario")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds the scripted LLM takes per call")
+    parser.add_argument("--pages", help="Directory of saved GOV.UK .html pages to serve (synthetic pages if not given)")
+    parser.add_argument("--bank-holidays-json", help="A saved copy of https://www.gov.uk/bank-holidays.json to serve")
+    parser.add_argument("--parse-executor", choices=["process", "thread", "inline"], default="process")
+    parser.add_argument("--save-baseline", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare with the results in this JSON file, exiting with 1 on a regression")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Regression threshold, as a fraction of the baseline")
+    parser.add_argument("--prompt", default=PROMPT)
+    args = parser.parse_args()
+
+    # every run does the same work: no cached pages or search results
+    set_tool_cache(None)
+    configure_parse_executor(None if args.parse_executor == "inline" else args.parse_executor)
+    with FixtureServer(pages_dir=args.pages, bank_holidays_path=args.bank_holidays_json) as server:
+        server.point_tools_at()
+        print(f"Fixture server at {server.base_url}, {args.runs} runs per scenario\n")
+        results = bench(read_prompt_from_txt(args.prompt), args.runs, args.llm_latency)
+    print(f"\npeak RSS: {peak_rss_mb():.0f} MB")
+
+    failed = [name for name, result in results.items() if not result["ok"]]
+    if failed:
+        print(f"Checks failed for: {', '.join(failed)}")
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+        print(f"Baseline saved to {args.save_baseline}")
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            regressions = compare(results, json.load(file), args.threshold)
+        print("Regressions:\n  " + "\n  ".join(regressions) if regressions else f"No regressions against {args.baseline}")
+    if failed or regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Benchmark: bank holiday queries on the nested per-year structure built by
+`get_uk_bank_holidays_formatted` (scans) against `BankHolidayCalendar` (binary search).
+
+Usage:
+    python -m benchmarks.bench_bank_holidays                       # synthetic data, 1990-2040
+    python -m benchmarks.bench_bank_holidays --json bank-holidays.json   # a saved copy of the GOV.UK data
+"""
+import argparse
+import json
+import random
+import time
+from datetime import date, timedelta
+
+from react_agents_from_scratch.bank_holidays import BankHolidayCalendar
+from react_agents_from_scratch.utils import restructure_bankholiday_data
+
+
+def _easter(year: int) -> date:
+    # anonymous Gregorian algorithm
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = divmod(b, 4)
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _weekday_on_or_after(day: date, weekday: int = 0) -> date:
+    return day + timedelta(days=(weekday - day.weekday()) % 7)
+
+
+def _last_monday(year: int, month: int) -> date:
+    last = (date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1))
+    return last - timedelta(days=last.weekday())
+
+
+def synthetic_bank_holidays(first_year: int, last_year: int) -> dict:
+    """Bank holidays shaped like the GOV.UK data (without substitute days)."""
+    data = {}
+    for division in ("england-and-wales", "scotland", "northern-ireland"):
+        events = []
+        for year in range(first_year, last_year + 1):
+            easter = _easter(year)
+            days = {
+                "New Year’s Day": date(year, 1, 1),
+                "Good Friday": easter - timedelta(days=2),
+                "Early May bank holiday": _weekday_on_or_after(date(year, 5, 1)),
+                "Spring bank holiday": _last_monday(year, 5),
+                "Christmas Day": date(year, 12, 25),
+                "Boxing Day": date(year, 12, 26),
+            }
+            if division == "scotland":
+                days.update({"2nd January": date(year, 1, 2), "Summer bank holiday": _weekday_on_or_after(date(year, 8, 1)), "St Andrew’s Day": date(year, 11, 30)})
+            else:
+                days.update({"Easter Monday": easter + timedelta(days=1), "Summer bank holiday": _last_monday(year, 8)})
+            if division == "northern-ireland":
+                days.update({"St Patrick’s Day": date(year, 3, 17), "Battle of the Boyne (Orangemen’s Day)": date(year, 7, 12)})
+            events += [{"title": title, "date": day.isoformat(), "notes": "", "bunting": True} for title, day in days.items()]
+        data[division] = {"division": division, "events": sorted(events, key=lambda event: event["date"])}
+    return data
+
+
+# the current structure: {division: [{year: {title: "YYYY-MM-DD"}}, ...]}
+def formatted(bank_holidays: dict) -> dict:
+    return {
+        region: restructure_bankholiday_data([{holiday['title']: holiday['date']} for holiday in bank_holidays[region]['events']])
+        for region in bank_holidays
+    }
+
+
+def scan_is_holiday(structure: dict, day: date, division: str):
+    target = day.isoformat()
+    for year_dict in structure[division]:
+        for holidays in year_dict.values():
+            for title, value in holidays.items():
+                if value == target:
+                    return title
+    return None
+
+
+def scan_next_holiday(structure: dict, day: date, division: str):
+    target = day.isoformat()
+    best = None
+    for year_dict in structure[division]:
+        for holidays in year_dict.values():
+            for title, value in holidays.items():
+                if value > target and (best is None or value < best[0]):
+                    best = (value, title)
+    return (date.fromisoformat(best[0]), best[1]) if best else None
+
+
+def scan_working_days_between(structure: dict, start: date, end: date, division: str) -> int:
+    count = 0
+    day = start
+    while day <= end:
+        if day.weekday() < 5 and scan_is_holiday(structure, day, division) is None:
+            count += 1
+        day += timedelta(days=1)
+    return count
+
+
+def bench(bank_holidays: dict, queries: int = 2000) -> None:
+    rng = random.Random(0)
+    calendar = BankHolidayCalendar(bank_holidays)
+    structure = formatted(bank_holidays)
+    first, last = calendar.coverage("england-and-wales")
+    span = (last - first).days
+    days = [(first + timedelta(days=rng.randrange(span)), rng.choice(calendar.divisions)) for _ in range(queries)]
+    ranges = [(day, day + timedelta(days=rng.randint(5, 60)), division) for day, division in days[:queries // 10]]
+    n_events = sum(len(data["events"]) for data in bank_holidays.values())
+    print(f"{n_events} bank holidays in {len(bank_holidays)} divisions, {first} to {last}\n")
+
+    cases = {
+        "is holiday": (
+            lambda: [scan_is_holiday(structure, day, division) for day, division in days],
+            lambda: [calendar.is_holiday(day, division) for day, division in days],
+        ),
+        "next holiday": (
+            lambda: [scan_next_holiday(structure, day, division) for day, division in days],
+            lambda: [calendar.next_holiday(day, division) for day, division in days],
+        ),
+        "working days between": (
+            lambda: [scan_working_days_between(structure, start, end, division) for start, end, division in ranges],
+            lambda: [calendar.working_days_between(start, end, division) for start, end, division in ranges],
+        ),
+    }
+    print(f"{'query':<24}{'scan µs':>12}{'bisect µs':>12}{'speedup':>10}{'agree':>8}")
+    for name, (scan, indexed) in cases.items():
+        n = len(ranges) if name == "working days between" else len(days)
+        timings = []
+        for func in (scan, indexed):
+            start = time.perf_counter()
+            result = func()
+            timings.append(((time.perf_counter() - start) / n * 1e6, result))
+        (scan_time, scan_result), (indexed_time, indexed_result) = timings
+        print(f"{name:<24}{scan_time:>12.2f}{indexed_time:>12.2f}{scan_time / indexed_time:>9.1f}x{str(scan_result == indexed_result):>8}")
+
+    start = time.perf_counter()
+    BankHolidayCalendar(bank_holidays)
+    print(f"\nbuilding the calendar: {(time.perf_counter() - start) * 1000:.2f} ms (once per load)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--json", help="A saved copy of https://www.gov.uk/bank-holidays.json")
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+    if args.json:
+        with open(args.json, encoding="utf-8") as file:
+            bank_holidays = json.load(file)
+    else:
+        bank_holidays = synthetic_bank_holidays(1990, 2040)
+    bench(bank_holidays, args.queries)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Benchmark: main-content extraction engines over a corpus of GOV.UK HTML pages.
+
+Compares the original full BeautifulSoup parse with a SoupStrainer parse and the
+`html_extract` backends (streaming tokenizer, lxml).
+
+Usage:
+    python -m benchmarks.bench_html_extract --corpus path/to/saved/govuk/pages
+    python -m benchmarks.bench_html_extract --save-corpus path/to/dir   # download a few pages first
+
+Without --corpus, synthetic pages with the structure of GOV.UK guidance pages are used.
+"""
+import argparse
+import os
+import random
+import time
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from react_agents_from_scratch import html_extract
+
+GOVUK_PAGES = [
+    "https://www.gov.uk/register-for-self-assessment",
+    "https://www.gov.uk/universal-credit/eligibility",
+    "https://www.gov.uk/apply-renew-passport",
+    "https://www.gov.uk/income-tax-rates",
+    "https://www.gov.uk/vat-registration",
+    "https://www.gov.uk/tax-free-childcare",
+    "https://www.gov.uk/help-with-childcare-costs",
+    "https://www.gov.uk/student-finance",
+    "https://www.gov.uk/bank-holidays",
+    "https://www.gov.uk/browse/benefits",
+]
+
+
+def soup_full(html: str):
+    """The original extraction: full html.parser tree, then find('main')."""
+    main_content = BeautifulSoup(html, 'html.parser').find('main')
+    return main_content.get_text(separator=' ', strip=True) if main_content else None
+
+
+def soup_strainer(html: str):
+    main_content = BeautifulSoup(html, 'html.parser', parse_only=SoupStrainer('main')).find('main')
+    return main_content.get_text(separator=' ', strip=True) if main_content else None
+
+
+def synthetic_page(rng: random.Random, paragraphs: int) -> str:
+    words = "you must register for self assessment tax return income benefit apply online guidance".split()
+    sentence = lambda n: " ".join(rng.choice(words) for _ in range(n)).capitalize() + "."
+    head = (
+        "<head><title>Guidance - GOV.UK</title>"
+        + "".join(f'<link rel="stylesheet" href="/assets/{i}.css">' for i in range(10))
+        + "<style>" + ".govuk-x{color:#0b0c0c}" * 400 + "</style>"
+        + "<script>" + "window.GOVUK=window.GOVUK||{};" * 400 + "</script></head>"
+    )
+    header = (
+        '<div class="gem-c-cookie-banner"><p>Cookies on GOV.UK</p><button>Accept</button></div>'
+        '<header class="govuk-header"><nav>' + "".join(f'<a href="/t{i}">Topic {i}</a>' for i in range(40)) + "</nav></header>"
+    )
+    body = "".join(
+        f"<h2>{sentence(4)}</h2><p>{sentence(30)} <a href='/x'>{sentence(3)}</a> {sentence(20)}</p>"
+        + (f"<ul>{''.join(f'<li>{sentence(8)}</li>' for _ in range(5))}</ul>" if i % 3 == 0 else "")
+        + (f"<table><tr><th>Band</th><th>Rate</th></tr>{''.join(f'<tr><td>{sentence(2)}</td><td>{rng.randint(1, 45)}%</td></tr>' for _ in range(6))}</table>" if i % 7 == 0 else "")
+        for i in range(paragraphs)
+    )
+    main = (
+        '<main class="govuk-main-wrapper" id="main-content">'
+        '<nav class="gem-c-contents-list"><ol>' + "".join(f"<li><a href='#s{i}'>Section {i}</a></li>" for i in range(8)) + "</ol></nav>"
+        f"<h1>{sentence(5)}</h1><div class='govspeak'>{body}</div>"
+        '<div class="gem-c-print-link"><a href="/print">Print this page</a></div>'
+        '<aside class="gem-c-related-navigation"><h2>Related content</h2>' + "".join(f"<a href='/r{i}'>{sentence(4)}</a>" for i in range(10)) + "</aside>"
+        "</main>"
+    )
+    footer = '<div class="gem-c-feedback"><p>Is this page useful?</p></div><footer class="govuk-footer">' + "".join(f"<a href='/f{i}'>Footer {i}</a>" for i in range(60)) + "</footer>"
+    return f"<!DOCTYPE html><html lang='en'>{head}<body>{header}{main}{footer}</body></html>"
+
+
+def load_corpus(path: str) -> dict[str, str]:
+    corpus = {}
+    for name in sorted(os.listdir(path)):
+        if name.endswith((".html", ".htm")):
+            with open(os.path.join(path, name), "r", encoding="utf-8", errors="replace") as file:
+                corpus[name] = file.read()
+    return corpus
+
+
+def save_corpus(path: str) -> None:
+    from react_agents_from_scratch.http_client import get_session
+    os.makedirs(path, exist_ok=True)
+    for url in GOVUK_PAGES:
+        response = get_session().get(url)
+        if response.status_code == 200:
+            name = url.removeprefix("https://www.gov.uk/").replace("/", "_") + ".html"
+            with open(os.path.join(path, name), "w", encoding="utf-8") as file:
+                file.write(response.text)
+            print(f"saved {url}")
+
+
+def bench(corpus: dict[str, str], repeat: int = 5) -> None:
+    engines = {
+        "bs4 full tree (original)": soup_full,
+        "bs4 SoupStrainer('main')": soup_strainer,
+        "stream tokenizer": lambda html: html_extract.extract_main_text(html, backend="stream"),
+    }
+    if html_extract.lxml_available():
+        engines["lxml"] = lambda html: html_extract.extract_main_text(html, backend="lxml")
+
+    total_bytes = sum(len(html.encode("utf-8")) for html in corpus.values())
+    print(f"{len(corpus)} pages, {total_bytes / 1e6:.2f} MB\n")
+    print(f"{'engine':<28}{'ms / page':>12}{'MB / s':>10}{'speedup':>10}{'chars kept':>13}")
+    baseline = None
+    for name, engine in engines.items():
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            texts = [engine(html) for html in corpus.values()]
+            best = min(best, time.perf_counter() - start)
+        baseline = baseline or best
+        chars = sum(len(text or "") for text in texts)
+        print(f"{name:<28}{best / len(corpus) * 1000:>12.2f}{total_bytes / best / 1e6:>10.1f}{baseline / best:>9.1f}x{chars:>13}")
+
+    if html_extract.lxml_available():
+        same = sum(
+            html_extract.extract_main_text(html, backend="stream") == html_extract.extract_main_text(html, backend="lxml")
+            for html in corpus.values()
+        )
+        print(f"\nstream and lxml backends agree on {same}/{len(corpus)} pages")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="Directory of saved GOV.UK .html pages")
+    parser.add_argument("--save-corpus", help="Download a few GOV.UK pages to this directory and use them")
+    parser.add_argument("--pages", type=int, default=20, help="Number of synthetic pages without --corpus")
+    args = parser.parse_args()
+
+    if args.save_corpus:
+        save_corpus(args.save_corpus)
+        args.corpus = args.save_corpus
+    if args.corpus:
+        corpus = load_corpus(args.corpus)
+    else:
+        rng = random.Random(0)
+        corpus = {f"synthetic-{i}": synthetic_page(rng, paragraphs=rng.randint(20, 120)) for i in range(args.pages)}
+    bench(corpus)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Micro-benchmark: single-scan ReAct parser vs the original regex-per-section parser.
+
+Usage:
+    python -m benchmarks.bench_parse_llm_output
+"""
+import re
+import timeit
+
+from react_agents_from_scratch.react_parser import ReactOutputParser, parse_react_output
+
+
+def parse_llm_output_regex(response: str) -> dict[str, str]:
+    """The original parser: six lazy DOTALL regex searches over the whole response."""
+    patterns = {
+        "thought": r"Thought\s*\d*:\s*(.*?)(?:\s*Action\s*(?:\d+:|:)|Action Input\s*(?:\d+:|:)|Observation\s*(?:\d+:|:)|Eureka Thought\s*(?:\d+:|:)|Final Answer\s*(?:\d+:|:)|$)",
+        "action": r"Action\s*(?:\d+:|:)\s*(.*?)(?:\s*Action Input\s*(?:\d+:|:)|Observation\s*(?:\d+:|:)|Eureka Thought\s*(?:\d+:|:)|Final Answer\s*(?:\d+:|:)|$)",
+        "action_input": r"Action Input\s*(?:\d+:|:)\s*(.*?)(?:\s*Observation\s*(?:\d+:|:)|Eureka Thought\s*(?:\d+:|:)|Final Answer\s*(?:\d+:|:)|$)",
+        "observation": r"Observation\s*(?:\d+:|:)\s*(.*?)(?:\s*Eureka Thought\s*(?:\d+:|:)|Final Answer\s*(?:\d+:|:)|$)",
+        "eureka_thought": r"Eureka Thought\s*(?:\d+:|:)\s*(.*?)(?:\s*Final Answer\s*(?:\d+:|:)|$)",
+        "final_answer": r"Final Answer\s*(?:\d+:|:)\s*(.*)"
+    }
+
+    extracted_data = {}
+    for key, pattern in patterns.items():
+        match = re.search(pattern, response, re.DOTALL)
+        extracted_data[key] = match.group(1).strip() if match else None
+
+    return extracted_data
+
+
+def _page_text(n_bytes: int) -> str:
+    sentence = "You must register for Self Assessment by 5 October if you need to send a tax return. "
+    return (sentence * (n_bytes // len(sentence) + 1))[:n_bytes]
+
+
+def build_inputs() -> dict[str, str]:
+    """Typical, large and adversarial LLM completions."""
+    short = (
+        "Thought: I need to search GOV.UK for self assessment registration.\n"
+        "Action: search_govuk\n"
+        "Action Input: register for self assessment"
+    )
+    # the model echoes a 60 KB observation back into its completion
+    echoed = f"{short}\nObservation: {_page_text(60_000)}\nThought: I should check the deadline."
+    final = (
+        "Eureka Thought: The observations answer the question.\n"
+        f"Final Answer: {_page_text(20_000)}"
+    )
+    # marker-like words without colons force the lazy groups to retry at every position
+    near_misses = "Thought Action Action Input Observation Eureka Thought Final Answer " * 2_000
+    adversarial = f"Thought: {near_misses}\nAction: search_govuk\nAction Input: {near_misses}"
+    # no markers at all: every regex scans the whole text and fails
+    malformed = _page_text(60_000)
+    return {
+        "short": short,
+        "echoed_observation_60kb": echoed,
+        "long_final_answer_20kb": final,
+        "adversarial_near_misses": adversarial,
+        "malformed_60kb": malformed,
+    }
+
+
+def _stream(text: str, chunk_size: int = 16) -> dict[str, str]:
+    parser = ReactOutputParser()
+    for i in range(0, len(text), chunk_size):
+        parser.feed(text[i:i + chunk_size])
+    return parser.result()
+
+
+def bench(number: int = 20) -> None:
+    print(f"{'input':<28}{'bytes':>9}{'regex (ms)':>13}{'scan (ms)':>12}{'stream (ms)':>14}{'speedup':>10}")
+    for name, text in build_inputs().items():
+        assert parse_react_output(text) == parse_llm_output_regex(text), name
+        assert _stream(text) == parse_llm_output_regex(text), name
+
+        regex_ms = min(timeit.repeat(lambda: parse_llm_output_regex(text), number=number, repeat=3)) / number * 1000
+        scan_ms = min(timeit.repeat(lambda: parse_react_output(text), number=number, repeat=3)) / number * 1000
+        stream_ms = min(timeit.repeat(lambda: _stream(text), number=1, repeat=3)) * 1000
+        print(
+            f"{name:<28}{len(text.encode('utf-8')):>9}{regex_ms:>13.3f}{scan_ms:>12.3f}"
+            f"{stream_ms:>14.3f}{regex_ms / scan_ms:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    bench()
@@ -0,0 +1,95 @@
+"""
+Benchmark: replay recorded agent trajectories through `react_agent`, to measure and profile
+the CPU cost of the loop itself (parsing, prompt building, tool fan-out) on real traffic.
+
+Record a cassette with the batch runner first, then replay it with two builds and compare:
+
+Usage:
+    python -m react_agents_from_scratch.batch_runner questions.jsonl results.jsonl --record-cassette runs.cassette.jsonl.gz
+    python -m benchmarks.bench_replay runs.cassette.jsonl.gz
+    python -m benchmarks.bench_replay runs.cassette.jsonl.gz --profile          # where the loop's time goes
+    python -m benchmarks.bench_replay runs.cassette.jsonl.gz --realtime         # with the recorded latencies
+
+LLM and tool calls are answered from the cassette at once, so the time measured is the loop's.
+"Prompt mismatches" counts LLM calls whose prompt differs from the recorded one: 0 when
+the loop still builds the same prompts.
+"""
+import argparse
+import contextlib
+import cProfile
+import io
+import pstats
+import time
+
+from react_agents_from_scratch.cassette import CassettePlayer
+from react_agents_from_scratch.context_budget import BudgetedPromptBuffer
+from react_agents_from_scratch.prompt_buffer import PromptBuffer
+from react_agents_from_scratch.react_agent_naive import format_react_loop, react_agent
+from react_agents_from_scratch.repeated_actions import ActionMemo
+from react_agents_from_scratch.utils import read_prompt_from_txt
+
+PROMPT = "react_agents_from_scratch/openai_react/prompts/react_agent_prompt.txt"
+
+
+def replay_all(player: CassettePlayer, prompt_template: str) -> tuple[int, int, dict[str, str]]:
+    """Replay every trajectory of the cassette once; returns (runs, iterations, errors by trajectory)."""
+    runs = iterations = 0
+    errors = {}
+    for trajectory_id, recorded in player.trajectories.items():
+        meta = recorded["meta"]
+        question = recorded["question"]
+        trajectory = player.trajectory(trajectory_id, question)
+        tools = trajectory.tools(dict.fromkeys(meta.get("tools") or player.tool_names()))
+        if meta.get("max_prompt_tokens"):
+            buffer = BudgetedPromptBuffer(prompt_template, question, format_step=format_react_loop, max_prompt_tokens=meta["max_prompt_tokens"], chat=meta.get("chat", False))
+        else:
+            buffer = PromptBuffer(prompt_template, question, format_step=format_react_loop, chat=meta.get("chat", False))
+        repeated_actions = meta.get("repeated_actions")
+        action_memo = ActionMemo(escalation=None if repeated_actions == "reuse" else repeated_actions) if repeated_actions else None
+        try:
+            react_agent(question, trajectory.brain(), prompt_template, tools, max_iterations=meta.get("max_iterations", 10), prompt_buffer=buffer, action_memo=action_memo)
+        except Exception as e:
+            # e.g. a recorded LLM error, or a run that left the recorded path
+            errors[trajectory_id] = f"{type(e).__name__}: {e}"
+        runs += 1
+        iterations += len(buffer.steps)
+    return runs, iterations, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("cassette", help="A cassette recorded with --record-cassette")
+    parser.add_argument("--repeat", type=int, default=5, help="Passes over the cassette (the best one is reported)")
+    parser.add_argument("--realtime", action="store_true", help="Take as long as the recorded LLM and tool calls took")
+    parser.add_argument("--profile", action="store_true", help="Print the functions taking the most time in one pass")
+    parser.add_argument("--prompt", default=PROMPT)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    player = CassettePlayer(args.cassette, realtime=args.realtime)
+    print(f"Loaded {len(player.trajectories)} trajectories in {(time.perf_counter() - start) * 1000:.0f} ms")
+    prompt_template = read_prompt_from_txt(args.prompt)
+
+    best = float("inf")
+    for _ in range(args.repeat):
+        # the agent prints its progress
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            runs, iterations, errors = replay_all(player, prompt_template)
+            best = min(best, time.perf_counter() - start)
+    print(f"{runs} runs, {iterations} iterations: {best * 1000:.1f} ms per pass, "
+          f"{best / max(runs, 1) * 1000:.2f} ms per run, {iterations / best:.0f} iterations/s")
+    stats = player.stats()
+    print(f"per pass: {stats['misses'] // args.repeat} misses, {stats['prompt_mismatches'] // args.repeat} prompt mismatches")
+    for trajectory_id, error in errors.items():
+        print(f"  {trajectory_id}: {error}")
+
+    if args.profile:
+        profiler = cProfile.Profile()
+        with contextlib.redirect_stdout(io.StringIO()):
+            profiler.runcall(replay_all, player, prompt_template)
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Benchmark: load-test the agent HTTP server (`react_agents_from_scratch.server`), offline.
+
+The server runs in this process with a scripted async LLM and the real tools pointed at the
+local fixture server. Each simulated user posts a question and streams the run's events; the
+agent searches GOV.UK, asks the user a question (which parks the run), and the user's answer
+resumes it until the final answer. Users rejected with a 429 wait for Retry-After and try again.
+
+Reports: latency percentiles of a whole session (question to final answer, including the
+user's reply) and of the first streamed event, sessions per second, 429 responses, and the
+peak RSS of the process.
+
+Usage:
+    python -m benchmarks.bench_server
+    python -m benchmarks.bench_server --users 500 --concurrency 200 --workers 32 --queue-size 64 --llm-latency 0.2
+    python -m benchmarks.bench_server --sessions-dir /tmp/sessions   # with the file session store
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import time
+from functools import partial
+from typing import Optional
+
+import aiohttp
+from aiohttp import web
+
+from benchmarks.agent_fixtures import AsyncScriptedLLM, FixtureServer
+from benchmarks.bench_agent import PROMPT, _final, _percentile, _step, peak_rss_mb
+from react_agents_from_scratch import tools as agent_tools
+from react_agents_from_scratch.http_client import close_async_session
+from react_agents_from_scratch.server import AgentServer, FileSessionStore
+from react_agents_from_scratch.tool_cache import set_tool_cache
+from react_agents_from_scratch.utils import read_prompt_from_txt
+
+QUESTION = "Can I get help paying for childcare?"
+USER_ANSWER = "I live in Scotland and have two children under 5."
+COMPLETIONS = [
+    _step("I should search GOV.UK.", "search_govuk", "help paying for childcare"),
+    _step("It depends on where the user lives.", "ask_user", "Where do you live, and how old are your children?"),
+    _final("You can get Tax-Free Childcare and 30 hours of free childcare."),
+]
+
+
+async def read_events(response: aiohttp.ClientResponse):
+    """Yield the (event, data) pairs of a server-sent events response."""
+    event = None
+    async for line in response.content:
+        line = line.decode("utf-8").rstrip("\n")
+        if line.startswith("event: "):
+            event = line[len("event: "):]
+        elif line.startswith("data: "):
+            yield event, json.loads(line[len("data: "):])
+
+
+async def post_until_accepted(session: aiohttp.ClientSession, url: str, payload: dict, rejections: list[int]) -> aiohttp.ClientResponse:
+    """POST, waiting for Retry-After and retrying while the server answers 429."""
+    while True:
+        response = await session.post(url, json=payload)
+        if response.status != 429:
+            response.raise_for_status()
+            return response
+        rejections[0] += 1
+        retry_after = float(response.headers.get("Retry-After", 1))
+        response.release()
+        await asyncio.sleep(retry_after)
+
+
+async def user_session(session: aiohttp.ClientSession, base_url: str, rejections: list[int]) -> tuple[float, Optional[float], Optional[str]]:
+    """One user: question, streamed steps, answer to the agent's question, final answer.
+
+    Returns:
+        (seconds for the whole session, seconds to the first event, final status)
+    """
+    start = time.perf_counter()
+    first_event = status = None
+    response = await post_until_accepted(session, f"{base_url}/sessions?stream=1", {"question": QUESTION}, rejections)
+    session_url = base_url + response.headers["Location"]
+    while response is not None:
+        waiting = False
+        async with response:
+            async for event, data in read_events(response):
+                if first_event is None:
+                    first_event = time.perf_counter() - start
+                waiting = event == "waiting_for_user"
+                if event == "finished":
+                    status = data["status"]
+        response = await post_until_accepted(session, f"{session_url}/answer?stream=1", {"answer": USER_ANSWER}, rejections) if waiting else None
+    return time.perf_counter() - start, first_event, status
+
+
+async def load_test(args, prompt_template: str) -> dict:
+    store = FileSessionStore(args.sessions_dir) if args.sessions_dir else None
+    brain = AsyncScriptedLLM(COMPLETIONS, latency=args.llm_latency)
+    tools = {
+        'search_govuk': partial(agent_tools.asearch_govuk, min_results=3),
+        'search_govuk_services': partial(agent_tools.search_govuk_services, page=1, top_n_results=6),
+        'uk_bank_holidays': agent_tools.uk_bank_holidays,
+    }
+    server = AgentServer(lambda: brain, prompt_template, tools, store=store, workers=args.workers, queue_size=args.queue_size, max_iterations=5)
+    runner = web.AppRunner(server.app())
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    base_url = f"http://127.0.0.1:{runner.addresses[0][1]}"
+
+    rejections = [0]
+    limiter = asyncio.Semaphore(args.concurrency)
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+
+    async def one_user(session):
+        async with limiter:
+            return await user_session(session, base_url, rejections)
+
+    try:
+        async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=None)) as session:
+            await one_user(session)  # warm-up: connections, the parse pool
+            rejections[0] = 0
+            start = time.perf_counter()
+            results = await asyncio.gather(*(one_user(session) for _ in range(args.users)))
+            elapsed = time.perf_counter() - start
+    finally:
+        await runner.cleanup()
+        await close_async_session()
+
+    totals = [total for total, _, _ in results]
+    firsts = [first for _, first, _ in results if first is not None]
+    return {
+        "sessions": len(results),
+        "answered": sum(status == "answered" for _, _, status in results),
+        "p50_ms": _percentile(totals, 0.5) * 1000,
+        "p90_ms": _percentile(totals, 0.9) * 1000,
+        "p99_ms": _percentile(totals, 0.99) * 1000,
+        "first_event_p50_ms": _percentile(firsts, 0.5) * 1000,
+        "first_event_p99_ms": _percentile(firsts, 0.99) * 1000,
+        "sessions_per_s": len(results) / elapsed,
+        "rejected_429": rejections[0],
+        "server": server.stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200, help="Sessions to run")
+    parser.add_argument("--concurrency", type=int, default=50, help="Users connected at the same time")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--queue-size", type=int, default=16)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds per scripted LLM call")
+    parser.add_argument("--sessions-dir", default=None, help="Use the file session store in this directory")
+    parser.add_argument("--prompt", default=PROMPT)
+    args = parser.parse_args()
+
+    # every session asks the same things: measure the tools, not the tool cache
+    set_tool_cache(None)
+    prompt_template = read_prompt_from_txt(args.prompt)
+    with FixtureServer() as fixtures:
+        fixtures.point_tools_at()
+        # the agent prints its progress
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = asyncio.run(load_test(args, prompt_template))
+
+    print(f"{result['sessions']} sessions ({result['answered']} answered), {args.concurrency} users at a time, "
+          f"{args.workers} workers, queue of {args.queue_size}, LLM latency {args.llm_latency * 1000:.0f} ms")
+    print(f"session     p50 {result['p50_ms']:.0f} ms, p90 {result['p90_ms']:.0f} ms, p99 {result['p99_ms']:.0f} ms")
+    print(f"first event p50 {result['first_event_p50_ms']:.0f} ms, p99 {result['first_event_p99_ms']:.0f} ms")
+    print(f"{result['sessions_per_s']:.1f} sessions/s, {result['rejected_429']} responses 429 (retried)")
+    print(f"server: {result['server']}")
+    print(f"peak RSS: {peak_rss_mb():.0f} MB")
+    if result["answered"] != result["sessions"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
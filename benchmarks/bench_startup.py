@@ -0,0 +1,112 @@
+"""
+Benchmark: startup time, i.e. the time to import the agent's entry modules in a fresh interpreter.
+
+Each module is imported in a new process with `python -X importtime`. Reports the module's
+cumulative import time (the best of a few runs), the wall-clock time of the process, and the
+heaviest packages it pulls in. The tools, the OpenAI client, requests, aiohttp and bs4 are
+loaded on first use (see `tool_registry`), so the CLI modules should stay well under the target
+(they took about 1.3 s to import when everything was loaded at import).
+
+Usage:
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --runs 10 --top 10
+    python -m benchmarks.bench_startup --target-ms 300   # exits with 1 if a CLI module takes longer
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+# the modules loaded by the CLIs, held to the target
+CLI_MODULES = (
+    "react_agents_from_scratch.tool_registry",
+    "react_agents_from_scratch.react_agent_naive",
+    "react_agents_from_scratch.async_agent",
+    "react_agents_from_scratch.batch_runner",
+    "react_agents_from_scratch.tools",
+)
+# reported only: the server needs aiohttp's web framework to start at all
+OTHER_MODULES = (
+    "react_agents_from_scratch.server",
+)
+TARGET_MS = 300
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, float, float]]:
+    """(module, depth, self ms, cumulative ms) of each import, from `-X importtime` output, in its order."""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append((name.strip(), depth, int(self_us) / 1000, int(cumulative_us) / 1000))
+    return imports
+
+
+def import_once(module: str) -> tuple[float, list[tuple[str, int, float, float]]]:
+    """Import `module` in a fresh interpreter; returns the wall-clock ms and the imports."""
+    # the OpenAI client refuses to be built without a key: a placeholder, in case a module builds one
+    env = {**os.environ, "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "placeholder")}
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True, text=True, env=env)
+    elapsed = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    return elapsed, parse_importtime(result.stderr)
+
+
+def module_imports(imports: list[tuple[str, int, float, float]], module: str) -> list[tuple[str, int, float, float]]:
+    """The imports made by importing `module`: the entries listed since the previous top-level one."""
+    end = max(i for i, (name, depth, _, _) in enumerate(imports) if name == module and depth == 0)
+    start = end
+    while start > 0 and imports[start - 1][1] > 0:
+        start -= 1
+    return imports[start:end + 1]
+
+
+def heaviest_packages(imports: list[tuple[str, int, float, float]], module: str, top: int) -> list[tuple[str, float]]:
+    """The packages imported by `module` taking the most cumulative time, other than the repo's own."""
+    own = module.split(".")[0]
+    packages = [(name, cumulative) for name, _, _, cumulative in module_imports(imports, module) if "." not in name and name != own and not name.startswith("_")]
+    return sorted(packages, key=lambda item: item[1], reverse=True)[:top]
+
+
+def bench(modules: tuple[str, ...], runs: int, top: int) -> dict[str, float]:
+    interpreter_ms = min(import_once("sys")[0] for _ in range(runs))
+    print(f"bare interpreter: {interpreter_ms:.0f} ms\n")
+    print(f"{'module':<45}{'import ms':>11}{'process ms':>12}")
+    results = {}
+    for module in modules:
+        best = None
+        for _ in range(runs):
+            elapsed, imports = import_once(module)
+            cumulative = module_imports(imports, module)[-1][3]
+            if best is None or cumulative < best[0]:
+                best = (cumulative, elapsed, imports)
+        cumulative, elapsed, imports = best
+        results[module] = cumulative
+        print(f"{module:<45}{cumulative:>11.0f}{elapsed:>12.0f}")
+        if top:
+            print("    " + ", ".join(f"{name} {ms:.0f}" for name, ms in heaviest_packages(imports, module, top)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Imports per module (the best one is reported)")
+    parser.add_argument("--top", type=int, default=5, help="Heaviest packages shown per module (0 for none)")
+    parser.add_argument("--target-ms", type=float, default=TARGET_MS, help="Import time allowed for the CLI modules")
+    args = parser.parse_args()
+
+    results = bench(CLI_MODULES + OTHER_MODULES, args.runs, args.top)
+    over = [module for module in CLI_MODULES if results[module] > args.target_ms]
+    if over:
+        print(f"\nOver the {args.target_ms:.0f} ms target: {', '.join(over)}")
+        sys.exit(1)
+    print(f"\nAll CLI modules under the {args.target_ms:.0f} ms target.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Resumable state of a ReAct run.
+
+`react_agent` and `async_agent.arun` keep everything a run needs between iterations in an
+`AgentState`: the prompt buffer (with the steps so far), the iteration count and the action
+memo. Run with `interactive_tools` (e.g. {"ask_user"}), the loop does not call a tool that
+waits for the user: it parks the run with the step in `pending_step` and returns. The state
+can then stay in memory, or be serialised with `to_dict` (plain JSON) and dropped, and the
+run resumed later, in any process, with `resume(answer)` and another call of the loop,
+without repeating the LLM and tool calls made before the question.
+
+Example:
+    state = AgentState(question, PromptBuffer(prompt_template, question, format_step=format_react_loop))
+    run_react_loop(state, llm_brain_call, tools, interactive_tools={"ask_user"})
+    if state.status == WAITING_FOR_USER:
+        saved = json.dumps(state.to_dict())      # a few KB per parked session
+        ...
+        state = AgentState.from_dict(json.loads(saved), prompt_template)
+        state.resume("I live in Scotland")
+        result = run_react_loop(state, llm_brain_call, tools, interactive_tools={"ask_user"})
+"""
+from typing import Any, Callable, Optional
+
+from react_agents_from_scratch.context_budget import BudgetedPromptBuffer
+from react_agents_from_scratch.prompt_buffer import PromptBuffer
+
+# statuses of a run
+RUNNING = "running"
+WAITING_FOR_USER = "waiting_for_user"
+ANSWERED = "answered"
+NO_RESPONSE = "no_response"
+REPEATED_ACTIONS = "repeated_actions"
+MAX_ITERATIONS = "max_iterations"
+FINISHED = frozenset({ANSWERED, NO_RESPONSE, REPEATED_ACTIONS, MAX_ITERATIONS})
+
+
+class AgentState:
+    """The steps, iteration count and status of a ReAct run, which can be parked and resumed."""
+
+    def __init__(self, question: str, prompt_buffer: PromptBuffer, max_iterations: int = 10, action_memo=None):
+        """
+        Args:
+            question: The user's question
+            prompt_buffer: The buffer the prompt is built in (holding the steps so far)
+            max_iterations: Maximum number of iterations before giving up
+            action_memo: Optional `repeated_actions.ActionMemo` (see `react_agent`)
+        """
+        self.question = question
+        self.prompt_buffer = prompt_buffer
+        self.max_iterations = max_iterations
+        self.action_memo = action_memo
+        self.iterations = 0
+        self.status = RUNNING
+        self.answer: Optional[str] = None
+        # the step waiting for the user's answer
+        self.pending_step: Optional[dict] = None
+        # called with (event, data) as the run goes: "step", "waiting_for_user" and "finished"
+        # (e.g. to stream a run's progress, see `server`); not saved with the state
+        self.listener: Optional[Callable[[str, dict], None]] = None
+
+    def _emit(self, event: str, data: dict) -> None:
+        if self.listener is not None:
+            self.listener(event, data)
+
+    @property
+    def steps(self) -> list[dict]:
+        return self.prompt_buffer.steps
+
+    @property
+    def pending_question(self) -> Optional[str]:
+        """The question asked to the user by the pending step, if the run is waiting for an answer."""
+        if self.pending_step is None:
+            return None
+        from react_agents_from_scratch.react_agent_naive import get_action
+        return get_action(self.pending_step)[1]
+
+    def complete_step(self, react_step: dict) -> None:
+        """Add a step with its observation to the prompt and count the iteration."""
+        if self.action_memo is not None:
+            self.action_memo.record(react_step, self.iterations + 1)
+        self.prompt_buffer.append(react_step)
+        self.iterations += 1
+        self._emit("step", {"iteration": self.iterations, "step": react_step})
+
+    def park(self, react_step: dict) -> None:
+        """Stop the run at a step waiting for the user's answer."""
+        self.pending_step = react_step
+        self.status = WAITING_FOR_USER
+        self._emit(WAITING_FOR_USER, {"iteration": self.iterations + 1, "step": react_step, "question": self.pending_question})
+
+    def resume(self, user_answer: str) -> None:
+        """Give the parked step the user's answer as its observation, so the loop can go on."""
+        if self.pending_step is None:
+            raise ValueError("The run is not waiting for an answer from the user")
+        from react_agents_from_scratch.react_agent_naive import format_observation
+        react_step, self.pending_step = self.pending_step, None
+        react_step['observation'] = format_observation(user_answer)
+        self.status = RUNNING
+        self.complete_step(react_step)
+
+    def finish(self, status: str, answer: Optional[str] = None) -> None:
+        self.status = status
+        self.answer = answer
+        if self.action_memo is not None and status in (ANSWERED, REPEATED_ACTIONS):
+            # the last step is not counted in `iterations`
+            self.action_memo.end_run(self.iterations + 1, self.max_iterations)
+        self._emit("finished", {"status": status, "answer": answer})
+
+    def to_dict(self) -> dict[str, Any]:
+        """The state as plain JSON data, without the prompt template (see `from_dict`)."""
+        buffer = self.prompt_buffer
+        data = {
+            "question": self.question,
+            "max_iterations": self.max_iterations,
+            "iterations": self.iterations,
+            "status": self.status,
+            "answer": self.answer,
+            "pending_step": self.pending_step,
+            "steps": buffer.steps,
+            "chat": buffer.chat,
+            "action_memo": self.action_memo.to_dict() if self.action_memo is not None else None,
+        }
+        if isinstance(buffer, BudgetedPromptBuffer):
+            data["budget"] = {"max_prompt_tokens": buffer.max_prompt_tokens, "max_observation_tokens": buffer.max_observation_tokens}
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any], prompt_template: str) -> "AgentState":
+        """
+        Rebuild a state saved with `to_dict`.
+
+        Args:
+            data: The saved state
+            prompt_template: The template of the run's prompt (not saved with the state)
+        """
+        from react_agents_from_scratch.react_agent_naive import format_react_loop
+        from react_agents_from_scratch.repeated_actions import ActionMemo
+
+        question = data["question"]
+        if data.get("budget"):
+            buffer = BudgetedPromptBuffer(prompt_template, question, format_step=format_react_loop, chat=data["chat"], **data["budget"])
+        else:
+            buffer = PromptBuffer(prompt_template, question, format_step=format_react_loop, chat=data["chat"])
+        # the prompt is rebuilt from the steps: no LLM or tool calls
+        for react_step in data["steps"]:
+            buffer.append(react_step)
+        action_memo = ActionMemo.from_dict(data["action_memo"]) if data.get("action_memo") else None
+        state = cls(question, buffer, max_iterations=data["max_iterations"], action_memo=action_memo)
+        state.iterations = data["iterations"]
+        state.status = data["status"]
+        state.answer = data["answer"]
+        state.pending_step = data["pending_step"]
+        return state
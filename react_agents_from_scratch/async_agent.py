@@ -0,0 +1,205 @@
+import asyncio
+from concurrent.futures import Executor
+from typing import Callable, Optional
+
+from react_agents_from_scratch.agent_state import ANSWERED, MAX_ITERATIONS, NO_RESPONSE, REPEATED_ACTIONS, AgentState
+from react_agents_from_scratch.prompt_buffer import PromptBuffer
+from react_agents_from_scratch.react_agent_naive import (
+    DEFAULT_TOOL_TIMEOUT,
+    SEQUENTIAL_TOOLS,
+    TOOL_TIMEOUTS,
+    format_invalid_action,
+    format_multi_observation,
+    format_observation,
+    format_react_loop,
+    format_tool_error,
+    format_tool_timeout,
+    get_action,
+    parse_llm_output,
+    waits_for_user,
+)
+from react_agents_from_scratch.tracing import in_current_context, span, traced
+from react_agents_from_scratch.utils import is_async_callable
+
+
+async def call_maybe_async(func: Callable, *args, executor: Optional[Executor] = None):
+    """
+    Await `func(*args)` if it is async, otherwise run it in a thread pool.
+
+    Sync tools and LLM brains (blocking HTTP calls, `input()`) never block the event loop:
+    they run in `executor`, or the event loop's default thread pool if None.
+    """
+    if is_async_callable(func):
+        return await func(*args)
+    loop = asyncio.get_running_loop()
+    # within the caller's tracing span (see `tracing`)
+    return await loop.run_in_executor(executor, in_current_context(func), *args)
+
+
+async def acall_tool(action_name: str, tool: Callable, action_input: str, executor: Optional[Executor] = None):
+    """Async version of `call_tool`: call a tool, recorded as a `tool.call` span when tracing is on."""
+    with span("tool.call", tool=action_name, input_chars=len(action_input)) as tool_span:
+        observation = await call_maybe_async(tool, action_input, executor=executor)
+        tool_span.set(observation_chars=len(observation) if observation else 0)
+        return observation
+
+
+async def aexecute_action(react_step: dict[str, str], tools: dict, executor: Optional[Executor] = None) -> None:
+    """Async version of `execute_action`: run the step's tool and store the observation in the step."""
+    action_name, action_input = get_action(react_step)
+
+    if action_name in tools:
+        try:
+            observation = await acall_tool(action_name, tools[action_name], action_input, executor=executor)
+            react_step['observation'] = format_observation(observation)
+        except Exception as e:
+            react_step['observation'] = format_tool_error(e)
+    else:
+        react_step['observation'] = format_invalid_action(action_name, tools)
+
+
+async def _aexecute_numbered_action(action: dict, tools: dict, executor: Optional[Executor] = None) -> None:
+    action_name, action_input = get_action(action)
+    if action_name not in tools:
+        action['observation'] = format_invalid_action(action_name, tools)
+        return
+    timeout = TOOL_TIMEOUTS.get(action_name, DEFAULT_TOOL_TIMEOUT)
+    try:
+        observation = await asyncio.wait_for(acall_tool(action_name, tools[action_name], action_input, executor=executor), timeout)
+        action['observation'] = format_observation(observation)
+    except asyncio.TimeoutError:
+        action['observation'] = format_tool_timeout(action_name, timeout)
+    except Exception as e:
+        action['observation'] = format_tool_error(e)
+
+
+async def aexecute_actions(react_step: dict, tools: dict, executor: Optional[Executor] = None) -> None:
+    """Async version of `execute_actions`: run the step's numbered actions concurrently and merge their observations."""
+    actions = react_step['actions']
+    concurrent = [action for action in actions if get_action(action)[0] not in SEQUENTIAL_TOOLS]
+    await asyncio.gather(*(_aexecute_numbered_action(action, tools, executor) for action in concurrent))
+    for action in actions:
+        if 'observation' not in action:
+            await _aexecute_numbered_action(action, tools, executor)
+    react_step['observation'] = format_multi_observation(actions)
+
+
+async def arun(question: str, llm_brain_call: Callable, prompt_template: str, tools: dict, max_iterations: int = 10, prompt_buffer: Optional[PromptBuffer] = None, executor: Optional[Executor] = None, speculation=None, action_memo=None) -> Optional[tuple[str, str]]:
+    """
+    Execute the ReAct agent loop on the running event loop.
+
+    Same loop as `react_agent`, but LLM calls and tools are awaited, so many agent sessions
+    can run concurrently on a single event loop. Async callables (e.g. `call_llm.aget_llm_response`,
+    `tools.asearch_govuk`) are awaited directly; sync ones run in a thread pool.
+
+    Args:
+        question: The user's question
+        llm_brain_call: The (async or sync) function to call the LLM agentic brain
+        prompt_template: The template for the ReAct prompt
+        tools: Dictionary of available (async or sync) tools
+        max_iterations: Maximum number of iterations before giving up
+        prompt_buffer: Optional buffer to build the prompt in
+        executor: Thread pool for sync tools and LLM calls; the loop's default one if None
+        speculation: Optional `speculation.SpeculativeActions`, shared with a streaming brain,
+            whose tool calls started mid-stream are used for the steps they match
+        action_memo: Optional `repeated_actions.ActionMemo`: repeated actions reuse the earlier
+            observation, and loops of repeats are escalated (e.g. to a final answer)
+
+    Returns:
+        Optional[tuple[str, str]]: The final answer and the ReAct history if found, None otherwise
+    """
+    if prompt_buffer is None:
+        prompt_buffer = PromptBuffer(prompt_template, question, format_step=format_react_loop)
+    state = AgentState(question, prompt_buffer, max_iterations=max_iterations, action_memo=action_memo)
+    return await arun_react_loop(state, llm_brain_call, tools, executor=executor, speculation=speculation)
+
+
+@traced("react.run")
+async def arun_react_loop(state: AgentState, llm_brain_call: Callable, tools: dict, executor: Optional[Executor] = None, speculation=None, interactive_tools: frozenset = frozenset()) -> Optional[tuple[str, str]]:
+    """Async version of `run_react_loop`: run the loop of `state` until an answer, giving up, or a question for the user."""
+    if state.pending_step is not None:
+        raise ValueError("The run is waiting for an answer from the user: call state.resume() first")
+    prompt_buffer, action_memo = state.prompt_buffer, state.action_memo
+
+    while state.iterations < state.max_iterations:
+        with span("react.iteration", iteration=state.iterations + 1) as iteration_span:
+            # get LLM response
+            with span("llm.call", prompt_bytes=prompt_buffer.prompt_bytes, prompt_tokens=prompt_buffer.sizes[-1]["tokens"]) as llm_span:
+                response = await call_maybe_async(llm_brain_call, prompt_buffer.prompt, executor=executor)
+                llm_span.set(completion_chars=len(response) if response else 0)
+            if not response:
+                print("No response from LLM. Exiting loop.")
+                state.finish(NO_RESPONSE)
+                return None
+
+            # parse the response
+            react_step = parse_llm_output(response)
+
+            # an action already run: reuse its observation instead of calling the tool again
+            repeated = action_memo is not None and action_memo.reuse(react_step, state.iterations + 1)
+
+            # use the tool call started while the response was streaming, if it matches the step
+            speculated = speculation is not None and await speculation.aclaim(react_step)
+            iteration_span.set(action=react_step.get('action'), final=bool(react_step.get('final_answer')), repeated=repeated, speculated=speculated)
+
+            if repeated and action_memo.stopped:
+                state.finish(REPEATED_ACTIONS)
+                print("The same action keeps being repeated. Exiting loop.")
+                return None
+
+            # check for final answer
+            if react_step.get('final_answer'):
+                prompt_buffer.append(react_step)
+                state.finish(ANSWERED, react_step['final_answer'])
+                print(f"\n\nFinal answer found in {state.iterations + 1} iterations.\n")
+                return react_step['final_answer'], prompt_buffer.conversation_text
+
+            # a question for the user: park the run until the answer comes
+            if waits_for_user(react_step, interactive_tools):
+                iteration_span.set(parked=True)
+                state.park(react_step)
+                return None
+
+            # execute action(s) if present and get observation
+            if speculated or repeated:
+                pass
+            elif react_step.get('actions'):
+                await aexecute_actions(react_step, tools, executor=executor)
+            elif react_step.get('action'):
+                await aexecute_action(react_step, tools, executor=executor)
+
+            state.complete_step(react_step)
+
+    print("Maximum iterations reached without finding a final answer.")
+    state.finish(MAX_ITERATIONS)
+    return None
+
+
+if __name__ == "__main__":
+    from react_agents_from_scratch.http_client import close_async_session
+    from react_agents_from_scratch.openai_react import call_llm
+    from react_agents_from_scratch.repeated_actions import ActionMemo
+    from react_agents_from_scratch.tool_registry import load_tools
+    from react_agents_from_scratch.utils import read_prompt_from_txt
+    REACT_AGENT_PROMPT = read_prompt_from_txt("react_agents_from_scratch/openai_react/prompts/react_agent_prompt.txt")
+
+    tools = load_tools(asynchronous=True)
+
+    async def run(question: str):
+        try:
+            return await arun(
+                question=question,
+                llm_brain_call=call_llm.aget_llm_response,
+                prompt_template=REACT_AGENT_PROMPT,
+                tools=tools,
+                action_memo=ActionMemo()
+            )
+        finally:
+            await close_async_session()
+
+    user_question = input("Please enter your question: ")
+    result = asyncio.run(run(user_question))
+    if result:
+        print(f"Here is an answer for you! \n: {result[0]} \n\n")
+    else:
+        print("No answer found.\n\n")
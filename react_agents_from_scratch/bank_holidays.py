@@ -0,0 +1,227 @@
+"""
+UK bank holidays, indexed for fast date queries.
+
+`BankHolidayCalendar` is built once from GOV.UK's `bank-holidays.json` and keeps, for each
+division (England and Wales, Scotland, Northern Ireland), the holiday dates as a sorted
+array of day numbers. Is-holiday, next/previous holiday, holidays-in-range and
+working-days-between queries are binary searches (`bisect`) on those arrays, instead of
+scans over every event.
+
+`answer_bank_holiday_query` answers the free-text Action Input of the agent's
+`uk_bank_holidays` tool (see `tools.uk_bank_holidays`).
+
+Example:
+    calendar = BankHolidayCalendar(bank_holidays_json)
+    calendar.next_holiday(date(2025, 5, 6), "scotland")  # (date(2025, 5, 26), "Spring bank holiday")
+    calendar.working_days_between(date(2025, 12, 22), date(2026, 1, 2), "england-and-wales")  # 7
+"""
+import re
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime
+from typing import Optional
+
+DIVISIONS = ("england-and-wales", "scotland", "northern-ireland")
+DEFAULT_DIVISION = "england-and-wales"
+# words identifying a division in a free-text query, most specific first
+DIVISION_ALIASES = (
+    ("northern ireland", "northern-ireland"),
+    ("northern-ireland", "northern-ireland"),
+    ("scotland", "scotland"),
+    ("scottish", "scotland"),
+    ("england", "england-and-wales"),
+    ("wales", "england-and-wales"),
+    ("welsh", "england-and-wales"),
+)
+
+
+def _weekdays_before(ordinal: int) -> int:
+    # number of Mondays to Fridays with a day number below `ordinal` (day 1 is Monday 1 January 1)
+    weeks, days = divmod(ordinal - 1, 7)
+    return weeks * 5 + min(days, 5)
+
+
+class BankHolidayCalendar:
+    """Bank holidays of each UK division as sorted day-number arrays, queried with binary search."""
+
+    def __init__(self, bank_holidays: dict):
+        """
+        Args:
+            bank_holidays: The GOV.UK bank holidays JSON:
+                {"england-and-wales": {"division": ..., "events": [{"title": ..., "date": "YYYY-MM-DD", ...}]}, ...}
+        """
+        self._days: dict[str, list[int]] = {}
+        self._titles: dict[str, list[str]] = {}
+        # holidays falling on Monday to Friday, for working day counts
+        self._weekday_holidays: dict[str, list[int]] = {}
+        for division, data in bank_holidays.items():
+            events = sorted((date.fromisoformat(event["date"]).toordinal(), event["title"]) for event in data["events"])
+            self._days[division] = [day for day, _ in events]
+            self._titles[division] = [title for _, title in events]
+            self._weekday_holidays[division] = [day for day, _ in events if date.fromordinal(day).weekday() < 5]
+
+    @property
+    def divisions(self) -> list[str]:
+        return list(self._days)
+
+    def _division(self, division: str) -> str:
+        if division not in self._days:
+            raise ValueError(f"Unknown division {division!r}, must be one of {self.divisions}")
+        return division
+
+    def _holiday(self, division: str, i: int) -> tuple[date, str]:
+        return date.fromordinal(self._days[division][i]), self._titles[division][i]
+
+    def is_holiday(self, day: date, division: str = DEFAULT_DIVISION) -> Optional[str]:
+        """The name of the bank holiday on `day`, or None if it is not one."""
+        division = self._division(division)
+        days = self._days[division]
+        i = bisect_left(days, day.toordinal())
+        return self._titles[division][i] if i < len(days) and days[i] == day.toordinal() else None
+
+    def next_holiday(self, day: date, division: str = DEFAULT_DIVISION, inclusive: bool = False) -> Optional[tuple[date, str]]:
+        """The first bank holiday after `day` (or on it, if `inclusive`), or None if there is none in the data."""
+        division = self._division(division)
+        search = bisect_left if inclusive else bisect_right
+        i = search(self._days[division], day.toordinal())
+        return self._holiday(division, i) if i < len(self._days[division]) else None
+
+    def previous_holiday(self, day: date, division: str = DEFAULT_DIVISION, inclusive: bool = False) -> Optional[tuple[date, str]]:
+        """The last bank holiday before `day` (or on it, if `inclusive`), or None if there is none in the data."""
+        division = self._division(division)
+        search = bisect_right if inclusive else bisect_left
+        i = search(self._days[division], day.toordinal()) - 1
+        return self._holiday(division, i) if i >= 0 else None
+
+    def holidays_between(self, start: date, end: date, division: str = DEFAULT_DIVISION) -> list[tuple[date, str]]:
+        """The bank holidays from `start` to `end`, both included."""
+        division = self._division(division)
+        days = self._days[division]
+        first = bisect_left(days, start.toordinal())
+        last = bisect_right(days, end.toordinal())
+        return [self._holiday(division, i) for i in range(first, last)]
+
+    def working_days_between(self, start: date, end: date, division: str = DEFAULT_DIVISION) -> int:
+        """
+        The number of working days (Monday to Friday, not bank holidays) from `start` to `end`, both included.
+
+        Days outside the published years (see `years`) count as having no bank holidays: check
+        `covers` first when that matters.
+        """
+        division = self._division(division)
+        if end < start:
+            return 0
+        weekdays = _weekdays_before(end.toordinal() + 1) - _weekdays_before(start.toordinal())
+        holidays = self._weekday_holidays[division]
+        return weekdays - (bisect_right(holidays, end.toordinal()) - bisect_left(holidays, start.toordinal()))
+
+    def coverage(self, division: str = DEFAULT_DIVISION) -> Optional[tuple[date, date]]:
+        """The first and last bank holiday dates in the data."""
+        days = self._days[self._division(division)]
+        return (date.fromordinal(days[0]), date.fromordinal(days[-1])) if days else None
+
+    def years(self, division: str = DEFAULT_DIVISION) -> Optional[tuple[int, int]]:
+        """The first and last years of the published calendar (GOV.UK publishes whole years)."""
+        coverage = self.coverage(division)
+        return (coverage[0].year, coverage[1].year) if coverage else None
+
+    def covers(self, start: date, end: date, division: str = DEFAULT_DIVISION) -> bool:
+        """Whether the days from `start` to `end` are all in the published years."""
+        years = self.years(division)
+        return years is not None and years[0] <= min(start, end).year and max(start, end).year <= years[1]
+
+
+_ISO_DATE = re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b")
+_TEXT_DATE = re.compile(r"\b(\d{1,2})(?:st|nd|rd|th)?\s+([A-Za-z]{3,9})\s+(\d{4})\b")
+_YEAR = re.compile(r"\b(?:in|for|of)\s+(\d{4})\b")
+
+
+def _parse_dates(text: str) -> list[date]:
+    found = []
+    for match in _ISO_DATE.finditer(text):
+        try:
+            found.append((match.start(), date(int(match.group(1)), int(match.group(2)), int(match.group(3)))))
+        except ValueError:
+            pass
+    for match in _TEXT_DATE.finditer(text):
+        for month_format in ("%d %B %Y", "%d %b %Y"):
+            try:
+                found.append((match.start(), datetime.strptime(f"{match.group(1)} {match.group(2)} {match.group(3)}", month_format).date()))
+                break
+            except ValueError:
+                pass
+    return [day for _, day in sorted(found)]
+
+
+def _parse_division(text: str) -> str:
+    for alias, division in DIVISION_ALIASES:
+        if alias in text:
+            return division
+    return DEFAULT_DIVISION
+
+
+def _format_holiday(holiday: tuple[date, str]) -> str:
+    day, title = holiday
+    return f"{title} on {day:%A %d %B %Y}"
+
+
+def answer_bank_holiday_query(calendar: BankHolidayCalendar, query: str, today: Optional[date] = None) -> str:
+    """
+    Answer a free-text bank holiday question, e.g.
+    "is 2025-12-26 a bank holiday in Scotland", "next bank holiday after 6 May 2025",
+    "working days between 2025-12-22 and 2026-01-02 in Northern Ireland", "bank holidays in 2026".
+
+    Dates are ISO (YYYY-MM-DD) or written out ("26 December 2025"); the division defaults to
+    England and Wales, and the date to today.
+    """
+    text = query.lower()
+    today = today or date.today()
+    division = _parse_division(text)
+    dates = _parse_dates(query)
+    name = division.replace("-", " ").title().replace(" And ", " and ")
+
+    def outside(start: date, end: date) -> Optional[str]:
+        # without the holidays of those years, counts and lists would be wrong, not just incomplete
+        if calendar.covers(start, end, division):
+            return None
+        years = calendar.years(division)
+        published = f" ({years[0]}–{years[1]})" if years else ""
+        dates_asked = f"{start:%d %B %Y}" if start == end else f"{start:%d %B %Y} to {end:%d %B %Y}"
+        return f"Sorry, {dates_asked} is outside the published bank holiday calendar for {name}{published}."
+
+    if "working day" in text or "business day" in text:
+        if len(dates) < 2:
+            return "Please give a start and an end date, e.g. 'working days between 2025-12-22 and 2026-01-02'."
+        start, end = dates[0], dates[1]
+        if message := outside(start, end):
+            return message
+        count = calendar.working_days_between(start, end, division)
+        return f"There are {count} working days from {start:%d %B %Y} to {end:%d %B %Y} (both included) in {name}."
+
+    if len(dates) >= 2 or (_YEAR.search(text) and not dates):
+        if len(dates) >= 2:
+            start, end = dates[0], dates[1]
+        else:
+            year = int(_YEAR.search(text).group(1))
+            start, end = date(year, 1, 1), date(year, 12, 31)
+        if message := outside(start, end):
+            return message
+        holidays = calendar.holidays_between(start, end, division)
+        if not holidays:
+            return f"No bank holidays found in {name} from {start:%d %B %Y} to {end:%d %B %Y}."
+        return f"Bank holidays in {name} from {start:%d %B %Y} to {end:%d %B %Y}:\n" + "\n".join(f"- {_format_holiday(holiday)}" for holiday in holidays)
+
+    day = dates[0] if dates else today
+    if re.search(r"\b(previous|last|before|since)\b", text):
+        holiday = calendar.previous_holiday(day, division)
+        return f"The previous bank holiday in {name} before {day:%d %B %Y} was {_format_holiday(holiday)}." if holiday else f"No earlier bank holiday in the data for {name}."
+    if dates and not re.search(r"\b(next|after|following|upcoming)\b", text):
+        if message := outside(day, day):
+            return message
+        title = calendar.is_holiday(day, division)
+        if title:
+            return f"Yes, {day:%A %d %B %Y} is a bank holiday in {name}: {title}."
+        following = calendar.next_holiday(day, division)
+        answer = f"No, {day:%A %d %B %Y} is not a bank holiday in {name}."
+        return f"{answer} The next one is {_format_holiday(following)}." if following else answer
+    holiday = calendar.next_holiday(day, division)
+    return f"The next bank holiday in {name} after {day:%d %B %Y} is {_format_holiday(holiday)}." if holiday else f"No later bank holiday in the data for {name}."
@@ -0,0 +1,285 @@
+"""
+Run the ReAct agent over many questions concurrently, e.g. for nightly evaluations.
+
+Questions are read from a JSONL file, one `{"id": ..., "question": ...}` per line. Results
+are appended to the output JSONL file as soon as each run finishes, so a crashed or
+interrupted batch can be resumed: IDs already in the output file are skipped.
+
+Usage:
+    python -m react_agents_from_scratch.batch_runner questions.jsonl results.jsonl --concurrency 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import Callable, Optional
+
+from react_agents_from_scratch.async_agent import arun, call_maybe_async
+from react_agents_from_scratch.cassette import CassettePlayer, CassetteRecorder
+from react_agents_from_scratch.context_budget import BudgetedPromptBuffer
+from react_agents_from_scratch.prompt_buffer import PromptBuffer
+from react_agents_from_scratch.rate_limiter import AsyncRateLimiter, rate_limited
+from react_agents_from_scratch.react_agent_naive import format_react_loop
+from react_agents_from_scratch.repeated_actions import ActionMemo
+from react_agents_from_scratch.speculation import SpeculativeActions
+from react_agents_from_scratch.tool_registry import TOOLS, load_tool, load_tools
+from react_agents_from_scratch.tracing import JsonlExporter, configure_tracing
+
+# which provider each tool calls, for per-provider rate limits
+TOOL_PROVIDERS = {name: spec.provider for name, spec in TOOLS.items() if spec.provider}
+
+
+def tool_provider(name: str, tool: Callable) -> Optional[str]:
+    """
+    The provider a tool calls, from the spec of the tool actually loaded: `search_govuk`
+    answered from a local index (`--local-index`) calls no remote API.
+    """
+    spec = getattr(tool, "spec", None)
+    return spec.provider if spec is not None else TOOL_PROVIDERS.get(name)
+
+
+def batch_ask_user(question: str) -> str:
+    """Stand-in for `ask_user` in batch runs, where there is no user to ask."""
+    return "The user is not available to answer questions. Answer with the information you have."
+
+
+def read_questions(path: str) -> list[dict]:
+    with open(path, "r", encoding="utf-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def read_done_ids(path: str) -> set:
+    """
+    IDs already written to the output file (a line cut short by a crash is ignored).
+
+    Runs that failed with an error (e.g. a timeout or a 429) are not done: they are run
+    again, and their new record is appended after the failed one.
+    """
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+                if not record.get("error"):
+                    done.add(record["id"])
+            except (json.JSONDecodeError, KeyError, AttributeError):
+                continue
+    return done
+
+
+def _timed(func: Callable, records: list[dict], name: str) -> Callable:
+    """Wrap a tool so each call appends its duration to `records`."""
+    async def wrapper(arg):
+        start = time.perf_counter()
+        try:
+            return await call_maybe_async(func, arg)
+        finally:
+            records.append({"tool": name, "time": time.perf_counter() - start})
+
+    return wrapper
+
+
+async def run_one(item: dict, make_brain: Callable, prompt_template: str, tools: dict, max_iterations: int, llm_limiter: Optional[AsyncRateLimiter] = None, max_prompt_tokens: Optional[int] = None, chat: bool = False, speculative: bool = False, repeated_actions: Optional[str] = None, cassette=None) -> dict:
+    """
+    Run the agent on one question and return its result record (prompts kept within
+    `max_prompt_tokens` if set; tools started mid-stream by streaming brains if `speculative`;
+    repeated actions reused and escalated as set by `repeated_actions`; LLM and tool calls
+    recorded to or replayed from `cassette`, see `run_batch`).
+    """
+    brain = make_brain()
+    brain_call = brain
+    if cassette is not None:
+        trajectory = cassette.trajectory(item["id"], item["question"], tools=list(tools), max_iterations=max_iterations, max_prompt_tokens=max_prompt_tokens, chat=chat, repeated_actions=repeated_actions)
+        brain_call = trajectory.brain(brain)
+        tools = trajectory.tools(tools)
+    brain_call = rate_limited(brain_call, llm_limiter)
+    tool_calls: list[dict] = []
+    timed_tools = {name: _timed(tool, tool_calls, name) for name, tool in tools.items()}
+    speculation = None
+    if speculative and hasattr(brain, "speculation"):
+        speculation = SpeculativeActions(timed_tools)
+        # a cache wrapper (`llm_cache`) forwards reads to the brain it wraps, but not writes
+        getattr(brain, "brain", brain).speculation = speculation
+    action_memo = None
+    if repeated_actions:
+        action_memo = ActionMemo(escalation=None if repeated_actions == "reuse" else repeated_actions)
+    if max_prompt_tokens:
+        buffer = BudgetedPromptBuffer(prompt_template, item["question"], format_step=format_react_loop, max_prompt_tokens=max_prompt_tokens, chat=chat)
+    else:
+        buffer = PromptBuffer(prompt_template, item["question"], format_step=format_react_loop, chat=chat)
+
+    start = time.perf_counter()
+    error = None
+    try:
+        result = await arun(item["question"], brain_call, prompt_template, timed_tools, max_iterations=max_iterations, prompt_buffer=buffer, speculation=speculation, action_memo=action_memo)
+    except Exception as e:
+        result = None
+        error = f"{type(e).__name__}: {e}"
+
+    llm_calls = getattr(brain, "calls", [])
+    return {
+        "id": item["id"],
+        "question": item["question"],
+        "answer": result[0] if result else None,
+        "trajectory": buffer.steps,
+        "iterations": len(buffer.steps),
+        "timings": {
+            "total_time": time.perf_counter() - start,
+            "llm_calls": [{key: value for key, value in call.items() if key != "usage"} for call in llm_calls],
+            "tool_calls": tool_calls,
+            "speculation": speculation.steps if speculation else None,
+        },
+        "tokens": brain.total_usage() if hasattr(brain, "total_usage") else None,
+        "prompt_sizes": buffer.sizes,
+        "repeated_actions": action_memo.stats() if action_memo else None,
+        "error": error,
+    }
+
+
+async def run_batch(questions: list[dict], output_path: str, make_brain: Callable, prompt_template: str, tools: dict, concurrency: int = 10, max_iterations: int = 10, rate_limits: Optional[dict[str, float]] = None, max_prompt_tokens: Optional[int] = None, chat: bool = False, speculative: bool = False, repeated_actions: Optional[str] = None, cassette=None) -> int:
+    """
+    Run the agent over `questions` with at most `concurrency` runs in flight.
+
+    Args:
+        questions: Items with an "id" and a "question"
+        output_path: JSONL file the results are appended to
+        make_brain: Factory returning a fresh LLM brain for each run
+        prompt_template: The template for the ReAct prompt
+        tools: Dictionary of available (async or sync) tools
+        concurrency: Maximum number of agent runs at the same time
+        max_iterations: Maximum number of iterations per run
+        rate_limits: Calls per second per provider ("openai", "google_cse", "govuk")
+        max_prompt_tokens: Token budget per prompt (see `context_budget`); unlimited if None
+        chat: Send prompts as chat messages with a stable prefix (see `PromptBuffer`)
+        speculative: Start each step's tool while the LLM is still streaming (see `speculation`)
+        repeated_actions: Reuse the observations of repeated actions ("reuse"), and escalate
+            loops of repeats ("final_answer" or "stop", see `repeated_actions`); off if None
+        cassette: A `cassette.CassetteRecorder` recording the LLM and tool calls of each run, or a
+            `cassette.CassettePlayer` answering them from an earlier recording; None for neither
+
+    Returns:
+        int: The number of runs completed
+    """
+    rate_limits = rate_limits or {}
+    limiters = {provider: AsyncRateLimiter(rate) for provider, rate in rate_limits.items() if rate}
+    limited_tools = {name: rate_limited(tool, limiters.get(tool_provider(name, tool))) for name, tool in tools.items()}
+
+    done_ids = read_done_ids(output_path)
+    pending = [item for item in questions if item["id"] not in done_ids]
+    print(f"{len(done_ids)} questions already done, {len(pending)} to run.")
+
+    queue: asyncio.Queue = asyncio.Queue()
+    for item in pending:
+        queue.put_nowait(item)
+    completed = 0
+
+    with open(output_path, "a", encoding="utf-8") as output:
+        # start on a fresh line if a crash left a partial record behind
+        if output.tell() > 0:
+            with open(output_path, "rb") as existing:
+                existing.seek(-1, os.SEEK_END)
+                if existing.read(1) != b"\n":
+                    output.write("\n")
+
+        async def worker():
+            nonlocal completed
+            while True:
+                try:
+                    item = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                record = await run_one(item, make_brain, prompt_template, limited_tools, max_iterations, llm_limiter=limiters.get("openai"), max_prompt_tokens=max_prompt_tokens, chat=chat, speculative=speculative, repeated_actions=repeated_actions, cassette=cassette)
+                output.write(json.dumps(record, ensure_ascii=False) + "\n")
+                output.flush()
+                completed += 1
+                print(f"[{completed}/{len(pending)}] {item['id']}: {'answered' if record['answer'] else 'no answer'}")
+
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    return completed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the ReAct agent over a JSONL file of questions.")
+    parser.add_argument("questions", help="Input JSONL file, one {\"id\", \"question\"} object per line")
+    parser.add_argument("output", help="Output JSONL file (appended to; finished IDs are skipped)")
+    parser.add_argument("--concurrency", type=int, default=10, help="Maximum number of agent runs at the same time")
+    parser.add_argument("--max-iterations", type=int, default=10)
+    parser.add_argument("--openai-rps", type=float, default=None, help="Rate limit for LLM calls (per second)")
+    parser.add_argument("--google-rps", type=float, default=None, help="Rate limit for Google Custom Search calls (per second)")
+    parser.add_argument("--govuk-rps", type=float, default=None, help="Rate limit for GOV.UK search calls (per second)")
+    parser.add_argument("--stream", action="store_true", help="Stream LLM completions and cut them at the end of the step")
+    parser.add_argument("--llm-cache", default=None, help="SQLite file caching LLM responses across runs")
+    parser.add_argument("--replay-only", action="store_true", help="Only use cached LLM responses (requires --llm-cache)")
+    parser.add_argument("--latency-budget", type=float, default=None, help="Seconds allowed for fetching the pages of a GOV.UK search (unlimited by default)")
+    parser.add_argument("--max-prompt-tokens", type=int, default=None, help="Token budget per prompt: large observations and older steps are shortened to fit")
+    parser.add_argument("--chat-layout", action="store_true", help="Send the static prompt and each step as separate chat messages, for provider prompt caching")
+    parser.add_argument("--speculative", action="store_true", help="With --stream, start each step's tool as soon as its Action Input line is complete")
+    parser.add_argument("--repeated-actions", choices=["reuse", "final_answer", "stop"], default=None, help="Reuse the observations of repeated actions, and push loops of repeats to a final answer or stop them")
+    parser.add_argument("--trace", default=None, help="Write a span per run, iteration, LLM call, tool call, page fetch and parse to this JSONL file")
+    parser.add_argument("--record-cassette", default=None, help="Record every LLM and tool call to this cassette file (see cassette), overwriting it")
+    parser.add_argument("--replay-cassette", default=None, help="Answer LLM and tool calls from this cassette file instead of OpenAI and the tools")
+    parser.add_argument("--local-index", default=None, help="Answer search_govuk from this local index (see local_search) instead of Google and live pages")
+    parser.add_argument("--prompt", default="react_agents_from_scratch/openai_react/prompts/react_agent_prompt.txt")
+    args = parser.parse_args()
+    if args.replay_only and not args.llm_cache:
+        parser.error("--replay-only requires --llm-cache")
+
+    from react_agents_from_scratch.http_client import close_async_session
+    from react_agents_from_scratch.openai_react import call_llm
+    from react_agents_from_scratch.llm_cache import AsyncCachedLLMBrain, LLMResponseCache
+    from react_agents_from_scratch.local_search import set_local_index
+    from react_agents_from_scratch.utils import read_prompt_from_txt
+
+    make_brain = lambda: call_llm.AsyncLLMBrain(stream=args.stream)
+    cache = None
+    if args.llm_cache:
+        cache = LLMResponseCache(args.llm_cache)
+        make_brain = lambda: AsyncCachedLLMBrain(call_llm.AsyncLLMBrain(stream=args.stream), cache, replay_only=args.replay_only)
+
+    tools = load_tools(asynchronous=True, search_govuk={"latency_budget": args.latency_budget})
+    tools['ask_user'] = batch_ask_user
+    if args.trace:
+        configure_tracing(JsonlExporter(args.trace))
+    cassette = None
+    if args.record_cassette:
+        cassette = CassetteRecorder(args.record_cassette)
+    elif args.replay_cassette:
+        cassette = CassettePlayer(args.replay_cassette)
+    if args.local_index:
+        set_local_index(args.local_index)
+        tools['search_govuk'] = load_tool('search_govuk_local')
+    async def run():
+        try:
+            return await run_batch(
+                questions=read_questions(args.questions),
+                output_path=args.output,
+                make_brain=make_brain,
+                prompt_template=read_prompt_from_txt(args.prompt),
+                tools=tools,
+                concurrency=args.concurrency,
+                max_iterations=args.max_iterations,
+                rate_limits={"openai": args.openai_rps, "google_cse": args.google_rps, "govuk": args.govuk_rps},
+                max_prompt_tokens=args.max_prompt_tokens,
+                chat=args.chat_layout,
+                speculative=args.speculative,
+                repeated_actions=args.repeated_actions,
+                cassette=cassette,
+            )
+        finally:
+            await close_async_session()
+            if isinstance(cassette, CassetteRecorder):
+                cassette.close()
+
+    completed = asyncio.run(run())
+    print(f"Done: {completed} runs written to {args.output}")
+    if cache:
+        print(f"LLM cache: {cache.stats()}")
+    if isinstance(cassette, CassettePlayer):
+        print(f"Cassette: {cassette.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+"""
+Record and replay whole agent trajectories: every LLM call and tool call of a run.
+
+A recording wraps the LLM brain and the tools of each run and writes their requests and
+responses to a cassette, a gzip-compressed JSONL file ending with an index of the records
+by request hash. A replay serves the recorded responses in place of the brain and the
+tools, with no network and no waiting, so the loop (parser, prompt building, tool fan-out)
+can be profiled on real trajectories and two builds compared on the same traffic.
+
+LLM calls are matched by their position in the run (the n-th call of a trajectory), so a
+replay still works when prompt building changes; prompts that differ from the recorded ones
+are counted (`CassettePlayer.stats()["prompt_mismatches"]`). Tool calls are matched by tool
+name and input, in the order they were made.
+
+Example:
+    with CassetteRecorder("runs.cassette.jsonl.gz") as recorder:
+        trajectory = recorder.trajectory("q1", question)
+        react_agent(question, trajectory.brain(brain), prompt_template, trajectory.tools(tools))
+
+    player = CassettePlayer("runs.cassette.jsonl.gz")
+    trajectory = player.trajectory("q1", question)
+    react_agent(question, trajectory.brain(brain), prompt_template, trajectory.tools(tools))
+
+The batch runner records with `--record-cassette` and replays with `--replay-cassette`, and
+`benchmarks/bench_replay.py` replays a cassette through `react_agent` and profiles it.
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import threading
+import time
+import zlib
+from typing import Any, Callable, Optional
+
+from react_agents_from_scratch.utils import is_async_callable
+
+
+class CassetteMissError(KeyError):
+    """Raised on replay when a call is not in the cassette (the run took another path)."""
+
+
+class ReplayedError(Exception):
+    """A recorded LLM or tool error, raised again on replay with the original message."""
+
+
+def _hash(*parts) -> str:
+    payload = json.dumps(parts, ensure_ascii=False)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def llm_key(trajectory_id: str, call: int) -> str:
+    return _hash(trajectory_id, "llm", call)
+
+
+def tool_key(trajectory_id: str, name: str, action_input: str) -> str:
+    return _hash(trajectory_id, "tool", name, action_input)
+
+
+def prompt_hash(prompt) -> str:
+    return _hash(prompt)
+
+
+class CassetteRecorder:
+    """
+    Write the LLM and tool calls of agent runs to a cassette file (overwritten if it exists).
+
+    The index is written when the recorder is closed; a cassette left without one (e.g. by
+    a crash) can still be replayed, from the records written before the crash.
+    """
+
+    def __init__(self, path: str, compresslevel: int = 6):
+        self.path = path
+        self._file = gzip.open(path, "wt", encoding="utf-8", compresslevel=compresslevel)
+        self._lock = threading.Lock()
+        self._lines = 0
+        self._index: dict[str, list[int]] = {}
+        self._trajectories: dict[str, dict] = {}
+
+    def trajectory(self, trajectory_id: str, question: str, **meta) -> "_RecordingTrajectory":
+        """
+        Start recording a run.
+
+        Args:
+            trajectory_id: The run's ID (e.g. the question ID), unique in the cassette
+            question: The user's question
+            meta: Settings of the run, kept for replays (e.g. max_iterations, chat)
+        """
+        self._write({"kind": "trajectory", "trajectory": trajectory_id, "question": question, "meta": meta})
+        with self._lock:
+            self._trajectories[trajectory_id] = {"question": question, "meta": meta}
+        return _RecordingTrajectory(self, trajectory_id)
+
+    def _write(self, record: dict, key: Optional[str] = None) -> None:
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + "\n")
+            if key is not None:
+                self._index.setdefault(key, []).append(self._lines)
+            self._lines += 1
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(json.dumps({"index": self._index, "trajectories": self._trajectories, "records": self._lines}, ensure_ascii=False) + "\n")
+            self._file.close()
+
+    def __enter__(self) -> "CassetteRecorder":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class _RecordingTrajectory:
+    def __init__(self, recorder: CassetteRecorder, trajectory_id: str):
+        self.recorder = recorder
+        self.trajectory_id = trajectory_id
+        self._llm_calls = 0
+
+    def _record(self, record: dict, key: str, start: float, response: Any, error: Optional[BaseException]) -> None:
+        record["time"] = round(time.perf_counter() - start, 6)
+        if error is not None:
+            record["error"] = str(error)
+        else:
+            record["response"] = response
+        self.recorder._write(record, key)
+
+    def _llm_record(self) -> tuple[dict, str]:
+        call = self._llm_calls
+        self._llm_calls += 1
+        record = {"kind": "llm", "trajectory": self.trajectory_id, "call": call}
+        return record, llm_key(self.trajectory_id, call)
+
+    def brain(self, llm_brain_call: Callable) -> Callable:
+        """`llm_brain_call` (sync or async), recording each call."""
+        def start(prompt) -> tuple[dict, str]:
+            record, key = self._llm_record()
+            record["prompt_hash"] = prompt_hash(prompt)
+            return record, key
+
+        if is_async_callable(llm_brain_call):
+            async def arecording_brain(prompt):
+                record, key = start(prompt)
+                started = time.perf_counter()
+                try:
+                    response = await llm_brain_call(prompt)
+                except Exception as e:
+                    self._record(record, key, started, None, e)
+                    raise
+                self._record(record, key, started, response, None)
+                return response
+            return arecording_brain
+
+        def recording_brain(prompt):
+            record, key = start(prompt)
+            started = time.perf_counter()
+            try:
+                response = llm_brain_call(prompt)
+            except Exception as e:
+                self._record(record, key, started, None, e)
+                raise
+            self._record(record, key, started, response, None)
+            return response
+        return recording_brain
+
+    def tools(self, tools: dict) -> dict:
+        """The (sync or async) `tools`, recording each call."""
+        return {name: self._tool(name, tool) for name, tool in tools.items()}
+
+    def _tool(self, name: str, tool: Callable) -> Callable:
+        def start(action_input: str) -> tuple[dict, str]:
+            record = {"kind": "tool", "trajectory": self.trajectory_id, "name": name, "input": action_input}
+            return record, tool_key(self.trajectory_id, name, action_input)
+
+        if is_async_callable(tool):
+            async def arecording_tool(action_input):
+                record, key = start(action_input)
+                started = time.perf_counter()
+                try:
+                    observation = await tool(action_input)
+                except Exception as e:
+                    self._record(record, key, started, None, e)
+                    raise
+                self._record(record, key, started, observation, None)
+                return observation
+            return arecording_tool
+
+        def recording_tool(action_input):
+            record, key = start(action_input)
+            started = time.perf_counter()
+            try:
+                observation = tool(action_input)
+            except Exception as e:
+                self._record(record, key, started, None, e)
+                raise
+            self._record(record, key, started, observation, None)
+            return observation
+        return recording_tool
+
+
+def _read_lines(path: str) -> list[bytes]:
+    """The lines of a gzip file, up to where it was cut short if it was not closed properly."""
+    decompressor = zlib.decompressobj(wbits=31)
+    chunks = []
+    with open(path, "rb") as file:
+        while block := file.read(1 << 20):
+            try:
+                chunks.append(decompressor.decompress(block))
+            except zlib.error:
+                break
+    data = b"".join(chunks)
+    # a partial last line is dropped
+    return data[:data.rfind(b"\n") + 1].splitlines()
+
+
+class CassettePlayer:
+    """
+    Replay the LLM and tool calls recorded in a cassette.
+
+    Records are decoded only when they are first looked up, through the cassette's index.
+    """
+
+    def __init__(self, path: str, realtime: bool = False):
+        """
+        Args:
+            path: The cassette file
+            realtime: Take as long as the recorded calls took, instead of answering at once
+        """
+        self.path = path
+        self.realtime = realtime
+        self._lines = _read_lines(path)
+        self._records: dict[int, dict] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.prompt_mismatches = 0
+        footer = json.loads(self._lines[-1]) if self._lines and self._lines[-1].startswith(b'{"index"') else None
+        if footer is not None:
+            self._lines.pop()
+            self.index = footer["index"]
+            self.trajectories = footer["trajectories"]
+        else:
+            self.index, self.trajectories = self._build_index()
+
+    def _build_index(self) -> tuple[dict[str, list[int]], dict[str, dict]]:
+        index: dict[str, list[int]] = {}
+        trajectories = {}
+        for number, line in enumerate(self._lines):
+            record = json.loads(line)
+            if record["kind"] == "trajectory":
+                trajectories[record["trajectory"]] = {"question": record["question"], "meta": record["meta"]}
+            elif record["kind"] == "llm":
+                index.setdefault(llm_key(record["trajectory"], record["call"]), []).append(number)
+            else:
+                index.setdefault(tool_key(record["trajectory"], record["name"], record["input"]), []).append(number)
+        return index, trajectories
+
+    def record(self, key: str, occurrence: int) -> Optional[dict]:
+        """The `occurrence`-th record (from 0) stored under `key`, or None."""
+        numbers = self.index.get(key)
+        if not numbers or occurrence >= len(numbers):
+            with self._lock:
+                self.misses += 1
+            return None
+        number = numbers[occurrence]
+        with self._lock:
+            self.hits += 1
+            if number not in self._records:
+                self._records[number] = json.loads(self._lines[number])
+            return self._records[number]
+
+    def tool_names(self) -> list[str]:
+        """The names of the tools called in the cassette."""
+        names = {json.loads(line)["name"] for line in self._lines if b'"kind": "tool"' in line}
+        return sorted(names)
+
+    def trajectory(self, trajectory_id: str, question: Optional[str] = None, **meta) -> "_ReplayingTrajectory":
+        """
+        Replay the run recorded as `trajectory_id` (its question is checked if given).
+
+        `meta` is ignored, so that recorders and players can be used alike: the settings
+        of the recorded run are in `trajectories[trajectory_id]["meta"]`.
+        """
+        recorded = self.trajectories.get(trajectory_id)
+        if recorded is None:
+            raise CassetteMissError(f"No trajectory {trajectory_id!r} in {self.path}")
+        if question is not None and question != recorded["question"]:
+            raise CassetteMissError(f"Trajectory {trajectory_id!r} was recorded for another question: {recorded['question']!r}")
+        return _ReplayingTrajectory(self, trajectory_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "trajectories": len(self.trajectories),
+                "records": len(self._lines),
+                "hits": self.hits,
+                "misses": self.misses,
+                "prompt_mismatches": self.prompt_mismatches,
+            }
+
+
+class _ReplayingTrajectory:
+    def __init__(self, player: CassettePlayer, trajectory_id: str):
+        self.player = player
+        self.trajectory_id = trajectory_id
+        self._llm_calls = 0
+        # calls served so far per tool key, as a tool can be called again with the same input
+        self._tool_calls: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _llm_response(self, prompt) -> dict:
+        with self._lock:
+            call = self._llm_calls
+            self._llm_calls += 1
+        record = self.player.record(llm_key(self.trajectory_id, call), 0)
+        if record is None:
+            raise CassetteMissError(f"No LLM call {call} recorded for trajectory {self.trajectory_id!r}")
+        if record.get("prompt_hash") != prompt_hash(prompt):
+            with self.player._lock:
+                self.player.prompt_mismatches += 1
+        return record
+
+    def _tool_response(self, name: str, action_input: str) -> dict:
+        key = tool_key(self.trajectory_id, name, action_input)
+        with self._lock:
+            occurrence = self._tool_calls.get(key, 0)
+            self._tool_calls[key] = occurrence + 1
+        # called more often than when recorded: serve the last recorded result again
+        recorded = len(self.player.index.get(key, ()))
+        record = self.player.record(key, min(occurrence, recorded - 1) if recorded else 0)
+        if record is None:
+            raise CassetteMissError(f"No {name} call with input {action_input!r} recorded for trajectory {self.trajectory_id!r}")
+        return record
+
+    @staticmethod
+    def _result(record: dict) -> Any:
+        if "error" in record:
+            raise ReplayedError(record["error"])
+        return record["response"]
+
+    def brain(self, llm_brain_call: Optional[Callable] = None) -> Callable:
+        """A brain answering with the recorded responses; async if `llm_brain_call` is (it is never called)."""
+        realtime = self.player.realtime
+
+        if llm_brain_call is not None and is_async_callable(llm_brain_call):
+            async def areplaying_brain(prompt):
+                record = self._llm_response(prompt)
+                if realtime:
+                    await asyncio.sleep(record["time"])
+                return self._result(record)
+            return areplaying_brain
+
+        def replaying_brain(prompt):
+            record = self._llm_response(prompt)
+            if realtime:
+                time.sleep(record["time"])
+            return self._result(record)
+        return replaying_brain
+
+    def tools(self, tools: dict) -> dict:
+        """Stand-ins for `tools` answering with the recorded observations; async for the async ones."""
+        return {name: self._tool(name, tool) for name, tool in tools.items()}
+
+    def _tool(self, name: str, tool: Optional[Callable]) -> Callable:
+        realtime = self.player.realtime
+
+        if tool is not None and is_async_callable(tool):
+            async def areplaying_tool(action_input):
+                record = self._tool_response(name, action_input)
+                if realtime:
+                    await asyncio.sleep(record["time"])
+                return self._result(record)
+            return areplaying_tool
+
+        def replaying_tool(action_input):
+            record = self._tool_response(name, action_input)
+            if realtime:
+                time.sleep(record["time"])
+            return self._result(record)
+        return replaying_tool
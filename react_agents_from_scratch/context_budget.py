@@ -0,0 +1,254 @@
+"""
+Token-budgeted prompts for the ReAct loop.
+
+Tool observations (whole GOV.UK pages for `search_govuk`) are appended to every later prompt,
+so without a limit prompts grow with each iteration. `BudgetedPromptBuffer` is a drop-in
+`PromptBuffer` that keeps the prompt within a token budget:
+
+- observations longer than `max_observation_tokens` are cut down to the passages most
+  relevant to the question and the step's Action Input (BM25 scoring over the passages of
+  the observation), and
+- when the prompt goes over `max_prompt_tokens`, the observations of the oldest steps are
+  shrunk to short stubs until the prompt is back below `LOW_WATER` of the budget.
+
+Steps are still rendered with the buffer's `format_step` (`format_react_loop`), and the full,
+uncut steps stay available in `steps` and `conversation_text`.
+
+Example:
+    buffer = BudgetedPromptBuffer(prompt_template, question, format_step=format_react_loop, max_prompt_tokens=6000)
+    react_agent(question, llm_brain_call, prompt_template, tools, prompt_buffer=buffer)
+    buffer.sizes  # prompt size per iteration, with the number of stubbed steps
+"""
+import math
+import re
+from collections import Counter
+from typing import Callable, Optional
+
+from react_agents_from_scratch.prompt_buffer import PromptBuffer, estimate_tokens
+from react_agents_from_scratch.text_terms import tokenize
+
+DEFAULT_MAX_PROMPT_TOKENS = 8000
+DEFAULT_MAX_OBSERVATION_TOKENS = 1500
+PASSAGE_TOKENS = 80
+STUB_TOKENS = 40
+# once over budget, older steps are stubbed until the prompt is below this fraction of the
+# budget, so that the start of the prompt then stays the same for a few iterations
+LOW_WATER = 0.75
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_BM25_K1 = 1.2
+_BM25_B = 0.75
+
+
+def _cut(text: str, max_chars: int) -> list[str]:
+    # cut text without sentence ends (tables, lists) at whitespace
+    pieces = []
+    while len(text) > max_chars:
+        cut = text.rfind(" ", 0, max_chars)
+        cut = cut if cut > 0 else max_chars
+        pieces.append(text[:cut])
+        text = text[cut:].lstrip()
+    return pieces + [text] if text else pieces
+
+
+def split_passages(text: str, passage_tokens: int = PASSAGE_TOKENS) -> list[tuple[int, str]]:
+    """
+    Split text into passages of up to about `passage_tokens` tokens.
+
+    Short lines (titles, URLs) are passages of their own; long lines are split into groups
+    of whole sentences.
+
+    Returns:
+        list[tuple[int, str]]: (line number, passage) pairs, in order
+    """
+    max_chars = passage_tokens * 4
+    passages = []
+    for line_no, line in enumerate(text.split("\n")):
+        if len(line) <= max_chars:
+            passages.append((line_no, line))
+            continue
+        current = ""
+        for sentence in _SENTENCE_END.split(line):
+            for piece in _cut(sentence, max_chars):
+                if current and len(current) + 1 + len(piece) > max_chars:
+                    passages.append((line_no, current))
+                    current = piece
+                else:
+                    current = f"{current} {piece}" if current else piece
+        if current:
+            passages.append((line_no, current))
+    return passages
+
+
+def score_passages(passages: list[str], query: str) -> list[float]:
+    """BM25 score of each passage for the query, with the passages as the document collection."""
+    query_terms = set(tokenize(query))
+    documents = [Counter(tokenize(passage)) for passage in passages]
+    if not query_terms or not documents:
+        return [0.0] * len(passages)
+    lengths = [sum(document.values()) for document in documents]
+    average_length = sum(lengths) / len(lengths) or 1.0
+    idf = {}
+    for term in query_terms:
+        n_containing = sum(1 for document in documents if term in document)
+        idf[term] = math.log(1 + (len(documents) - n_containing + 0.5) / (n_containing + 0.5))
+    scores = []
+    for document, length in zip(documents, lengths):
+        score = 0.0
+        for term in query_terms:
+            frequency = document.get(term)
+            if not frequency:
+                continue
+            score += idf[term] * frequency * (_BM25_K1 + 1) / (frequency + _BM25_K1 * (1 - _BM25_B + _BM25_B * length / average_length))
+        scores.append(score)
+    return scores
+
+
+def extract_relevant(text: str, query: str, max_tokens: int, passage_tokens: int = PASSAGE_TOKENS) -> str:
+    """
+    Cut `text` down to about `max_tokens` tokens, keeping the passages most relevant to `query`.
+
+    Kept passages stay in their original order; left out stretches are shown as "[...]".
+    Text already within `max_tokens` is returned unchanged.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    passages = split_passages(text, passage_tokens)
+    scores = score_passages([passage for _, passage in passages], query)
+
+    kept = set()
+    used = 0
+    # highest scores first; earlier passages first among equal scores
+    for i in sorted(range(len(passages)), key=lambda i: (-scores[i], i)):
+        cost = estimate_tokens(passages[i][1]) + 1
+        if used + cost <= max_tokens:
+            kept.add(i)
+            used += cost
+
+    lines: list[str] = []
+    current_line = None
+    skipped = False
+    for i, (line_no, passage) in enumerate(passages):
+        if i not in kept:
+            skipped = True
+            continue
+        if skipped and lines:
+            lines[-1] += " [...]"
+        if line_no == current_line:
+            lines[-1] += f" {passage}"
+        else:
+            lines.append(passage)
+            current_line = line_no
+        skipped = False
+    if skipped:
+        lines.append("[...]")
+    note = f"[Shortened to the passages most relevant to the question: {len(kept)} of {len(passages)} passages]"
+    return "\n".join([note] + lines)
+
+
+def stub_observation(observation: str, max_tokens: int = STUB_TOKENS) -> str:
+    """A short stub standing in for an older observation."""
+    if estimate_tokens(observation) <= max_tokens:
+        return observation
+    start = _cut(" ".join(observation.split()), max_tokens * 4)[0]
+    return f"[Earlier observation shortened, about {estimate_tokens(observation)} tokens] {start} [...]"
+
+
+class BudgetedPromptBuffer(PromptBuffer):
+    """
+    `PromptBuffer` keeping the prompt within a token budget.
+
+    New steps are appended to the prompt as in `PromptBuffer`; the prompt is only rebuilt
+    when older steps have to be shrunk to stubs to get back within the budget.
+    """
+
+    def __init__(
+        self,
+        prompt_template: str,
+        question: str,
+        format_step: Callable[[dict[str, str]], str],
+        max_prompt_tokens: int = DEFAULT_MAX_PROMPT_TOKENS,
+        max_observation_tokens: int = DEFAULT_MAX_OBSERVATION_TOKENS,
+        chat: bool = False,
+    ):
+        self.question = question
+        self.max_prompt_tokens = max_prompt_tokens
+        self.max_observation_tokens = max_observation_tokens
+        self.stubbed_steps = 0
+        # steps as they appear in the prompt, and each step rendered in full
+        self.prompt_steps: list[dict[str, str]] = []
+        self._full_rendered: list[str] = []
+        self._prompt_rendered: list[str] = []
+        super().__init__(prompt_template, question, format_step, chat=chat)
+
+    @property
+    def conversation_text(self) -> str:
+        """All steps, uncut, formatted and joined with a blank line."""
+        return "\n\n".join(self._full_rendered)
+
+    def append(self, react_step: dict[str, str], rendered: Optional[str] = None) -> str:
+        """
+        Append a ReAct step, shortening its observation and stubbing older steps as needed.
+
+        Args:
+            react_step: The parsed (and possibly completed with an observation) step
+            rendered: The full step already rendered by the caller, if available
+
+        Returns:
+            str: The full rendered step
+        """
+        if rendered is None:
+            rendered = self.format_step(react_step)
+        prompt_step = self._shorten_observation(react_step)
+        prompt_rendered = rendered if prompt_step is react_step else self.format_step(prompt_step)
+
+        self.steps.append(react_step)
+        self._full_rendered.append(rendered)
+        self.prompt_steps.append(prompt_step)
+        self._prompt_rendered.append(prompt_rendered)
+
+        chunk = f"\n{prompt_rendered}" if len(self.steps) == 1 else f"\n\n{prompt_rendered}"
+        if estimate_tokens(self._prompt + chunk) <= self.max_prompt_tokens:
+            self._prompt += chunk
+            self._bytes += len(chunk.encode("utf-8"))
+            self._add_step_messages(prompt_step)
+        else:
+            self._stub_older_steps()
+        self._record_size()
+        return rendered
+
+    def _shorten_observation(self, react_step: dict[str, str]) -> dict[str, str]:
+        observation = react_step.get("observation")
+        if not observation or estimate_tokens(observation) <= self.max_observation_tokens:
+            return react_step
+        query = f"{self.question} {react_step.get('action_input', '')}"
+        return {**react_step, "observation": extract_relevant(observation, query, self.max_observation_tokens)}
+
+    def _stub_older_steps(self) -> None:
+        target = self.max_prompt_tokens * LOW_WATER
+        # never the latest step: its observation is what the next LLM call needs
+        while self.stubbed_steps < len(self.steps) - 1:
+            if estimate_tokens(self._render_prompt()) <= target:
+                break
+            i = self.stubbed_steps
+            step = self.prompt_steps[i]
+            if step.get("observation"):
+                step = {**step, "observation": stub_observation(self.steps[i]["observation"])}
+                self.prompt_steps[i] = step
+                self._prompt_rendered[i] = self.format_step(step)
+            self.stubbed_steps += 1
+        self._prompt = self._render_prompt()
+        self._bytes = len(self._prompt.encode("utf-8"))
+        self._messages = None
+
+    def _prompt_steps(self) -> list[dict[str, str]]:
+        return self.prompt_steps
+
+    def _render_prompt(self) -> str:
+        if not self._prompt_rendered:
+            return self.header
+        return f"{self.header}\n" + "\n\n".join(self._prompt_rendered)
+
+    def _record_size(self) -> None:
+        super()._record_size()
+        self.sizes[-1]["stubbed_steps"] = self.stubbed_steps
@@ -0,0 +1,229 @@
+"""
+Fast extraction of the main content text of GOV.UK pages.
+
+Only the `<main>` element of a page is used by the tools, so instead of building a full
+BeautifulSoup tree of the page, the raw HTML is cut down to the `<main>` element first and
+then parsed with:
+
+- lxml (C, fast), when it is installed, or
+- a streaming `html.parser` tokenizer that keeps only text, without building any tree.
+
+Boilerplate inside `<main>` (navigation, scripts, cookie banners, related links, print and
+share links, feedback forms) is left out of the text.
+"""
+import re
+from functools import cache
+from html.parser import HTMLParser
+from importlib.util import find_spec
+from typing import Optional
+
+# elements whose content is never part of the page text
+SKIPPED_TAGS = frozenset({"nav", "script", "style", "noscript", "template", "svg", "aside", "button"})
+# GOV.UK design system components that are boilerplate rather than guidance
+SKIPPED_CLASSES = re.compile(
+    r"cookie-banner|related-navigation|contextual-sidebar|contextual-footer|print-link|"
+    r"feedback|single-page-notification-button|share-links|govuk-skip-link|step-nav-related"
+)
+VOID_TAGS = frozenset({"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source", "track", "wbr"})
+
+_MAIN_START = re.compile(r"<main[\s>/]", re.IGNORECASE)
+_MAIN_END = re.compile(r"</main\s*>", re.IGNORECASE)
+
+
+class MainEndScanner:
+    """
+    Incremental scanner of raw HTML bytes that tells when the `<main>` element has been closed.
+
+    Only `<main>` / `</main>` tags are tracked (with nesting), so the body of a page can be
+    read chunk by chunk and the download stopped once the main content is complete.
+
+    Example:
+        scanner = MainEndScanner()
+        for chunk in chunks:
+            if scanner.feed(chunk):
+                break  # everything after </main> is not needed
+    """
+
+    _TAG = re.compile(rb"<(/?)main[\s>/]", re.IGNORECASE)
+    # longest tag prefix that can be cut by a chunk boundary: "</main" plus its next byte
+    _TAIL = 6
+
+    def __init__(self):
+        self.depth = 0
+        self.found_main = False
+        self.done = False
+        self._tail = b""
+
+    def feed(self, chunk: bytes) -> bool:
+        """Scan the next chunk; return True once the (outermost) `</main>` has been seen."""
+        if self.done:
+            return True
+        window = self._tail + chunk
+        for match in self._TAG.finditer(window):
+            # tags lying wholly in the tail were counted with the previous chunk
+            if match.end() <= len(self._tail):
+                continue
+            if match.group(1):
+                if self.depth:
+                    self.depth -= 1
+                    if not self.depth:
+                        self.done = True
+                        return True
+            else:
+                self.found_main = True
+                self.depth += 1
+        self._tail = window[-self._TAIL:]
+        return False
+
+
+def _is_boilerplate(tag: str, attrs) -> bool:
+    if tag in SKIPPED_TAGS:
+        return True
+    for name, value in attrs:
+        if name == "hidden":
+            return True
+        if name in ("class", "id") and value and SKIPPED_CLASSES.search(value):
+            return True
+    return False
+
+
+def main_slice(html: str) -> Optional[str]:
+    """Cut the raw HTML down to the `<main>` element (and whatever follows it), or None if there is none."""
+    start = _MAIN_START.search(html)
+    if start is None:
+        return None
+    # the last closing tag, in case <main> elements are nested
+    end = None
+    for end in _MAIN_END.finditer(html, start.start()):
+        pass
+    return html[start.start():end.end() if end else len(html)]
+
+
+class MainTextParser(HTMLParser):
+    """
+    Streaming tokenizer that collects the text of the first `<main>` element.
+
+    Text is kept only inside `<main>`, outside boilerplate elements; no tree is built.
+    HTML can be fed in chunks: `done` becomes True once `</main>` has been seen, after
+    which the rest of the page does not need to be read.
+
+    Example:
+        parser = MainTextParser()
+        parser.feed(html)
+        parser.text()  # like soup.find('main').get_text(separator=' ', strip=True)
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.found_main = False
+        self.done = False
+        self._main_depth = 0
+        # boilerplate element being skipped, and how deeply it is nested in itself
+        self._skip_tag: Optional[str] = None
+        self._skip_depth = 0
+        self._run: list[str] = []
+        self._pieces: list[str] = []
+
+    def _flush(self) -> None:
+        # text between two tags is one string, as in BeautifulSoup
+        if self._run:
+            piece = "".join(self._run).strip()
+            if piece:
+                self._pieces.append(piece)
+            self._run = []
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        self._flush()
+        if tag == "main":
+            self.found_main = True
+            self._main_depth += 1
+            return
+        if not self._main_depth or tag in VOID_TAGS:
+            return
+        if self._skip_tag is not None:
+            if tag == self._skip_tag:
+                self._skip_depth += 1
+        elif _is_boilerplate(tag, attrs):
+            self._skip_tag = tag
+            self._skip_depth = 1
+
+    def handle_startendtag(self, tag, attrs):
+        self._flush()
+
+    def handle_endtag(self, tag):
+        if self.done:
+            return
+        self._flush()
+        if tag == "main" and self._main_depth:
+            self._main_depth -= 1
+            if not self._main_depth:
+                self.done = True
+        elif tag == self._skip_tag:
+            self._skip_depth -= 1
+            if not self._skip_depth:
+                self._skip_tag = None
+
+    def handle_data(self, data):
+        if self._main_depth and self._skip_tag is None and not self.done:
+            self._run.append(data)
+
+    def text(self) -> Optional[str]:
+        """The text collected so far, or None if no `<main>` element was found."""
+        self._flush()
+        return " ".join(self._pieces) if self.found_main else None
+
+
+def _extract_with_parser(html: str) -> Optional[str]:
+    parser = MainTextParser()
+    parser.feed(html)
+    return parser.text()
+
+
+@cache
+def lxml_available() -> bool:
+    """True if lxml is installed. It is only imported by the first lxml extraction."""
+    return find_spec("lxml") is not None
+
+
+def _extract_with_lxml(html: str) -> Optional[str]:
+    import lxml.html
+
+    root = lxml.html.fromstring(html)
+    main = root if root.tag == "main" else root.find(".//main")
+    if main is None:
+        return None
+    boilerplate = [
+        element for element in main.iter()
+        if not isinstance(element.tag, str)
+        or _is_boilerplate(element.tag, element.attrib.items())
+    ]
+    for element in boilerplate:
+        if element.getparent() is not None:
+            element.drop_tree()
+    return " ".join(piece.strip() for piece in main.itertext() if piece.strip())
+
+
+def extract_main_text(html: str, backend: str = "auto") -> Optional[str]:
+    """
+    Return the text of the page's `<main>` element without boilerplate, or None if it has none.
+
+    Args:
+        html: The page HTML
+        backend: "lxml", "stream" (pure Python tokenizer), or "auto" (lxml if installed)
+    """
+    if backend == "lxml" and not lxml_available():
+        raise ImportError("the lxml backend requires lxml: pip install lxml")
+    main_html = main_slice(html)
+    if main_html is None:
+        return None
+    if backend == "lxml" or (backend == "auto" and lxml_available()):
+        from lxml import etree
+
+        try:
+            return _extract_with_lxml(main_html)
+        except (etree.ParserError, ValueError):
+            # e.g. an empty document: fall back to the tokenizer
+            pass
+    return _extract_with_parser(main_html)
@@ -0,0 +1,188 @@
+"""
+Process-wide, pooled HTTP clients shared by all tools and page fetchers.
+
+- `get_session()`: a `requests.Session` with keep-alive connection pools, default
+  connect/read timeouts and retries with exponential backoff on 429 and 5xx responses.
+- `get_async_session()`: an `aiohttp.ClientSession` per event loop with a capped,
+  per-host limited connection pool and timeouts; use `request_with_retries` for retries.
+- `pool_metrics()`: pool utilisation and request/retry/error counters.
+
+requests and aiohttp are imported when their client is first needed, not with this module.
+"""
+import asyncio
+import random
+import threading
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    import aiohttp
+    import requests
+
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 20
+MAX_CONNECTIONS = 100
+MAX_CONNECTIONS_PER_HOST = 10
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.5
+# upper bound on the wait before a retry, whatever the server's Retry-After asks for
+MAX_RETRY_DELAY = 30
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_counters = {"sync_requests": 0, "async_requests": 0, "async_retries": 0, "async_errors": 0}
+_counters_lock = threading.Lock()
+
+
+def _count(name: str, delta: int = 1) -> None:
+    with _counters_lock:
+        _counters[name] += delta
+
+
+def _pooled_adapter_class() -> type:
+    from requests.adapters import HTTPAdapter
+
+    class _PooledAdapter(HTTPAdapter):
+        """HTTPAdapter applying default timeouts and counting requests."""
+
+        def send(self, request, **kwargs):
+            if kwargs.get("timeout") is None:
+                kwargs["timeout"] = (CONNECT_TIMEOUT, READ_TIMEOUT)
+            _count("sync_requests")
+            return super().send(request, **kwargs)
+
+    return _PooledAdapter
+
+
+_session: Optional["requests.Session"] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> "requests.Session":
+    """The process-wide `requests.Session` (created on first use)."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                import requests
+                from urllib3.util.retry import Retry
+                retry = Retry(
+                    total=MAX_RETRIES,
+                    backoff_factor=BACKOFF_FACTOR,
+                    status_forcelist=RETRY_STATUSES,
+                    allowed_methods=("GET", "HEAD"),
+                    respect_retry_after_header=True,
+                    raise_on_status=False,
+                )
+                adapter = _pooled_adapter_class()(pool_connections=MAX_CONNECTIONS // MAX_CONNECTIONS_PER_HOST, pool_maxsize=MAX_CONNECTIONS_PER_HOST, max_retries=retry)
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+# one aiohttp session per event loop, keyed by id(loop): a session cannot be shared across loops.
+# The loop is kept with its session (which references it anyway), so its id cannot be reused
+# while the entry exists.
+_async_sessions: "dict[int, tuple[asyncio.AbstractEventLoop, aiohttp.ClientSession]]" = {}
+
+
+def _drop_closed_loops() -> None:
+    """Forget the sessions of loops closed without `close_async_session`, so they can be freed."""
+    for key, (loop, session) in list(_async_sessions.items()):
+        if loop.is_closed():
+            del _async_sessions[key]
+            # the session can no longer be closed on its loop: mark it closed so it is not reported as leaked
+            session.detach()
+
+
+def get_async_session() -> "aiohttp.ClientSession":
+    """The `aiohttp.ClientSession` of the running event loop (created on first use)."""
+    loop = asyncio.get_running_loop()
+    _drop_closed_loops()
+    _, session = _async_sessions.get(id(loop), (loop, None))
+    if session is None or session.closed:
+        import aiohttp
+        connector = aiohttp.TCPConnector(limit=MAX_CONNECTIONS, limit_per_host=MAX_CONNECTIONS_PER_HOST, ttl_dns_cache=300)
+        timeout = aiohttp.ClientTimeout(total=None, connect=CONNECT_TIMEOUT, sock_read=READ_TIMEOUT)
+        session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        _async_sessions[id(loop)] = (loop, session)
+    return session
+
+
+async def close_async_session() -> None:
+    """Close the running event loop's session, e.g. before the loop shuts down."""
+    _, session = _async_sessions.pop(id(asyncio.get_running_loop()), (None, None))
+    if session is not None and not session.closed:
+        await session.close()
+
+
+def _retry_delay(attempt: int, retry_after: Optional[str]) -> float:
+    if retry_after:
+        try:
+            return min(max(float(retry_after), 0.0), MAX_RETRY_DELAY)
+        except ValueError:
+            pass
+    return min(BACKOFF_FACTOR * (2 ** attempt) + random.uniform(0, BACKOFF_FACTOR), MAX_RETRY_DELAY)
+
+
+async def request_with_retries(session: "aiohttp.ClientSession", method: str, url: str, max_retries: int = MAX_RETRIES, **kwargs) -> "aiohttp.ClientResponse":
+    """
+    Send a request, retrying with exponential backoff on 429/5xx responses and connection errors.
+
+    The returned response must be released by the caller, e.g. with `async with response:`.
+    """
+    import aiohttp
+    attempt = 0
+    while True:
+        _count("async_requests")
+        try:
+            response = await session.request(method, url, **kwargs)
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+            _count("async_errors")
+            if attempt >= max_retries:
+                raise
+            retry_after = None
+        else:
+            if response.status not in RETRY_STATUSES or attempt >= max_retries:
+                return response
+            retry_after = response.headers.get("Retry-After")
+            response.release()
+        await asyncio.sleep(_retry_delay(attempt, retry_after))
+        attempt += 1
+        _count("async_retries")
+
+
+def pool_metrics() -> dict:
+    """Connection pool utilisation and request counters of the shared clients."""
+    with _counters_lock:
+        metrics = dict(_counters)
+
+    sync_pools = []
+    if _session is not None:
+        adapter = _session.get_adapter("https://")
+        for key, pool in list(adapter.poolmanager.pools._container.items()):
+            sync_pools.append({
+                "host": f"{key.key_scheme}://{key.key_host}",
+                "connections_opened": pool.num_connections,
+                "requests": pool.num_requests,
+                # free slots: idle connections plus connections not opened yet
+                "available": pool.pool.qsize() if pool.pool is not None else 0,
+                "max_size": pool.pool.maxsize if pool.pool is not None else 0,
+            })
+    metrics["sync_pools"] = sync_pools
+
+    async_pools = []
+    _drop_closed_loops()
+    for _, session in list(_async_sessions.values()):
+        connector = session.connector
+        if connector is None or session.closed:
+            continue
+        async_pools.append({
+            "limit": connector.limit,
+            "limit_per_host": connector.limit_per_host,
+            # aiohttp does not expose these publicly
+            "in_use": len(getattr(connector, "_acquired", ())),
+            "idle": sum(len(conns) for conns in getattr(connector, "_conns", {}).values()),
+        })
+    metrics["async_pools"] = async_pools
+    return metrics
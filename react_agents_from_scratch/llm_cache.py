@@ -0,0 +1,174 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Callable, Optional
+
+from react_agents_from_scratch.tracing import annotate
+
+
+class CacheMissError(KeyError):
+    """Raised in replay-only mode when a prompt is not in the cache."""
+
+
+class LLMResponseCache:
+    """
+    Persistent, content-addressed cache of LLM responses, stored in SQLite.
+
+    Entries are keyed on a hash of the model, system message, temperature and prompt.
+    When the stored responses exceed `max_bytes`, the least recently used ones are evicted.
+
+    Example:
+        cache = LLMResponseCache("llm_cache.sqlite", max_bytes=100_000_000)
+        key = LLMResponseCache.make_key("gpt-4o-mini", system_message, 0.5, prompt)
+        cache.get(key)  # None on a miss
+    """
+
+    def __init__(self, path: str = "llm_cache.sqlite", max_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+        self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def make_key(model: str, system_message: str, temperature: float, prompt: str) -> str:
+        payload = json.dumps([model, system_message, temperature, prompt], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+            return row[0]
+
+    def set(self, key: str, response: str) -> None:
+        size = len(response.encode("utf-8"))
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, response, size, time.time())
+            )
+            self._size += size - (previous[0] if previous else 0)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until the cache fits in `max_bytes`."""
+        # read lazily in last_access order (indexed): only the rows evicted are fetched
+        rows = self._conn.execute("SELECT key, size FROM responses ORDER BY last_access")
+        to_delete = []
+        for key, size in rows:
+            if self._size <= self.max_bytes:
+                break
+            to_delete.append((key,))
+            self._size -= size
+        rows.close()
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", to_delete)
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": self._size,
+        }
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class _CachedBrain:
+    def __init__(self, brain: Callable, cache: LLMResponseCache, model: Optional[str] = None, system_message: Optional[str] = None, temperature: Optional[float] = None, replay_only: bool = False):
+        self.brain = brain
+        self.cache = cache
+        self.replay_only = replay_only
+        model = model or getattr(brain, "model", None)
+        system_message = system_message or getattr(brain, "system_message", None)
+        if temperature is None:
+            temperature = getattr(brain, "temperature", None)
+        if model is None or system_message is None or temperature is None:
+            # plain functions such as `call_llm.get_llm_response` use the call_llm defaults
+            from react_agents_from_scratch.openai_react import call_llm
+            model = model or call_llm.MODEL
+            system_message = system_message or call_llm.SYSTEM_MESSAGE
+            temperature = temperature if temperature is not None else call_llm.TEMPERATURE
+        self.model = model
+        self.system_message = system_message
+        self.temperature = temperature
+
+    def __getattr__(self, name):
+        # expose the wrapped brain's records (`timings`, `calls`, ...)
+        if name == "brain":
+            raise AttributeError(name)
+        return getattr(self.brain, name)
+
+    def _key(self, prompt: str) -> str:
+        return LLMResponseCache.make_key(self.model, self.system_message, self.temperature, prompt)
+
+    def _miss(self, prompt: str) -> None:
+        if self.replay_only:
+            raise CacheMissError(f"No cached response for prompt (replay-only mode): {str(prompt)[-200:]!r}")
+
+
+class CachedLLMBrain(_CachedBrain):
+    """
+    Cache layer around an LLM brain for `react_agent`.
+
+    Responses are looked up in the cache before calling the wrapped brain, and stored after.
+    In replay-only mode the brain is never called and a miss raises `CacheMissError`.
+    The model, system message and temperature of the key are taken from the brain's
+    attributes when it has them (e.g. `StreamingLLMBrain`), or the `call_llm` defaults.
+
+    Example:
+        brain = CachedLLMBrain(call_llm.get_llm_response, LLMResponseCache("llm_cache.sqlite"))
+        react_agent(question, llm_brain_call=brain, ...)
+        brain.cache.stats()  # {"hits": ..., "misses": ..., ...}
+    """
+
+    def __call__(self, prompt: str) -> str:
+        key = self._key(prompt)
+        response = self.cache.get(key)
+        annotate(llm_cache_hit=response is not None)
+        if response is not None:
+            return response
+        self._miss(prompt)
+        response = self.brain(prompt)
+        if response:
+            self.cache.set(key, response)
+        return response
+
+
+class AsyncCachedLLMBrain(_CachedBrain):
+    """Cache layer around an async LLM brain for `async_agent.arun`, see `CachedLLMBrain`."""
+
+    async def __call__(self, prompt: str) -> str:
+        key = self._key(prompt)
+        response = self.cache.get(key)
+        annotate(llm_cache_hit=response is not None)
+        if response is not None:
+            return response
+        self._miss(prompt)
+        response = await self.brain(prompt)
+        if response:
+            self.cache.set(key, response)
+        return response
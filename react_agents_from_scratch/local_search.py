@@ -0,0 +1,322 @@
+"""
+Offline BM25 search over a local copy of GOV.UK pages.
+
+`build_index` ingests a directory of saved GOV.UK pages (or a JSONL dump of them), extracts
+their main content with the same extraction as the page fetchers (`html_extract`), and
+writes a compact inverted index to a directory:
+
+    meta.json      corpus statistics and BM25 parameters
+    terms.json     term -> [postings offset, document frequency]
+    postings.bin   per term: document IDs, then term frequencies (uint32)
+    norms.bin      precomputed BM25 length norm of each document (float32)
+    docs.json      URL and title of each document
+    offsets.bin    start of each document's text in texts.bin (uint64)
+    texts.bin      the documents' main text (UTF-8)
+
+`LocalIndex` memory-maps the binary files, so opening an index is cheap and only the pages
+of the index a query touches are read. `tools.search_govuk_local` answers like `search_govuk`
+from the index, without any network call.
+
+Usage:
+    python -m react_agents_from_scratch.local_search build path/to/pages govuk_index
+    python -m react_agents_from_scratch.local_search search govuk_index "register for self assessment"
+"""
+import argparse
+import gzip
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import sys
+import threading
+import time
+from array import array
+from collections import Counter, deque
+from html import unescape
+from itertools import islice
+from typing import Iterator, Optional
+
+from react_agents_from_scratch.html_extract import extract_main_text
+from react_agents_from_scratch.text_terms import tokenize
+
+INDEX_VERSION = 1
+K1 = 1.2
+B = 0.75
+DEFAULT_INDEX_DIR = os.getenv("GOVUK_INDEX_DIR", "govuk_index")
+# pages sent to an extraction worker at once, and batches in flight per worker: bounds the
+# raw HTML held in memory while the workers are busy
+EXTRACT_BATCH_SIZE = 16
+BATCHES_PER_WORKER = 2
+
+_TITLE = re.compile(r"<title[^>]*>(.*?)</title\s*>", re.IGNORECASE | re.DOTALL)
+_CANONICAL = re.compile(r"<link[^>]+rel=[\"']canonical[\"'][^>]*>", re.IGNORECASE)
+_HREF = re.compile(r"href=[\"']([^\"']+)[\"']", re.IGNORECASE)
+
+
+def _page_title(html: str) -> str:
+    match = _TITLE.search(html)
+    title = " ".join(unescape(match.group(1)).split()) if match else ""
+    return title.removesuffix(" - GOV.UK")
+
+
+def _page_url(html: str, relative_path: str) -> str:
+    # the page's canonical URL, else one made from its file name ("browse_benefits.html" -> /browse/benefits)
+    canonical = _CANONICAL.search(html)
+    href = _HREF.search(canonical.group(0)) if canonical else None
+    if href:
+        return href.group(1)
+    path = os.path.splitext(relative_path)[0].replace(os.sep, "/").replace("_", "/")
+    return f"https://www.gov.uk/{path}"
+
+
+def _iter_raw_pages(source: str) -> Iterator[dict]:
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if name.endswith((".html", ".htm")):
+                    path = os.path.join(root, name)
+                    with open(path, "r", encoding="utf-8", errors="replace") as file:
+                        yield {"path": os.path.relpath(path, source), "html": file.read()}
+        return
+    opener = gzip.open if source.endswith(".gz") else open
+    with opener(source, "rt", encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _extract_page(raw: dict) -> Optional[tuple[str, str, str]]:
+    # (url, title, main text) of a page, or None if it has no main content
+    if raw.get("text") is not None:
+        return raw["url"], raw.get("title", ""), raw["text"]
+    html = raw["html"]
+    text = extract_main_text(html)
+    if not text:
+        return None
+    return raw.get("url") or _page_url(html, raw["path"]), raw.get("title") or _page_title(html), text
+
+
+def _extract_pages(raw_pages: list[dict]) -> list[Optional[tuple[str, str, str]]]:
+    return [_extract_page(raw) for raw in raw_pages]
+
+
+def iter_pages(source: str, workers: int = 1) -> Iterator[tuple[str, str, str]]:
+    """
+    Pages of a corpus as (url, title, main text), skipping pages without main content.
+
+    Args:
+        source: A directory of saved .html pages, or a JSONL file (optionally gzipped) of
+            {"url", "html"} or {"url", "title", "text"} objects
+        workers: Number of processes extracting the main text
+    """
+    raw_pages = _iter_raw_pages(source)
+    if workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        # `executor.map` would read (and submit) the whole corpus up front: keep a bounded
+        # window of batches in flight instead, and yield the pages in order
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            while True:
+                while len(pending) < workers * BATCHES_PER_WORKER:
+                    batch = list(islice(raw_pages, EXTRACT_BATCH_SIZE))
+                    if not batch:
+                        break
+                    pending.append(executor.submit(_extract_pages, batch))
+                if not pending:
+                    break
+                yield from (page for page in pending.popleft().result() if page)
+    else:
+        yield from (page for page in map(_extract_page, raw_pages) if page)
+
+
+def _write_array(path: str, values: array) -> None:
+    with open(path, "wb") as file:
+        values.tofile(file)
+
+
+def build_index(source: str, index_dir: str, workers: int = 1) -> dict:
+    """
+    Build a BM25 index of the pages in `source` (see `iter_pages`) in `index_dir`.
+
+    Returns:
+        dict: The index statistics written to meta.json
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    postings: dict[str, tuple[array, array]] = {}
+    urls, titles, lengths = [], [], []
+    offsets = array("Q", [0])
+
+    with open(os.path.join(index_dir, "texts.bin"), "wb") as texts:
+        for url, title, text in iter_pages(source, workers):
+            doc_id = len(urls)
+            counts = Counter(tokenize(f"{title} {text}"))
+            for term, frequency in counts.items():
+                doc_ids, frequencies = postings.setdefault(term, (array("I"), array("I")))
+                doc_ids.append(doc_id)
+                frequencies.append(frequency)
+            urls.append(url)
+            titles.append(title)
+            lengths.append(sum(counts.values()))
+            encoded = text.encode("utf-8")
+            texts.write(encoded)
+            offsets.append(offsets[-1] + len(encoded))
+
+    average_length = sum(lengths) / len(lengths) if lengths else 0.0
+    norms = array("f", (K1 * (1 - B + B * length / (average_length or 1.0)) for length in lengths))
+
+    lexicon = {}
+    position = 0
+    with open(os.path.join(index_dir, "postings.bin"), "wb") as file:
+        for term in sorted(postings):
+            doc_ids, frequencies = postings[term]
+            doc_ids.tofile(file)
+            frequencies.tofile(file)
+            lexicon[term] = [position, len(doc_ids)]
+            position += 2 * len(doc_ids)
+
+    _write_array(os.path.join(index_dir, "norms.bin"), norms)
+    _write_array(os.path.join(index_dir, "offsets.bin"), offsets)
+    with open(os.path.join(index_dir, "terms.json"), "w", encoding="utf-8") as file:
+        json.dump(lexicon, file, ensure_ascii=False, separators=(",", ":"))
+    with open(os.path.join(index_dir, "docs.json"), "w", encoding="utf-8") as file:
+        json.dump({"urls": urls, "titles": titles}, file, ensure_ascii=False, separators=(",", ":"))
+
+    meta = {
+        "version": INDEX_VERSION,
+        "byteorder": sys.byteorder,
+        "documents": len(urls),
+        "terms": len(lexicon),
+        "average_length": average_length,
+        "k1": K1,
+        "b": B,
+    }
+    with open(os.path.join(index_dir, "meta.json"), "w", encoding="utf-8") as file:
+        json.dump(meta, file, indent=2)
+    return meta
+
+
+def _map_file(path: str) -> Optional[mmap.mmap]:
+    with open(path, "rb") as file:
+        # an empty file cannot be mapped
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(file.fileno()).st_size else None
+
+
+class LocalIndex:
+    """
+    A BM25 index built by `build_index`, memory-mapped from disk.
+
+    Example:
+        index = LocalIndex("govuk_index")
+        for doc_id, score in index.search("register for self assessment", top_k=3):
+            url, title, text = index.document(doc_id)
+    """
+
+    def __init__(self, index_dir: str):
+        with open(os.path.join(index_dir, "meta.json"), encoding="utf-8") as file:
+            self.meta = json.load(file)
+        if self.meta["version"] != INDEX_VERSION or self.meta["byteorder"] != sys.byteorder:
+            raise ValueError(f"Index {index_dir} was built by another version or platform: rebuild it with build_index")
+        with open(os.path.join(index_dir, "terms.json"), encoding="utf-8") as file:
+            self.lexicon: dict[str, list[int]] = json.load(file)
+        with open(os.path.join(index_dir, "docs.json"), encoding="utf-8") as file:
+            docs = json.load(file)
+        self.urls: list[str] = docs["urls"]
+        self.titles: list[str] = docs["titles"]
+        self.k1 = self.meta["k1"]
+        self._maps = [_map_file(os.path.join(index_dir, name)) for name in ("postings.bin", "norms.bin", "offsets.bin", "texts.bin")]
+        postings, norms, offsets, self._texts = self._maps
+        self._postings = memoryview(postings).cast("I") if postings else memoryview(b"").cast("I")
+        self._norms = memoryview(norms).cast("f") if norms else memoryview(b"").cast("f")
+        self._offsets = memoryview(offsets).cast("Q")
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    def search(self, query: str, top_k: int = 10) -> list[tuple[int, float]]:
+        """The `top_k` (document ID, BM25 score) pairs for the query, best first."""
+        n_documents = len(self.urls)
+        scores: dict[int, float] = {}
+        for term in set(tokenize(query)):
+            entry = self.lexicon.get(term)
+            if entry is None:
+                continue
+            offset, n_containing = entry
+            idf = math.log(1 + (n_documents - n_containing + 0.5) / (n_containing + 0.5))
+            doc_ids = self._postings[offset:offset + n_containing]
+            frequencies = self._postings[offset + n_containing:offset + 2 * n_containing]
+            norms = self._norms
+            weight = idf * (self.k1 + 1)
+            for doc_id, frequency in zip(doc_ids, frequencies):
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight * frequency / (frequency + norms[doc_id])
+        return heapq.nlargest(top_k, scores.items(), key=lambda item: (item[1], -item[0]))
+
+    def document(self, doc_id: int) -> tuple[str, str, str]:
+        """The (url, title, main text) of a document."""
+        text = self._texts[self._offsets[doc_id]:self._offsets[doc_id + 1]].decode("utf-8") if self._texts else ""
+        return self.urls[doc_id], self.titles[doc_id], text
+
+    def close(self) -> None:
+        self._postings.release()
+        self._norms.release()
+        self._offsets.release()
+        for mapped in self._maps:
+            if mapped is not None:
+                mapped.close()
+
+
+_index: Optional[LocalIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_local_index() -> LocalIndex:
+    """The index used by `tools.search_govuk_local`: `GOVUK_INDEX_DIR` ("govuk_index") unless set with `set_local_index`."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = LocalIndex(DEFAULT_INDEX_DIR)
+    return _index
+
+
+def set_local_index(index_dir: str) -> LocalIndex:
+    """Use the index in `index_dir` for `tools.search_govuk_local`."""
+    global _index
+    with _index_lock:
+        _index = LocalIndex(index_dir)
+    return _index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query a local BM25 index of GOV.UK pages.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Index a directory of .html pages or a JSONL dump")
+    build.add_argument("source")
+    build.add_argument("index_dir")
+    build.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processes extracting the main text")
+    search = commands.add_parser("search", help="Query an index")
+    search.add_argument("index_dir")
+    search.add_argument("query")
+    search.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        start = time.perf_counter()
+        meta = build_index(args.source, args.index_dir, workers=args.workers)
+        print(f"Indexed {meta['documents']} pages, {meta['terms']} terms in {time.perf_counter() - start:.1f}s")
+    else:
+        index = LocalIndex(args.index_dir)
+        start = time.perf_counter()
+        hits = index.search(args.query, top_k=args.top_k)
+        elapsed = time.perf_counter() - start
+        for doc_id, score in hits:
+            url, title, _ = index.document(doc_id)
+            print(f"{score:7.2f}  {title}  {url}")
+        print(f"{len(hits)} results in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
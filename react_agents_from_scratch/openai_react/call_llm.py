@@ -1,21 +1,333 @@
 import os
-from openai import OpenAI
-from dotenv import load_dotenv
+import threading
+import time
+from typing import TYPE_CHECKING, Optional, Union
 
-load_dotenv(".env")
+from react_agents_from_scratch.react_parser import ReactOutputParser
+from react_agents_from_scratch.tracing import annotate
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=OPENAI_API_KEY)
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI, OpenAI
 
-def get_llm_response(prompt):
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": "You are an AI assistant for the UK Government helping users navigate official government guidance and services."},
-            {"role": "user", "content": prompt}
-        ],
+# the openai package takes most of a second to import: the clients are built on first use,
+# so that importing this module (and every CLI start) does not pay for it
+_client: Optional["OpenAI"] = None
+_async_client: Optional["AsyncOpenAI"] = None
+_client_lock = threading.Lock()
+
+
+def _api_key() -> Optional[str]:
+    from dotenv import load_dotenv
+    load_dotenv(".env")
+    return os.getenv("OPENAI_API_KEY")
+
+
+def get_client() -> "OpenAI":
+    """The process-wide OpenAI client (created on first use)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from openai import OpenAI
+                _client = OpenAI(api_key=_api_key())
+    return _client
+
+
+def get_async_client() -> "AsyncOpenAI":
+    """The process-wide AsyncOpenAI client (created on first use)."""
+    global _async_client
+    if _async_client is None:
+        with _client_lock:
+            if _async_client is None:
+                from openai import AsyncOpenAI
+                _async_client = AsyncOpenAI(api_key=_api_key())
+    return _async_client
+
+
+def __getattr__(name: str):
+    # `client` and `async_client` used to be built at import
+    if name == "client":
+        return get_client()
+    if name == "async_client":
+        return get_async_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+MODEL = "gpt-4o-mini"
+SYSTEM_MESSAGE = "You are an AI assistant for the UK Government helping users navigate official government guidance and services."
+TEMPERATURE = 0.5
+# the model must never write the observation itself: stop generating as soon as it tries to
+REACT_STOP_SEQUENCES = ["Observation:", "\nObservation"]
+
+
+def build_messages(prompt: Union[str, list[dict[str, str]]], system_message: str = SYSTEM_MESSAGE) -> list[dict[str, str]]:
+    # a prompt laid out as chat messages (`PromptBuffer(..., chat=True)`) is sent as it is
+    if isinstance(prompt, list):
+        return [{"role": "system", "content": system_message}] + prompt
+    return [
+        {"role": "system", "content": system_message},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def usage_to_dict(usage) -> Optional[dict[str, int]]:
+    """Token counts of an API response's `usage` field."""
+    if usage is None:
+        return None
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "prompt_tokens": usage.prompt_tokens,
+        "completion_tokens": usage.completion_tokens,
+        "total_tokens": usage.total_tokens,
+        # prompt tokens served from the provider's prompt cache
+        "cached_tokens": (getattr(details, "cached_tokens", None) or 0) if details is not None else 0,
+    }
+
+
+class _StepStream:
+    """Parse a streamed ReAct step as it arrives and time it."""
+
+    def __init__(self, model: str = MODEL, speculation=None):
+        self.model = model
+        self.start = time.perf_counter()
+        self.time_to_first_token = None
+        # when the step's action (its Action Input line) or its Final Answer was complete
+        self.time_to_action = None
+        # see `speculation.SpeculativeActions`: told about the step as it arrives
+        self.speculation = speculation
+        self.time_to_speculation = None
+        self.cutoff = None
+        self.usage = None
+        self.parser = ReactOutputParser()
+
+    def add(self, chunk) -> bool:
+        """Add a streamed chunk; return True once the step is complete and the stream can be closed."""
+        if getattr(chunk, "usage", None):
+            self.usage = usage_to_dict(chunk.usage)
+        if not chunk.choices:
+            return False
+        choice = chunk.choices[0]
+        delta = choice.delta.content
+        # a stop sequence ends the step (finish_reason) before the usage chunk and the end of the stream
+        finished = getattr(choice, "finish_reason", None) is not None
+        if delta:
+            if self.time_to_first_token is None:
+                self.time_to_first_token = time.perf_counter() - self.start
+            self.parser.feed(delta)
+            self._speculate(complete=False)
+            self.cutoff = self.parser.cutoff_position()
+        if finished:
+            # the "\nObservation" stop sequence swallows the newline ending the Action Input line
+            self._speculate(complete=True)
+        if self.time_to_action is None and (finished or self._action_complete()):
+            self.time_to_action = time.perf_counter() - self.start
+        return self.cutoff is not None
+
+    def _speculate(self, complete: bool) -> None:
+        if self.speculation is not None and self.time_to_speculation is None and self.speculation.observe(self.parser, complete):
+            self.time_to_speculation = time.perf_counter() - self.start
+
+    def _action_complete(self) -> bool:
+        parser = self.parser
+        return self.cutoff is not None or parser.first_marker('final_answer') is not None or parser.early_action() is not None
+
+    def finish(self) -> tuple[str, dict]:
+        text = self.parser.text if self.cutoff is None else self.parser.text[:self.cutoff]
+        total_time = time.perf_counter() - self.start
+        timings = {
+            "time_to_first_token": self.time_to_first_token,
+            # the whole completion if the stream ended without a complete action
+            "time_to_action": self.time_to_action if self.time_to_action is not None else total_time,
+            # when the step's tool was started speculatively (None: it was not)
+            "time_to_speculation": self.time_to_speculation,
+            "total_time": total_time,
+            "cut_off": self.cutoff is not None,
+            "completion_chars": len(text),
+            # only sent at the end of the stream, so None when the stream was cut off
+            "usage": self.usage,
+        }
+        annotate(model=self.model, **{key: value for key, value in timings.items() if key != "usage"}, **(self.usage or {}))
+        return text.strip(), timings
+
+
+def stream_react_completion(llm_client: "OpenAI", messages: list[dict[str, str]], model: str = MODEL, temperature: float = TEMPERATURE, stop: Optional[list[str]] = REACT_STOP_SEQUENCES, speculation=None) -> tuple[str, dict]:
+    """
+    Stream a ReAct step from the LLM and stop it as soon as the step is complete.
+
+    The completion is parsed as it arrives. Generation ends either on a stop sequence
+    (server side) or, once an Action Input or a Final Answer has been parsed, on the next
+    section marker the model starts to invent (client side, by closing the stream).
+
+    Args:
+        llm_client: The OpenAI client
+        messages: The chat messages to send
+        model: The model name
+        temperature: The sampling temperature
+        stop: Stop sequences passed to the API
+        speculation: A `SpeculativeActions` starting the step's tool as soon as its Action
+            Input line is complete, if given
+
+    Returns:
+        tuple: The completion text, and its timings:
+            {"time_to_first_token": s, "time_to_action": s, "time_to_speculation": s or None,
+             "total_time": s, "cut_off": bool, "completion_chars": int, "usage": dict or None}
+    """
+    step = _StepStream(model, speculation)
+    stream = llm_client.chat.completions.create(
+        model=model,
+        messages=messages,
+        n=1,
+        stop=stop,
+        temperature=temperature,
+        stream=True,
+        stream_options={"include_usage": True}
+    )
+    try:
+        for chunk in stream:
+            if step.add(chunk):
+                break
+    finally:
+        # closing the stream cancels the generation we do not need
+        stream.close()
+    return step.finish()
+
+
+async def astream_react_completion(llm_client: "AsyncOpenAI", messages: list[dict[str, str]], model: str = MODEL, temperature: float = TEMPERATURE, stop: Optional[list[str]] = REACT_STOP_SEQUENCES, speculation=None) -> tuple[str, dict]:
+    """Async version of `stream_react_completion`."""
+    step = _StepStream(model, speculation)
+    stream = await llm_client.chat.completions.create(
+        model=model,
+        messages=messages,
+        n=1,
+        stop=stop,
+        temperature=temperature,
+        stream=True,
+        stream_options={"include_usage": True}
+    )
+    try:
+        async for chunk in stream:
+            if step.add(chunk):
+                break
+    finally:
+        await stream.close()
+    return step.finish()
+
+
+class StreamingLLMBrain:
+    """
+    Streaming LLM brain for `react_agent`, recording timings for every call.
+
+    Example:
+        brain = StreamingLLMBrain()
+        react_agent(question, llm_brain_call=brain, ...)
+        brain.timings  # one dict per iteration, see `stream_react_completion`
+
+    Pass a `speculation.SpeculativeActions` (also given to `react_agent`) to start each step's
+    tool while the completion is still streaming.
+    """
+
+    def __init__(self, llm_client: Optional["OpenAI"] = None, model: str = MODEL, system_message: str = SYSTEM_MESSAGE, temperature: float = TEMPERATURE, stop: Optional[list[str]] = REACT_STOP_SEQUENCES, speculation=None):
+        self.llm_client = llm_client or get_client()
+        self.model = model
+        self.system_message = system_message
+        self.temperature = temperature
+        self.stop = stop
+        self.speculation = speculation
+        self.timings: list[dict] = []
+
+    def __call__(self, prompt: Union[str, list[dict[str, str]]]) -> str:
+        text, timings = stream_react_completion(
+            self.llm_client,
+            build_messages(prompt, self.system_message),
+            model=self.model,
+            temperature=self.temperature,
+            stop=self.stop,
+            speculation=self.speculation
+        )
+        self.timings.append(timings)
+        return text
+
+
+class AsyncLLMBrain:
+    """
+    Async LLM brain for `async_agent.arun`, recording timings and token usage for every call.
+
+    Share one `AsyncOpenAI` client between brains: a brain per agent session is cheap,
+    and keeps the per-session records apart.
+
+    Example:
+        brain = AsyncLLMBrain(stream=True)
+        await arun(question, llm_brain_call=brain, ...)
+        brain.calls  # one dict per iteration: timings and "usage"
+
+    With `stream=True`, a `speculation.SpeculativeActions` (also given to `arun`) starts each
+    step's tool while the completion is still streaming.
+    """
+
+    def __init__(self, llm_client: Optional["AsyncOpenAI"] = None, model: str = MODEL, system_message: str = SYSTEM_MESSAGE, temperature: float = TEMPERATURE, stream: bool = False, stop: Optional[list[str]] = REACT_STOP_SEQUENCES, speculation=None):
+        self.llm_client = llm_client or get_async_client()
+        self.model = model
+        self.system_message = system_message
+        self.temperature = temperature
+        self.stream = stream
+        self.stop = stop
+        self.speculation = speculation
+        self.calls: list[dict] = []
+
+    async def __call__(self, prompt: Union[str, list[dict[str, str]]]) -> str:
+        messages = build_messages(prompt, self.system_message)
+        if self.stream:
+            text, record = await astream_react_completion(
+                self.llm_client, messages, model=self.model, temperature=self.temperature, stop=self.stop, speculation=self.speculation
+            )
+        else:
+            start = time.perf_counter()
+            response = await self.llm_client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                n=1,
+                stop=None,
+                temperature=self.temperature
+            )
+            text = response.choices[0].message.content.strip()
+            record = {"total_time": time.perf_counter() - start, "usage": usage_to_dict(response.usage)}
+            annotate(model=self.model, total_time=record["total_time"], **(record["usage"] or {}))
+        self.calls.append(record)
+        return text
+
+    def total_usage(self) -> dict[str, int]:
+        """Token counts summed over all the calls that reported usage."""
+        totals = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "cached_tokens": 0}
+        for record in self.calls:
+            for key, value in (record.get("usage") or {}).items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+
+def get_llm_response(prompt, stream=False):
+    if stream:
+        text, _ = stream_react_completion(get_client(), build_messages(prompt))
+        return text
+    response = get_client().chat.completions.create(
+        model=MODEL,
+        messages=build_messages(prompt),
+        n=1,
+        stop=None,
+        temperature=TEMPERATURE
+    )
+    annotate(model=MODEL, **(usage_to_dict(response.usage) or {}))
+    return response.choices[0].message.content.strip()
+
+
+async def aget_llm_response(prompt, stream=False):
+    if stream:
+        text, _ = await astream_react_completion(get_async_client(), build_messages(prompt))
+        return text
+    response = await get_async_client().chat.completions.create(
+        model=MODEL,
+        messages=build_messages(prompt),
         n=1,
         stop=None,
-        temperature=0.5
+        temperature=TEMPERATURE
     )
+    annotate(model=MODEL, **(usage_to_dict(response.usage) or {}))
     return response.choices[0].message.content.strip()
@@ -0,0 +1,161 @@
+"""
+Off-loop HTML parsing for the page fetchers.
+
+Extracting the text of a page is CPU-bound: run on the event loop, it blocks every other
+fetch and agent session. `parse_off_loop` runs it in a `ProcessPoolExecutor` instead, so
+network I/O and parsing overlap and parsing scales with the number of cores. A thread
+pool is used when processes are not available (or when configured).
+
+Example:
+    configure_parse_executor("process", max_workers=4)
+    text = await parse_off_loop(html, url)
+    parse_stats()  # queue depth and parse time per page
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import BrokenExecutor, Executor, ThreadPoolExecutor
+from typing import Optional
+
+from react_agents_from_scratch.html_extract import extract_main_text
+from react_agents_from_scratch.tracing import annotate, traced
+
+_executor: Optional[Executor] = None
+_executor_kind: Optional[str] = None
+_executor_lock = threading.Lock()
+
+_stats_lock = threading.Lock()
+_queue_depth = 0
+_stats = {"pages": 0, "max_queue_depth": 0, "parse_time": 0.0, "wait_time": 0.0, "fallbacks": 0}
+# most recent pages: {"url", "bytes", "parse_time", "wait_time", "queue_depth"}
+_recent_pages: deque = deque(maxlen=1000)
+
+
+def _timed_extract(html: str) -> tuple[Optional[str], float]:
+    # runs in the worker: time the parse itself, without the queueing and pickling
+    start = time.perf_counter()
+    text = extract_main_text(html)
+    return text, time.perf_counter() - start
+
+
+def configure_parse_executor(kind: Optional[str] = "process", max_workers: Optional[int] = None) -> None:
+    """
+    Choose where pages are parsed.
+
+    Args:
+        kind: "process" (default), "thread", or None to parse inline on the event loop
+        max_workers: Pool size; the number of CPUs if None
+    """
+    global _executor, _executor_kind
+    if kind not in ("process", "thread", None):
+        raise ValueError(f"Unknown parse executor kind: {kind!r}")
+    with _executor_lock:
+        previous = _executor
+        _executor = _make_executor(kind, max_workers) if kind else None
+        _executor_kind = kind or "inline"
+    if previous is not None:
+        previous.shutdown(wait=False)
+
+
+def _make_executor(kind: str, max_workers: Optional[int]) -> Executor:
+    max_workers = max_workers or os.cpu_count() or 1
+    if kind == "process":
+        try:
+            # imported here rather than at module top: multiprocessing is only loaded by the
+            # first parse, not by `import tools`
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            # never fork: the pool is usually created once threads are running (the event loop's
+            # executor, the HTTP pools), and forking a multithreaded process can deadlock the child.
+            # forkserver where available (the platform default otherwise, i.e. spawn): workers are
+            # forked from a single-threaded server that has the parser imported already.
+            mp_context = None
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                mp_context = multiprocessing.get_context("forkserver")
+                mp_context.set_forkserver_preload(["react_agents_from_scratch.html_extract"])
+            return ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context)
+        except (OSError, NotImplementedError, ImportError) as e:
+            # e.g. no working multiprocessing primitives on this platform / sandbox
+            print(f"Process pool unavailable ({e!r}), parsing pages in threads instead.")
+            with _stats_lock:
+                _stats["fallbacks"] += 1
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="page-parser")
+
+
+def get_parse_executor() -> Optional[Executor]:
+    """The executor pages are parsed in (a process pool by default), or None for inline parsing."""
+    global _executor, _executor_kind
+    if _executor_kind is None:
+        with _executor_lock:
+            if _executor_kind is None:
+                _executor = _make_executor("process", None)
+                _executor_kind = "process"
+    return _executor
+
+
+def _fall_back_to_threads() -> None:
+    global _executor, _executor_kind
+    with _executor_lock:
+        if _executor_kind == "process" and not isinstance(_executor, ThreadPoolExecutor):
+            print("Process pool broken, parsing pages in threads instead.")
+            _executor = _make_executor("thread", None)
+            _executor_kind = "thread"
+            with _stats_lock:
+                _stats["fallbacks"] += 1
+
+
+@traced("page.parse")
+async def parse_off_loop(html: str, url: str = "") -> Optional[str]:
+    """Extract the main text of a page without blocking the event loop."""
+    global _queue_depth
+    executor = get_parse_executor()
+    with _stats_lock:
+        _queue_depth += 1
+        depth = _queue_depth
+        _stats["max_queue_depth"] = max(_stats["max_queue_depth"], depth)
+
+    start = time.perf_counter()
+    try:
+        if executor is None:
+            text, parse_time = _timed_extract(html)
+        else:
+            loop = asyncio.get_running_loop()
+            try:
+                text, parse_time = await loop.run_in_executor(executor, _timed_extract, html)
+            except BrokenExecutor:  # i.e. BrokenProcessPool, without importing the process pool
+                _fall_back_to_threads()
+                text, parse_time = await loop.run_in_executor(get_parse_executor(), _timed_extract, html)
+    finally:
+        with _stats_lock:
+            _queue_depth -= 1
+
+    wait_time = time.perf_counter() - start - parse_time
+    annotate(url=url, bytes=len(html), parse_time=parse_time, wait_time=wait_time, queue_depth=depth)
+    with _stats_lock:
+        _stats["pages"] += 1
+        _stats["parse_time"] += parse_time
+        _stats["wait_time"] += wait_time
+        _recent_pages.append({
+            "url": url,
+            "bytes": len(html),
+            "parse_time": parse_time,
+            "wait_time": wait_time,
+            "queue_depth": depth,
+        })
+    return text
+
+
+def parse_stats() -> dict:
+    """Parse executor statistics: current/max queue depth, parse and wait times, recent pages."""
+    with _stats_lock:
+        pages = _stats["pages"]
+        return {
+            "executor": _executor_kind or "process (not started)",
+            "queue_depth": _queue_depth,
+            **_stats,
+            "mean_parse_time": _stats["parse_time"] / pages if pages else 0.0,
+            "recent_pages": list(_recent_pages),
+        }
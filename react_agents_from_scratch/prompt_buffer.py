@@ -0,0 +1,144 @@
+from typing import Callable, Optional, Union
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English text)."""
+    return (len(text) + 3) // 4
+
+
+def split_prompt_template(prompt_template: str) -> tuple[Optional[str], str]:
+    """
+    Split a prompt template into its static part and the line with the `{question}` placeholder.
+
+    Returns:
+        tuple: The static part (None if `{question}` is not on the last line of the template),
+            and the rest of the template
+    """
+    static, newline, question_line = prompt_template.rstrip().rpartition("\n")
+    if not newline or "{question}" not in question_line or "{question}" in static:
+        return None, prompt_template
+    return static.rstrip(), question_line.strip()
+
+
+class PromptBuffer:
+    """
+    Append-only conversation buffer for the ReAct loop.
+
+    The prompt header (the template formatted with the question) is rendered once,
+    and each ReAct step is rendered once when it is appended. The prompt handed to
+    the LLM is kept as a single string that only ever grows at the end, so building
+    the prompt for the next iteration costs O(size of the new step) instead of
+    re-formatting the whole history.
+
+    The rendered prompt is byte-for-byte identical to the one built by
+    `f"{prompt_template.format(question=question)}\\n{conversation_text}"`, where
+    `conversation_text` is every formatted step joined with a blank line.
+
+    With `chat=True`, `prompt` is a list of chat messages instead, laid out so that each
+    request shares the longest possible prefix with the previous one (and, for the static
+    part of the template, with other questions), which lets provider-side prompt caching
+    reuse it:
+
+        system:    the template up to the question line (the same for every question)
+        user:      "Question: ..."
+        assistant: Thought / Action / Action Input of step 1
+        user:      "Observation : ..." of step 1
+        ...
+
+    Example:
+        buffer = PromptBuffer(prompt_template, question, format_step=format_react_loop)
+        buffer.prompt        # header only
+        buffer.append(step)  # header + "\\n" + formatted step
+        buffer.sizes         # [{"iteration": 0, "bytes": ..., "tokens": ...}, ...]
+    """
+
+    def __init__(self, prompt_template: str, question: str, format_step: Callable[[dict[str, str]], str], chat: bool = False):
+        self.header = prompt_template.format(question=question)
+        self.format_step = format_step
+        self.chat = chat
+        static, question_template = split_prompt_template(prompt_template)
+        self._head_messages = [{"role": "user", "content": question_template.format(question=question)}]
+        if static is not None:
+            self._head_messages.insert(0, {"role": "system", "content": static})
+        # built on first use, then extended as steps are appended
+        self._messages: Optional[list[dict[str, str]]] = None
+        self.steps: list[dict[str, str]] = []
+        self._prompt = self.header
+        self._bytes = len(self.header.encode("utf-8"))
+        self.sizes: list[dict[str, int]] = []
+        self._record_size()
+
+    @property
+    def prompt(self) -> Union[str, list[dict[str, str]]]:
+        """The current prompt, ready to send to the LLM: a string, or chat messages with `chat=True`."""
+        return self.messages if self.chat else self._prompt
+
+    @property
+    def messages(self) -> list[dict[str, str]]:
+        """The current prompt as chat messages (see the class docstring)."""
+        if self._messages is None:
+            self._messages = list(self._head_messages)
+            for step in self._prompt_steps():
+                self._messages.extend(self.step_messages(step))
+        return list(self._messages)
+
+    def step_messages(self, react_step: dict[str, str]) -> list[dict[str, str]]:
+        """A step as chat messages: the model's part as an assistant message, the observation as a user message."""
+        messages = []
+        model_part = self.format_step({key: value for key, value in react_step.items() if key != "observation"})
+        if model_part:
+            messages.append({"role": "assistant", "content": model_part})
+        if react_step.get("observation"):
+            messages.append({"role": "user", "content": self.format_step({"observation": react_step["observation"]})})
+        return messages
+
+    def _prompt_steps(self) -> list[dict[str, str]]:
+        # the steps as they appear in the prompt
+        return self.steps
+
+    def _add_step_messages(self, react_step: dict[str, str]) -> None:
+        if self._messages is not None:
+            self._messages.extend(self.step_messages(react_step))
+
+    @property
+    def prompt_bytes(self) -> int:
+        """Size of the current prompt in UTF-8 bytes."""
+        return self._bytes
+
+    @property
+    def prompt_tokens(self) -> int:
+        """Estimated size of the current prompt in tokens."""
+        return estimate_tokens(self._prompt)
+
+    @property
+    def conversation_text(self) -> str:
+        """All formatted steps joined with a blank line (the prompt without its header)."""
+        return self._prompt[len(self.header) + 1:] if self.steps else ""
+
+    def append(self, react_step: dict[str, str], rendered: Optional[str] = None) -> str:
+        """
+        Render a ReAct step once and append it to the prompt.
+
+        Args:
+            react_step: The parsed (and possibly completed with an observation) step
+            rendered: The step already rendered by the caller, if available
+
+        Returns:
+            str: The rendered step
+        """
+        if rendered is None:
+            rendered = self.format_step(react_step)
+        chunk = f"\n{rendered}" if not self.steps else f"\n\n{rendered}"
+        self.steps.append(react_step)
+        self._prompt += chunk
+        self._bytes += len(chunk.encode("utf-8"))
+        self._add_step_messages(react_step)
+        self._record_size()
+        return rendered
+
+    def _record_size(self) -> None:
+        self.sizes.append({
+            "iteration": len(self.steps),
+            "bytes": self._bytes,
+            "tokens": self.prompt_tokens,
+        })
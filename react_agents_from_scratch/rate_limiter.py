@@ -0,0 +1,57 @@
+import asyncio
+import time
+from typing import Callable, Optional
+
+from react_agents_from_scratch.async_agent import call_maybe_async
+
+
+class AsyncRateLimiter:
+    """
+    Token-bucket rate limiter for coroutines.
+
+    Allows `rate` calls per second on average, with bursts of up to `burst` calls.
+
+    Example:
+        limiter = AsyncRateLimiter(rate=5)
+        async with limiter:
+            await call_api()
+    """
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1, int(rate))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+def rate_limited(func: Callable, limiter: Optional[AsyncRateLimiter]) -> Callable:
+    """Wrap a (sync or async) single-argument callable so each call first waits for the limiter."""
+    if limiter is None:
+        return func
+
+    async def wrapper(arg):
+        async with limiter:
+            return await call_maybe_async(func, arg)
+
+    return wrapper
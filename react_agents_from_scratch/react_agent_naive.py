@@ -1,25 +1,19 @@
-import re
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from typing import Optional, Callable
-from react_agents_from_scratch import tools
+from react_agents_from_scratch.agent_state import ANSWERED, MAX_ITERATIONS, NO_RESPONSE, REPEATED_ACTIONS, AgentState
+from react_agents_from_scratch.prompt_buffer import PromptBuffer
+from react_agents_from_scratch.react_parser import parse_react_output
+from react_agents_from_scratch.tracing import in_current_context, span, traced
 
 
 def parse_llm_output(response: str) -> dict[str, str]:
-    """Parse the LLM output into structured components."""
-    patterns = {
-        "thought": r"Thought\s*\d*:\s*(.*?)(?:\s*Action\s*(?:\d+:|:)|Action Input\s*(?:\d+:|:)|Observation\s*(?:\d+:|:)|Eureka Thought\s*(?:\d+:|:)|Final Answer\s*(?:\d+:|:)|$)",
-        "action": r"Action\s*(?:\d+:|:)\s*(.*?)(?:\s*Action Input\s*(?:\d+:|:)|Observation\s*(?:\d+:|:)|Eureka Thought\s*(?:\d+:|:)|Final Answer\s*(?:\d+:|:)|$)",
-        "action_input": r"Action Input\s*(?:\d+:|:)\s*(.*?)(?:\s*Observation\s*(?:\d+:|:)|Eureka Thought\s*(?:\d+:|:)|Final Answer\s*(?:\d+:|:)|$)",
-        "observation": r"Observation\s*(?:\d+:|:)\s*(.*?)(?:\s*Eureka Thought\s*(?:\d+:|:)|Final Answer\s*(?:\d+:|:)|$)",
-        "eureka_thought": r"Eureka Thought\s*(?:\d+:|:)\s*(.*?)(?:\s*Final Answer\s*(?:\d+:|:)|$)",
-        "final_answer": r"Final Answer\s*(?:\d+:|:)\s*(.*)"
-    }
-    
-    extracted_data = {}
-    for key, pattern in patterns.items():
-        match = re.search(pattern, response, re.DOTALL)
-        extracted_data[key] = match.group(1).strip() if match else None
-    
-    return extracted_data
+    """Parse the LLM output into structured components.
+
+    The sections are found in a single scan of the response (see `react_parser`),
+    rather than with one backtracking regex search per section.
+    """
+    return parse_react_output(response)
 
 
 def format_react_loop(react_loop: dict[str, str]) -> Optional[tuple[str, str]]:
@@ -50,13 +44,111 @@ def format_react_loop(react_loop: dict[str, str]) -> Optional[tuple[str, str]]:
     ordered_keys = ['thought', 'action', 'action_input', 'observation', 'eureka_thought', 'final_answer']
     
     for key in ordered_keys:
+        # a step with several numbered actions shows them all, numbered
+        if key == 'action' and react_loop.get('actions'):
+            for action in react_loop['actions']:
+                components.append(f"Action {action['number']} : {action['action']}")
+                components.append(f"Action Input {action['number']} : {action['action_input']}")
+            continue
+        if key == 'action_input' and react_loop.get('actions'):
+            continue
         if react_loop.get(key):
             formatted_key = ' '.join(word.capitalize() for word in key.split('_'))
             components.append(f"{formatted_key} : {react_loop[key]}")
     
     return '\n'.join(components)
 
-def react_agent(question: str, llm_brain_call: Callable, prompt_template: str, tools: dict, max_iterations: int = 10) -> Optional[str]:
+def get_action(react_step: dict[str, str]) -> tuple[str, str]:
+    """Return the (action name, action input) of a ReAct step."""
+    action_name = react_step['action'].strip()
+    action_input = react_step.get('action_input', '').strip('"')
+    return action_name, action_input
+
+def format_observation(observation: Optional[str]) -> str:
+    return observation if observation else "No results found."
+
+def format_tool_error(error: Exception) -> str:
+    return f"Error occurred while executing action: {str(error)}"
+
+def format_invalid_action(action_name: str, tools: dict) -> str:
+    return f"Error: Invalid action '{action_name}'. Must be one of {list(tools.keys())}"
+
+# seconds a tool may take when several actions run at once (None: no limit)
+DEFAULT_TOOL_TIMEOUT = 60
+TOOL_TIMEOUTS = {'ask_user': None}
+# interactive tools run one at a time, after the others
+SEQUENTIAL_TOOLS = frozenset({'ask_user'})
+
+_action_pool: Optional[ThreadPoolExecutor] = None
+
+def _get_action_pool() -> ThreadPoolExecutor:
+    global _action_pool
+    if _action_pool is None:
+        _action_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="react-action")
+    return _action_pool
+
+def format_tool_timeout(action_name: str, timeout: float) -> str:
+    return f"Error: {action_name} did not answer within {timeout:g} seconds"
+
+def format_multi_observation(actions: list[dict]) -> str:
+    """Merge the observations of several actions, in the order of their numbers."""
+    return '\n\n'.join(f"[Action {action['number']}: {action['action']}] {action['observation']}" for action in actions)
+
+def call_tool(action_name: str, tool: Callable, action_input: str):
+    """Call a tool, recorded as a `tool.call` span when tracing is on (see `tracing`)."""
+    with span("tool.call", tool=action_name, input_chars=len(action_input)) as tool_span:
+        observation = tool(action_input)
+        tool_span.set(observation_chars=len(observation) if observation else 0)
+        return observation
+
+def execute_actions(react_step: dict, tools: dict) -> None:
+    """
+    Execute the numbered actions of a step (`react_step['actions']`) concurrently in a thread
+    pool, each within its tool's timeout, and store the merged observation in the step.
+    """
+    actions = react_step['actions']
+    futures = {}
+    start = time.monotonic()
+    for action in actions:
+        action_name, action_input = get_action(action)
+        if action_name not in tools:
+            action['observation'] = format_invalid_action(action_name, tools)
+        elif action_name not in SEQUENTIAL_TOOLS:
+            futures[action['number']] = _get_action_pool().submit(in_current_context(call_tool), action_name, tools[action_name], action_input)
+
+    for action in actions:
+        if 'observation' in action:
+            continue
+        action_name, action_input = get_action(action)
+        timeout = TOOL_TIMEOUTS.get(action_name, DEFAULT_TOOL_TIMEOUT)
+        try:
+            if action['number'] in futures:
+                # the timeout counts from the start of all the actions, not from this wait
+                remaining = None if timeout is None else max(start + timeout - time.monotonic(), 0)
+                observation = futures[action['number']].result(timeout=remaining)
+            else:
+                observation = call_tool(action_name, tools[action_name], action_input)
+            action['observation'] = format_observation(observation)
+        except FutureTimeoutError:
+            action['observation'] = format_tool_timeout(action_name, timeout)
+        except Exception as e:
+            action['observation'] = format_tool_error(e)
+    react_step['observation'] = format_multi_observation(actions)
+
+def execute_action(react_step: dict[str, str], tools: dict) -> None:
+    """Execute the action of a ReAct step with the matching tool and store the observation in the step."""
+    action_name, action_input = get_action(react_step)
+
+    # Execute the tool
+    if action_name in tools:
+        try:
+            react_step['observation'] = format_observation(call_tool(action_name, tools[action_name], action_input))
+        except Exception as e:
+            react_step['observation'] = format_tool_error(e)
+    else:
+        react_step['observation'] = format_invalid_action(action_name, tools)
+
+def react_agent(question: str, llm_brain_call: Callable, prompt_template: str, tools: dict, max_iterations: int = 10, prompt_buffer: Optional[PromptBuffer] = None, speculation=None, action_memo=None) -> Optional[str]:
     """
     Execute the ReAct agent loop.
     
@@ -66,72 +158,108 @@ def react_agent(question: str, llm_brain_call: Callable, prompt_template: str, t
         prompt_template: The template for the ReAct prompt
         tools: Dictionary of available tools
         max_iterations: Maximum number of iterations before giving up
+        prompt_buffer: Optional buffer to build the prompt in; pass one in to inspect
+            the steps and the prompt size per iteration (`prompt_buffer.sizes`) afterwards
+        speculation: Optional `speculation.SpeculativeActions`, shared with a streaming brain,
+            whose tool calls started mid-stream are used for the steps they match
+        action_memo: Optional `repeated_actions.ActionMemo`: repeated actions reuse the earlier
+            observation, and loops of repeats are escalated (e.g. to a final answer)
         
     Returns:
         Optional[str]: The final answer if found, None otherwise
     """
-    prompt = prompt_template.format(question=question)
-    full_conversation: list[dict[str, str]] = []
-    iterations = 0
+    if prompt_buffer is None:
+        prompt_buffer = PromptBuffer(prompt_template, question, format_step=format_react_loop)
+    state = AgentState(question, prompt_buffer, max_iterations=max_iterations, action_memo=action_memo)
+    return run_react_loop(state, llm_brain_call, tools, speculation=speculation)
+
+def waits_for_user(react_step: dict, interactive_tools: frozenset) -> bool:
+    """Whether a step waits for the user: a single action of one of the `interactive_tools`."""
+    return bool(react_step.get('action')) and not react_step.get('actions') and get_action(react_step)[0] in interactive_tools
+
+@traced("react.run")
+def run_react_loop(state: AgentState, llm_brain_call: Callable, tools: dict, speculation=None, interactive_tools: frozenset = frozenset()) -> Optional[tuple[str, str]]:
+    """
+    Run the ReAct loop of `state` until it finds an answer, gives up, or waits for the user.
+
+    A step calling one of the `interactive_tools` (e.g. "ask_user") parks the run instead of
+    calling the tool: `state.status` is then `WAITING_FOR_USER`, and the run goes on with
+    `state.resume(answer)` and another call of this function (see `agent_state`).
+
+    Args:
+        state: The run's state, updated as the loop goes
+        llm_brain_call: The function to call the LLM agentic brain
+        tools: Dictionary of available tools
+        speculation: Optional `speculation.SpeculativeActions` (see `react_agent`)
+        interactive_tools: Tools that wait for the user, which park the run
+
+    Returns:
+        Optional[tuple[str, str]]: The final answer and the ReAct history if found, None otherwise
+    """
+    if state.pending_step is not None:
+        raise ValueError("The run is waiting for an answer from the user: call state.resume() first")
+    prompt_buffer, action_memo = state.prompt_buffer, state.action_memo
     
-    while iterations < max_iterations:
-        # get LLM response
-        response = llm_brain_call(prompt)
-        if not response:
-            print("No response from LLM. Exiting loop.")
-            return None
-            
-        # parse the response
-        react_step = parse_llm_output(response)
-        
-        # check for final answer
-        if react_step.get('final_answer'):
-
-            # format full react history
-            full_conversation.append(react_step)
-            conversation_text = "\n\n".join(
-                format_react_loop(step) 
-                for _, step in enumerate(full_conversation)
-            )
-
-            # return answer, and full history 
-            print(f"\n\nFinal answer found in {iterations + 1} iterations.\n")
-            return react_step['final_answer'], conversation_text
-            
-        # execute action if present and get observation
-        if react_step.get('action'):
-            action_name = react_step['action'].strip()
-            action_input = react_step.get('action_input', '').strip('"')
-            
-            # Execute the tool
-            if action_name in tools:
-                try:
-                    observation = tools[action_name](action_input)
-                    react_step['observation'] = observation if observation else "No results found."
-                except Exception as e:
-                    react_step['observation'] = f"Error occurred while executing action: {str(e)}"
-            else:
-                react_step['observation'] = f"Error: Invalid action '{action_name}'. Must be one of {list(tools.keys())}"
-        
-        # add step to conversation history
-        full_conversation.append(react_step)
-        
-        # format conversation history
-        conversation_text = "\n\n".join(
-            format_react_loop(step) 
-            for _, step in enumerate(full_conversation)
-        )
-        
-        # update prompt with conversation history
-        prompt = f"{prompt_template.format(question=question)}\n{conversation_text}"
-        # print(f"** React step {iterations + 1}: {conversation_text} **\n\n")
+    while state.iterations < state.max_iterations:
+        with span("react.iteration", iteration=state.iterations + 1) as iteration_span:
+            # get LLM response
+            with span("llm.call", prompt_bytes=prompt_buffer.prompt_bytes, prompt_tokens=prompt_buffer.sizes[-1]["tokens"]) as llm_span:
+                response = llm_brain_call(prompt_buffer.prompt)
+                llm_span.set(completion_chars=len(response) if response else 0)
+            if not response:
+                print("No response from LLM. Exiting loop.")
+                state.finish(NO_RESPONSE)
+                return None
+
+            # parse the response
+            react_step = parse_llm_output(response)
+
+            # an action already run: reuse its observation instead of calling the tool again
+            repeated = action_memo is not None and action_memo.reuse(react_step, state.iterations + 1)
+
+            # use the tool call started while the response was streaming, if it matches the step
+            speculated = speculation is not None and speculation.claim(react_step)
+            iteration_span.set(action=react_step.get('action'), final=bool(react_step.get('final_answer')), repeated=repeated, speculated=speculated)
+
+            if repeated and action_memo.stopped:
+                state.finish(REPEATED_ACTIONS)
+                print("The same action keeps being repeated. Exiting loop.")
+                return None
+
+            # check for final answer
+            if react_step.get('final_answer'):
+
+                # add the last step to the react history
+                prompt_buffer.append(react_step)
+
+                # return answer, and full history 
+                state.finish(ANSWERED, react_step['final_answer'])
+                print(f"\n\nFinal answer found in {state.iterations + 1} iterations.\n")
+                return react_step['final_answer'], prompt_buffer.conversation_text
+
+            # a question for the user: park the run until the answer comes
+            if waits_for_user(react_step, interactive_tools):
+                iteration_span.set(parked=True)
+                state.park(react_step)
+                return None
+
+            # execute action(s) if present and get observation
+            if speculated or repeated:
+                pass
+            elif react_step.get('actions'):
+                execute_actions(react_step, tools)
+            elif react_step.get('action'):
+                execute_action(react_step, tools)
 
-        iterations += 1
+            # add step to conversation history, rendering it only once
+            state.complete_step(react_step)
+            # print(f"** React step {state.iterations}: {prompt_buffer.conversation_text} **\n\n")
     
     print("Maximum iterations reached without finding a final answer.")
+    state.finish(MAX_ITERATIONS)
     return None
 
-def main(question: str, llm_brain_call: Callable, prompt_template: str, tools: dict) -> Optional[str]:
+def main(question: str, llm_brain_call: Callable, prompt_template: str, tools: dict, action_memo=None) -> Optional[str]:
     """
     Main entry point for the ReAct agent.
     
@@ -139,30 +267,30 @@ def main(question: str, llm_brain_call: Callable, prompt_template: str, tools: d
         question: The user's question
         prompt_template: The template for the ReAct prompt
         tools: Dictionary of available tools
+        action_memo: Optional `repeated_actions.ActionMemo` reusing the observations of repeated actions
         
     Returns:
         Optional[str]: The final answer if found, None otherwise
     """
-    return react_agent(question, llm_brain_call, prompt_template, tools)
+    return react_agent(question, llm_brain_call, prompt_template, tools, action_memo=action_memo)
 
 
 if __name__ == "__main__":
     from react_agents_from_scratch.openai_react import call_llm
+    from react_agents_from_scratch.repeated_actions import ActionMemo
+    from react_agents_from_scratch.tool_registry import load_tools
     from react_agents_from_scratch.utils import read_prompt_from_txt
     REACT_AGENT_PROMPT = read_prompt_from_txt("react_agents_from_scratch/openai_react/prompts/react_agent_prompt.txt")
 
-    tools = {
-        'search_govuk': tools.search_govuk,
-        'search_govuk_services': tools.search_govuk_services,
-        'ask_user': tools.ask_user
-    }
+    tools = load_tools()
 
     user_question = input("Please enter your question: ")
     answer, _ = main(
         question=user_question,
         llm_brain_call=call_llm.get_llm_response,
         prompt_template=REACT_AGENT_PROMPT,
-        tools=tools
+        tools=tools,
+        action_memo=ActionMemo()
     )
     if answer:
         print(f"Here is an answer for you! \n: {answer} \n\n")
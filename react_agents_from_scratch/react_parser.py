@@ -0,0 +1,231 @@
+import re
+from typing import Optional
+
+
+# ReAct sections in the order they appear in a step. A section runs from its marker
+# to the next marker of a *later* section (or the end of the text).
+SECTION_KEYS = ['thought', 'action', 'action_input', 'observation', 'eureka_thought', 'final_answer']
+_RANK = {key: rank for rank, key in enumerate(SECTION_KEYS)}
+
+# One compiled alternation matching every section marker, scanned once over the text.
+# The alternatives are kept free of capture groups so the regex engine can skip ahead
+# to the next candidate first letter instead of trying every position.
+_MARKER_PATTERN = re.compile(r"(?:Eureka Thought|Action Input|Thought|Action|Observation|Final Answer)\s*\d*:")
+_MARKER_KEYS = {'E': 'eureka_thought', 'T': 'thought', 'O': 'observation', 'F': 'final_answer'}
+_LEADING_WHITESPACE = re.compile(r"\s*")
+_LONGEST_MARKER_NAME = len("Eureka Thought")
+# "Eureka Thought:" also counts as a "Thought:" marker, starting after "Eureka ".
+_EUREKA_PREFIX = len("Eureka ")
+_MARKER_NUMBER = re.compile(r"(\d+)\s*:$")
+# numbered actions ("Action 1:", "Action Input 1:", "Action 2:", ...) asked for in one step
+MAX_ACTIONS_PER_STEP = 4
+
+
+def _marker_key(marker: str) -> str:
+    if marker[0] == 'A':
+        return 'action_input' if marker.startswith('Action Input') else 'action'
+    return _MARKER_KEYS[marker[0]]
+
+
+class ReactOutputParser:
+    """
+    Single-pass, incremental tokenizer for ReAct LLM output.
+
+    Section markers (Thought / Action / Action Input / Observation / Eureka Thought /
+    Final Answer) are found with one compiled regex in a single left-to-right scan.
+    Text can be fed chunk by chunk as a streamed completion arrives: only the new text
+    (plus a short tail that may hold a partially received marker) is scanned on each
+    `feed`, and `result()` can be called at any time.
+
+    The result matches the one of the original regex-per-section parser: each section
+    starts at the first occurrence of its marker and ends at the next marker of a later
+    section, and sections without a marker are None.
+
+    Example:
+        parser = ReactOutputParser()
+        for chunk in stream:
+            parser.feed(chunk)
+        react_step = parser.result()
+    """
+
+    def __init__(self):
+        self._chunks: list[str] = []
+        self._length = 0
+        # text not scanned for good yet, starting at offset `_scan_from` of the full text
+        self._tail = ""
+        self._scan_from = 0
+        # (key, marker start, content start) for every marker, in text order
+        self.markers: list[tuple[str, int, int]] = []
+        # the number of each marker ("Action 2:"), or None
+        self.numbers: list[Optional[int]] = []
+
+    @property
+    def text(self) -> str:
+        """All the text fed so far."""
+        if len(self._chunks) > 1:
+            self._chunks = ["".join(self._chunks)]
+        return self._chunks[0] if self._chunks else ""
+
+    def feed(self, chunk: str) -> list[tuple[str, int, int]]:
+        """
+        Add a chunk of text and scan it for section markers.
+
+        Returns:
+            list: The markers found in this chunk, as (key, marker start, content start)
+        """
+        if not chunk:
+            return []
+        self._chunks.append(chunk)
+        self._length += len(chunk)
+        window = self._tail + chunk
+        offset = self._scan_from
+
+        new_markers = []
+        scanned_to = 0
+        for match in _MARKER_PATTERN.finditer(window):
+            marker = match.group()
+            new_markers.append((_marker_key(marker), offset + match.start(), offset + match.end()))
+            number = _MARKER_NUMBER.search(marker)
+            self.numbers.append(int(number.group(1)) if number else None)
+            scanned_to = match.end()
+        self.markers.extend(new_markers)
+
+        # keep the tail for the next scan: it may hold the start of a marker that is cut
+        # in two (a marker name followed by whitespace and digits still waiting for its colon)
+        tail_end = len(window)
+        while tail_end > scanned_to and (window[tail_end - 1].isspace() or window[tail_end - 1].isdecimal()):
+            tail_end -= 1
+        keep_from = max(scanned_to, tail_end - _LONGEST_MARKER_NAME, 0)
+        self._tail = window[keep_from:]
+        self._scan_from = offset + keep_from
+        return new_markers
+
+    def first_marker(self, key: str) -> Optional[tuple[int, int]]:
+        """Return (marker start, content start) of the first marker of a section, if any."""
+        for marker_key, start, end in self.markers:
+            if marker_key == key:
+                return start, end
+            if key == 'thought' and marker_key == 'eureka_thought':
+                return start + _EUREKA_PREFIX, end
+        return None
+
+    def section_end(self, key: str, content_start: int) -> Optional[int]:
+        """Return where a section starting at `content_start` ends, or None if it runs to the end."""
+        rank = _RANK[key]
+        for marker_key, start, _ in self.markers:
+            if start >= content_start and _RANK[marker_key] > rank:
+                return start
+        return None
+
+    def section(self, key: str) -> Optional[str]:
+        """Return the stripped content of a section, or None if its marker has not been seen."""
+        first = self.first_marker(key)
+        if first is None:
+            return None
+        text = self.text
+        content_start = _LEADING_WHITESPACE.match(text, first[1]).end()
+        end = self.section_end(key, content_start)
+        return text[content_start:end].strip()
+
+    def cutoff_position(self) -> Optional[int]:
+        """
+        Return where the completion should be cut, or None if it should carry on.
+
+        Once the step has an Action Input or a Final Answer, any further section marker
+        means the model has gone on to invent an Observation (or whole later steps),
+        which would be thrown away anyway: the step is complete at that marker. The one
+        exception is the next numbered action of a step asking for several actions.
+        """
+        complete_at = None
+        for (marker_key, start, _), number in zip(self.markers, self.numbers):
+            if complete_at is not None:
+                next_action = complete_at == 'action_input' and number is not None and marker_key in ('action', 'action_input')
+                if not next_action:
+                    return start
+            if marker_key in ('action_input', 'final_answer'):
+                complete_at = marker_key
+        return None
+
+    def early_action(self, complete: bool = False) -> Optional[tuple[str, str]]:
+        """
+        Return (action, action input) as soon as the Action Input line is complete, or None.
+
+        Used to start the tool while the model is still writing the rest of the step. The
+        guess can still turn out wrong (an Action Input running over several lines, further
+        numbered actions), so it must be checked against the parse of the whole step.
+
+        Args:
+            complete: The completion has ended (e.g. on the "\nObservation" stop sequence,
+                which swallows the newline after the Action Input): its last line is complete
+        """
+        input_start = None
+        for (marker_key, _, content_start), number in zip(self.markers, self.numbers):
+            if number is not None or marker_key == 'final_answer':
+                return None
+            if marker_key == 'action_input':
+                input_start = content_start
+                break
+        if input_start is None:
+            return None
+        action = self.section('action')
+        text = self.text
+        start = _LEADING_WHITESPACE.match(text, input_start).end()
+        line_end = text.find('\n', start)
+        if line_end == -1 and complete:
+            line_end = len(text)
+        if not action or line_end == -1:
+            return None
+        return action, text[start:line_end].strip()
+
+    def actions(self) -> list[dict]:
+        """
+        Return the numbered actions of a step asking for several actions at once, or [].
+
+        Example:
+            "Action 1: search_govuk\nAction Input 1: x\nAction 2: search_govuk_services\nAction Input 2: y"
+            -> [{"number": 1, "action": "search_govuk", "action_input": "x"},
+                {"number": 2, "action": "search_govuk_services", "action_input": "y"}]
+        """
+        text = None
+        found: dict[int, dict] = {}
+        for i, ((marker_key, _, content_start), number) in enumerate(zip(self.markers, self.numbers)):
+            if marker_key not in ('action', 'action_input'):
+                if marker_key in ('observation', 'eureka_thought', 'final_answer'):
+                    break
+                continue
+            if number is None:
+                continue
+            text = text if text is not None else self.text
+            # a numbered action section runs to the next marker of any kind
+            end = self.markers[i + 1][1] if i + 1 < len(self.markers) else len(text)
+            action = found.setdefault(number, {"number": number, "action": None, "action_input": None})
+            if action[marker_key] is None:
+                action[marker_key] = text[content_start:end].strip()
+        actions = [found[number] for number in sorted(found) if found[number]["action"]]
+        if len(actions) < 2:
+            return []
+        for action in actions:
+            action["action_input"] = action["action_input"] or ""
+        return actions[:MAX_ACTIONS_PER_STEP]
+
+    def result(self) -> dict[str, Optional[str]]:
+        """
+        Return the parsed sections, in the same shape as `parse_llm_output`.
+
+        A step with several numbered actions also gets an "actions" list (see `actions`), and
+        its "action" / "action_input" are those of the first action.
+        """
+        result = {key: self.section(key) for key in SECTION_KEYS}
+        actions = self.actions()
+        if actions:
+            result['action'] = actions[0]['action']
+            result['action_input'] = actions[0]['action_input']
+            result['actions'] = actions
+        return result
+
+
+def parse_react_output(response: str) -> dict[str, Optional[str]]:
+    """Parse a complete LLM response into ReAct sections in a single scan."""
+    parser = ReactOutputParser()
+    parser.feed(response)
+    return parser.result()
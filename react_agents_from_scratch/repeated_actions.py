@@ -0,0 +1,167 @@
+"""
+Repeated action detection for the ReAct loop.
+
+Models often call a tool again with the same, or nearly the same, input (e.g.
+`search_govuk` with "Register for Self-Assessment" and then "register for self assessment"),
+paying for the tool and an LLM call each time until `max_iterations` ends the run.
+
+`ActionMemo` keeps the observation of every action under a normalised (action, input) key.
+A repeated action reuses the earlier observation instead of calling the tool again, with a
+note telling the model it is a repeat. Once the same action has been repeated
+`max_repeats` times, the loop is escalated:
+
+- "final_answer": the observation asks the model to give its Final Answer now from the
+  observations it already has; if it repeats the action yet again, the run stops;
+- "stop": the run stops straight away, without an answer;
+- None: repeats are only reused.
+
+Example:
+    memo = ActionMemo(max_repeats=2, escalation="final_answer")
+    react_agent(question, llm_brain_call, prompt_template, tools, action_memo=memo)
+    memo.stats()  # {"repeats": 2, "tool_calls_saved": 2, "loops_detected": 1, "iterations_saved": 6}
+"""
+from typing import Optional
+
+from react_agents_from_scratch.react_agent_naive import SEQUENTIAL_TOOLS, get_action
+from react_agents_from_scratch.text_terms import words
+
+ESCALATIONS = ("final_answer", "stop")
+DEFAULT_MAX_REPEATS = 2
+
+
+def normalise_action(action_name: str, action_input: str) -> tuple[str, str]:
+    """
+    The key of an action for repeat detection: the lowercased action name, and the words of
+    its input (lowercase, without punctuation, in order). Only case, punctuation and spacing
+    are folded: every word is kept, question words included, so distinct questions are never
+    taken for repeats.
+
+    Example:
+        normalise_action("search_govuk", "How do I register for Self-Assessment?")
+        -> ("search_govuk", "how do i register for self assessment")
+    """
+    terms = words(action_input)
+    return action_name.strip().lower(), " ".join(terms) if terms else " ".join(action_input.lower().split())
+
+
+def format_repeated_observation(observation: str, step: int) -> str:
+    return f"[You already ran this action in step {step}: its result is repeated below. Try a different action or input.]\n{observation}"
+
+
+def format_escalation(action_name: str, repeats: int) -> str:
+    return (
+        f"[You have run {action_name} with this input {repeats + 1} times and it will not give anything new. "
+        "Do not repeat it: write your Final Answer now, based on the observations above.]"
+    )
+
+
+class ActionMemo:
+    """Observations of the actions run so far, keyed by normalised (action, input), with loop escalation."""
+
+    def __init__(self, max_repeats: int = DEFAULT_MAX_REPEATS, escalation: Optional[str] = "final_answer", tools_excluded: frozenset = SEQUENTIAL_TOOLS):
+        """
+        Args:
+            max_repeats: Repeats of the same action after which the loop is escalated
+            escalation: "final_answer", "stop" or None (see the module docstring)
+            tools_excluded: Tools never reused (interactive ones: the user may answer differently)
+        """
+        if escalation is not None and escalation not in ESCALATIONS:
+            raise ValueError(f"escalation must be one of {ESCALATIONS} or None, not {escalation!r}")
+        self.max_repeats = max_repeats
+        self.escalation = escalation
+        self.tools_excluded = tools_excluded
+        # key -> (step number, observation, number of repeats)
+        self._seen: dict[tuple[str, str], tuple[int, str, int]] = {}
+        # keys of the actions whose loop has been escalated
+        self._escalated: set[tuple[str, str]] = set()
+        self.stopped = False
+        self.repeats = 0
+        self.tool_calls_saved = 0
+        self.loops_detected = 0
+        self.iterations_saved = 0
+
+    def reuse(self, react_step: dict, step: int) -> bool:
+        """
+        Store the observation of an earlier identical action in a single-action step.
+
+        Sets `stopped` when the loop has to end (see `escalation`).
+
+        Args:
+            react_step: The parsed step
+            step: The step's number (from 1)
+
+        Returns:
+            bool: True if the step's observation was filled in without calling the tool
+        """
+        if not react_step.get('action') or react_step.get('actions') or react_step.get('final_answer'):
+            return False
+        action_name, action_input = get_action(react_step)
+        if action_name in self.tools_excluded:
+            return False
+        key = normalise_action(action_name, action_input)
+        if key not in self._seen:
+            return False
+        first_step, observation, repeats = self._seen[key]
+        repeats += 1
+        self._seen[key] = (first_step, observation, repeats)
+        self.repeats += 1
+        self.tool_calls_saved += 1
+
+        if self.escalation is not None and (repeats >= self.max_repeats or key in self._escalated):
+            if repeats == self.max_repeats:
+                self.loops_detected += 1
+            # the model was already asked for its Final Answer after this very action
+            if self.escalation == "stop" or key in self._escalated:
+                self.stopped = True
+            self._escalated.add(key)
+            react_step['observation'] = format_escalation(action_name, repeats)
+        else:
+            react_step['observation'] = format_repeated_observation(observation, first_step)
+        return True
+
+    def record(self, react_step: dict, step: int) -> None:
+        """Remember the observation of a single-action step's action (tool errors are not kept)."""
+        if not react_step.get('action') or react_step.get('actions') or not react_step.get('observation'):
+            return
+        action_name, action_input = get_action(react_step)
+        observation = react_step['observation']
+        if action_name in self.tools_excluded or observation.startswith("Error"):
+            return
+        self._seen.setdefault(normalise_action(action_name, action_input), (step, observation, 0))
+
+    def end_run(self, iterations: int, max_iterations: int) -> None:
+        """Count the iterations a run cut short by an escalation did not use."""
+        if self._escalated:
+            self.iterations_saved += max(max_iterations - iterations, 0)
+
+    def to_dict(self) -> dict:
+        """The memo as plain JSON data, to park a run with its state (see `agent_state`)."""
+        return {
+            "max_repeats": self.max_repeats,
+            "escalation": self.escalation,
+            "tools_excluded": sorted(self.tools_excluded),
+            "seen": [[*key, *value] for key, value in self._seen.items()],
+            "escalated": [list(key) for key in sorted(self._escalated)],
+            "stopped": self.stopped,
+            **self.stats(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ActionMemo":
+        memo = cls(data["max_repeats"], data["escalation"], frozenset(data["tools_excluded"]))
+        memo._seen = {(name, terms): (step, observation, repeats) for name, terms, step, observation, repeats in data["seen"]}
+        memo._escalated = {(name, terms) for name, terms in data["escalated"]}
+        memo.stopped = data["stopped"]
+        memo.repeats = data["repeats"]
+        memo.tool_calls_saved = data["tool_calls_saved"]
+        memo.loops_detected = data["loops_detected"]
+        memo.iterations_saved = data["iterations_saved"]
+        return memo
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "repeats": self.repeats,
+            "tool_calls_saved": self.tool_calls_saved,
+            "loops_detected": self.loops_detected,
+            "iterations_saved": self.iterations_saved,
+        }
@@ -1,16 +1,13 @@
-from functools import partial
 from react_agents_from_scratch.openai_react import call_llm
 from react_agents_from_scratch.react_agent_naive import main
-from react_agents_from_scratch import tools
+from react_agents_from_scratch.repeated_actions import ActionMemo
+from react_agents_from_scratch.tool_registry import load_tools
 from react_agents_from_scratch.utils import read_prompt_from_txt, format_and_save_markdown
 
 REACT_AGENT_PROMPT = read_prompt_from_txt("react_agents_from_scratch/openai_react/prompts/react_agent_prompt.txt")
 
-tools = {
-        'search_govuk': partial(tools.search_govuk, min_results=3),
-        'search_govuk_services': partial(tools.search_govuk_services, page=1, top_n_results=6),
-        'ask_user': tools.ask_user
-    }
+# each tool is imported when the agent first calls it
+tools = load_tools()
 
 user_question = input("Please enter your question: ")
     
@@ -18,7 +15,8 @@ answer, react_history = main(
         question=user_question,
         llm_brain_call=call_llm.get_llm_response,
         prompt_template=REACT_AGENT_PROMPT,
-        tools=tools
+        tools=tools,
+        action_memo=ActionMemo()
     )
 if answer:
     print("\n")
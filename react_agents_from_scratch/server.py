@@ -0,0 +1,444 @@
+"""
+HTTP server for the agent: many users' runs on one event loop, with a bounded work queue.
+
+Runs are queued and taken by a fixed number of workers running `async_agent.arun_react_loop`.
+When the queue is full, new work is refused with 429 Too Many Requests and a Retry-After
+header instead of piling up. A run that asks the user a question is parked: its state goes
+to the session store (see `agent_state`), no worker waits for the answer, and the run is
+queued again when the answer is posted. The store is pluggable: in memory by default, JSON
+files with `FileSessionStore`, or any object with async `get`, `put` and `delete`.
+
+API:
+    POST /sessions                  {"question": ...}  -> 202 {"session_id": ..., "status": "queued"}
+    POST /sessions/{id}/answer      {"answer": ...}    -> 202, or 409 if the run is not waiting for one
+    GET  /sessions/{id}                                -> status, answer, pending question, steps
+    GET  /sessions/{id}/events                         -> the run's steps as server-sent events
+    GET  /health                                       -> queue length, workers, runs in progress
+
+POST requests with `?stream=1` answer with the events straight away. Events are "step"
+(a completed step), "waiting_for_user" (with the question) and "finished" (status and
+answer); a stream ends when the run finishes or waits for the user. Responses to POST
+requests give the session's URL in their Location header.
+
+Usage:
+    python -m react_agents_from_scratch.server --port 8080 --workers 16 --queue-size 64
+    curl -N -X POST localhost:8080/sessions?stream=1 -d '{"question": "When is the next bank holiday?"}'
+
+`benchmarks/bench_server.py` load-tests the server with a scripted LLM and local fixtures.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from aiohttp import web
+
+from react_agents_from_scratch.agent_state import FINISHED, WAITING_FOR_USER, AgentState
+from react_agents_from_scratch.async_agent import arun_react_loop
+from react_agents_from_scratch.prompt_buffer import PromptBuffer
+from react_agents_from_scratch.react_agent_naive import format_react_loop
+
+QUEUED = "queued"
+RUNNING = "running"
+ERROR = "error"
+# seconds clients are told to wait before retrying when the queue is full
+RETRY_AFTER = 1
+# session IDs are `uuid4().hex`: the routes match nothing else, so an ID never reaches a store
+# (or a file path) unchecked
+SESSION_ID_PATTERN = "[0-9a-f]{32}"
+
+
+class InMemorySessionStore:
+    """Sessions kept in memory as JSON strings, the oldest dropped beyond `max_sessions`."""
+
+    def __init__(self, max_sessions: int = 100_000):
+        self.max_sessions = max_sessions
+        self._sessions: OrderedDict[str, str] = OrderedDict()
+
+    async def get(self, session_id: str) -> Optional[dict]:
+        data = self._sessions.get(session_id)
+        return json.loads(data) if data is not None else None
+
+    async def put(self, session_id: str, record: dict) -> None:
+        self._sessions[session_id] = json.dumps(record, ensure_ascii=False)
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    async def delete(self, session_id: str) -> None:
+        self._sessions.pop(session_id, None)
+
+
+class FileSessionStore:
+    """Sessions kept as JSON files in a directory, e.g. to survive restarts."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, session_id: str) -> str:
+        path = os.path.realpath(os.path.join(self.directory, f"{session_id}.json"))
+        # e.g. "../secret" once URL-decoded: never read or write outside the directory
+        if os.path.dirname(path) != os.path.realpath(self.directory):
+            raise ValueError(f"Invalid session ID: {session_id!r}")
+        return path
+
+    def _read(self, session_id: str) -> Optional[dict]:
+        try:
+            with open(self._path(session_id), encoding="utf-8") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+
+    def _write(self, session_id: str, record: dict) -> None:
+        # write then rename, so a crash never leaves a half-written session
+        path = self._path(session_id)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as file:
+            json.dump(record, file, ensure_ascii=False)
+        os.replace(f"{path}.tmp", path)
+
+    def _delete(self, session_id: str) -> None:
+        try:
+            os.remove(self._path(session_id))
+        except FileNotFoundError:
+            pass
+
+    async def get(self, session_id: str) -> Optional[dict]:
+        return await asyncio.to_thread(self._read, session_id)
+
+    async def put(self, session_id: str, record: dict) -> None:
+        await asyncio.to_thread(self._write, session_id, record)
+
+    async def delete(self, session_id: str) -> None:
+        await asyncio.to_thread(self._delete, session_id)
+
+
+class _LiveRun:
+    """The events of a run in progress in this process, for the clients streaming them."""
+
+    def __init__(self):
+        self.events: list[tuple[str, dict]] = []
+        self.done = False
+        self._changed = asyncio.Event()
+
+    def add(self, event: str, data: dict) -> None:
+        self.events.append((event, data))
+        self._notify()
+
+    def close(self) -> None:
+        """End the streams, once the run is parked or finished and saved."""
+        self.done = True
+        self._notify()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def follow(self, start: int = 0):
+        """Yield the run's events from `start`, waiting for new ones until the run stops."""
+        position = start
+        while True:
+            changed = self._changed
+            while position < len(self.events):
+                yield self.events[position]
+                position += 1
+            if self.done:
+                return
+            await changed.wait()
+
+
+def _stored_events(record: dict) -> list[tuple[str, dict]]:
+    """The events of a run that is not in progress here, rebuilt from its stored state."""
+    state = record.get("state") or {}
+    # the step with the final answer is in the prompt but not counted, nor sent as a "step" event
+    steps = state.get("steps", [])[:state.get("iterations", 0)]
+    events = [("step", {"iteration": i, "step": step}) for i, step in enumerate(steps, 1)]
+    if record["status"] == WAITING_FOR_USER:
+        events.append((WAITING_FOR_USER, {"iteration": len(events) + 1, "step": state["pending_step"], "question": record["pending_question"]}))
+    elif record["status"] in FINISHED or record["status"] == ERROR:
+        events.append(("finished", {"status": record["status"], "answer": record.get("answer"), "error": record.get("error")}))
+    return events
+
+
+class AgentServer:
+    """
+    Serve agent runs over HTTP (see the module docstring).
+
+    Example:
+        server = AgentServer(make_brain=lambda: call_llm.AsyncLLMBrain(), prompt_template=prompt, tools=tools)
+        web.run_app(server.app(), port=8080)
+    """
+
+    def __init__(self, make_brain: Callable, prompt_template: str, tools: dict, store=None, workers: int = 8, queue_size: int = 64, max_iterations: int = 10, interactive_tools: frozenset = frozenset({'ask_user'}), make_action_memo: Optional[Callable] = None):
+        """
+        Args:
+            make_brain: Factory returning an (async or sync) LLM brain for each run
+            prompt_template: The template for the ReAct prompt
+            tools: Dictionary of available (async or sync) tools
+            store: Session store; an `InMemorySessionStore` if None
+            workers: Number of runs in progress at the same time
+            queue_size: Runs waiting for a worker, beyond which requests get a 429
+            max_iterations: Maximum number of iterations per run
+            interactive_tools: Tools asking the user, which park the run until the answer is posted
+            make_action_memo: Optional factory of a `repeated_actions.ActionMemo` for each session
+        """
+        self.make_brain = make_brain
+        self.prompt_template = prompt_template
+        self.tools = tools
+        self.store = store if store is not None else InMemorySessionStore()
+        self.workers = workers
+        self.queue_size = queue_size
+        self.max_iterations = max_iterations
+        self.interactive_tools = interactive_tools
+        self.make_action_memo = make_action_memo
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_tasks: list[asyncio.Task] = []
+        self._live: dict[str, _LiveRun] = {}
+        self.stats = {"accepted": 0, "rejected": 0, "completed": 0, "parked": 0, "errors": 0}
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.add_routes([
+            web.post("/sessions", self.create_session),
+            web.post(f"/sessions/{{session_id:{SESSION_ID_PATTERN}}}/answer", self.answer_session),
+            web.get(f"/sessions/{{session_id:{SESSION_ID_PATTERN}}}", self.get_session),
+            web.get(f"/sessions/{{session_id:{SESSION_ID_PATTERN}}}/events", self.session_events),
+            web.get("/health", self.health),
+        ])
+        app.on_startup.append(self._start_workers)
+        app.on_cleanup.append(self._stop_workers)
+        return app
+
+    async def _start_workers(self, app: web.Application) -> None:
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def _stop_workers(self, app: web.Application) -> None:
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+
+    def _claim(self, session_id: str) -> None:
+        """
+        Mark a session's run as in progress here, before anything is awaited: a concurrent
+        request for the same session then sees it in `_live` and cannot queue it twice.
+        """
+        self._live[session_id] = _LiveRun()
+
+    def _release(self, session_id: str) -> None:
+        self._live.pop(session_id).close()
+
+    def _enqueue(self, session_id: str, answer: Optional[str]) -> bool:
+        """Queue a claimed run (or the rest of a parked one); False, and the claim is dropped, if the queue is full."""
+        try:
+            self._queue.put_nowait((session_id, answer))
+        except asyncio.QueueFull:
+            self.stats["rejected"] += 1
+            self._release(session_id)
+            return False
+        self.stats["accepted"] += 1
+        return True
+
+    @staticmethod
+    def _busy() -> web.Response:
+        return web.json_response({"error": "The server is busy, try again later"}, status=429, headers={"Retry-After": str(RETRY_AFTER)})
+
+    async def _worker(self) -> None:
+        while True:
+            session_id, answer = await self._queue.get()
+            try:
+                await self._run(session_id, answer)
+            except Exception as e:
+                # e.g. the store failing to save the run: the worker carries on, or the pool
+                # would shrink until queued runs were never taken
+                print(f"Run of session {session_id} failed: {e!r}")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, session_id: str, answer: Optional[str]) -> None:
+        live = self._live[session_id]
+        record = None
+        try:
+            # e.g. evicted from an in-memory store while queued, or a corrupt session file
+            record = await self.store.get(session_id)
+            if record is None:
+                raise LookupError("The session is no longer in the store")
+            if record.get("state"):
+                state = AgentState.from_dict(record["state"], self.prompt_template)
+            else:
+                question = record["question"]
+                buffer = PromptBuffer(self.prompt_template, question, format_step=format_react_loop)
+                state = AgentState(question, buffer, max_iterations=self.max_iterations, action_memo=self.make_action_memo() if self.make_action_memo else None)
+            # stream the steps taken before, e.g. the ones before a question to the user
+            for event in _stored_events({"status": RUNNING, "state": state.to_dict()}):
+                live.add(*event)
+            state.listener = live.add
+            if answer is not None:
+                state.resume(answer)
+            await self.store.put(session_id, {**record, "status": RUNNING})
+            await arun_react_loop(state, self.make_brain(), self.tools, interactive_tools=self.interactive_tools)
+            record = {
+                **record,
+                "status": state.status,
+                "state": state.to_dict(),
+                "answer": state.answer,
+                "pending_question": state.pending_question,
+                "updated": time.time(),
+            }
+            self.stats["parked" if state.status == WAITING_FOR_USER else "completed"] += 1
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if record is not None:
+                record = {**record, "status": ERROR, "error": error, "updated": time.time()}
+            self.stats["errors"] += 1
+            live.add("finished", {"status": ERROR, "answer": None, "error": error})
+        finally:
+            try:
+                # saved before the streams end, so that the client can answer straight away
+                if record is not None:
+                    await self.store.put(session_id, record)
+            finally:
+                self._live.pop(session_id, None)
+                live.close()
+
+    async def _read_json(self, request: web.Request, field: str) -> str:
+        try:
+            body = await request.json()
+        except json.JSONDecodeError:
+            body = None
+        value = body.get(field) if isinstance(body, dict) else None
+        if not isinstance(value, str) or not value.strip():
+            raise web.HTTPBadRequest(text=json.dumps({"error": f"Expected a JSON object with a {field!r} string"}), content_type="application/json")
+        return value
+
+    async def _accepted(self, request: web.Request, session_id: str) -> web.StreamResponse:
+        location = {"Location": f"/sessions/{session_id}"}
+        if request.query.get("stream"):
+            return await self._stream(request, self._live[session_id], headers=location)
+        return web.json_response({"session_id": session_id, "status": QUEUED, "events": f"/sessions/{session_id}/events"}, status=202, headers=location)
+
+    async def create_session(self, request: web.Request) -> web.StreamResponse:
+        question = await self._read_json(request, "question")
+        if self._queue.full():
+            self.stats["rejected"] += 1
+            return self._busy()
+        session_id = uuid.uuid4().hex
+        now = time.time()
+        self._claim(session_id)
+        await self.store.put(session_id, {"session_id": session_id, "question": question, "status": QUEUED, "state": None, "created": now, "updated": now})
+        if not self._enqueue(session_id, None):
+            await self.store.delete(session_id)
+            return self._busy()
+        return await self._accepted(request, session_id)
+
+    async def answer_session(self, request: web.Request) -> web.StreamResponse:
+        session_id = request.match_info["session_id"]
+        answer = await self._read_json(request, "answer")
+        if session_id in self._live:
+            return web.json_response({"error": f"The session is not waiting for an answer (status: {RUNNING})"}, status=409)
+        # claimed before the record is read: a second answer posted meanwhile gets a 409, and
+        # the record cannot change until the claim is released
+        self._claim(session_id)
+        record = await self.store.get(session_id)
+        if record is None or record["status"] != WAITING_FOR_USER:
+            self._release(session_id)
+            if record is None:
+                raise web.HTTPNotFound(text=json.dumps({"error": "Unknown session"}), content_type="application/json")
+            return web.json_response({"error": f"The session is not waiting for an answer (status: {record['status']})"}, status=409)
+        await self.store.put(session_id, {**record, "status": QUEUED, "updated": time.time()})
+        if not self._enqueue(session_id, answer):
+            await self.store.put(session_id, record)
+            return self._busy()
+        return await self._accepted(request, session_id)
+
+    async def get_session(self, request: web.Request) -> web.Response:
+        session_id = request.match_info["session_id"]
+        record = await self.store.get(session_id)
+        if record is None:
+            raise web.HTTPNotFound(text=json.dumps({"error": "Unknown session"}), content_type="application/json")
+        state = record.get("state") or {}
+        return web.json_response({
+            "session_id": session_id,
+            "question": record["question"],
+            "status": record["status"],
+            "answer": record.get("answer"),
+            "pending_question": record.get("pending_question"),
+            "error": record.get("error"),
+            "iterations": state.get("iterations", 0),
+            "steps": state.get("steps", []),
+        })
+
+    async def session_events(self, request: web.Request) -> web.StreamResponse:
+        session_id = request.match_info["session_id"]
+        live = self._live.get(session_id)
+        if live is not None:
+            return await self._stream(request, live)
+        record = await self.store.get(session_id)
+        if record is None:
+            raise web.HTTPNotFound(text=json.dumps({"error": "Unknown session"}), content_type="application/json")
+        finished = _LiveRun()
+        for event in _stored_events(record):
+            finished.add(*event)
+        finished.close()
+        return await self._stream(request, finished)
+
+    async def _stream(self, request: web.Request, live: _LiveRun, headers: Optional[dict] = None) -> web.StreamResponse:
+        """Send a run's events as server-sent events until it finishes or waits for the user."""
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache", **(headers or {})})
+        await response.prepare(request)
+        async for event, data in live.follow():
+            await response.write(f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8"))
+        await response.write_eof()
+        return response
+
+    async def health(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            "queued": self._queue.qsize(),
+            "queue_size": self.queue_size,
+            "workers": self.workers,
+            "in_progress": len(self._live) - self._queue.qsize(),
+            **self.stats,
+        })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the ReAct agent over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=8, help="Agent runs in progress at the same time")
+    parser.add_argument("--queue-size", type=int, default=64, help="Runs waiting for a worker, beyond which requests get a 429")
+    parser.add_argument("--max-iterations", type=int, default=10)
+    parser.add_argument("--sessions-dir", default=None, help="Keep sessions as JSON files in this directory (in memory by default)")
+    parser.add_argument("--stream", action="store_true", help="Stream LLM completions and cut them at the end of the step")
+    parser.add_argument("--prompt", default="react_agents_from_scratch/openai_react/prompts/react_agent_prompt.txt")
+    args = parser.parse_args()
+
+    from react_agents_from_scratch.http_client import close_async_session
+    from react_agents_from_scratch.openai_react import call_llm
+    from react_agents_from_scratch.repeated_actions import ActionMemo
+    from react_agents_from_scratch.tool_registry import DEFAULT_TOOLS, load_tools
+    from react_agents_from_scratch.utils import read_prompt_from_txt
+
+    # ask_user is not called: asking the user parks the run until the answer is posted
+    tools = load_tools([name for name in DEFAULT_TOOLS if name != 'ask_user'], asynchronous=True)
+    server = AgentServer(
+        make_brain=lambda: call_llm.AsyncLLMBrain(stream=args.stream),
+        prompt_template=read_prompt_from_txt(args.prompt),
+        tools=tools,
+        store=FileSessionStore(args.sessions_dir) if args.sessions_dir else None,
+        workers=args.workers,
+        queue_size=args.queue_size,
+        max_iterations=args.max_iterations,
+        make_action_memo=ActionMemo,
+    )
+    app = server.app()
+    app.on_cleanup.append(lambda app: close_async_session())
+    web.run_app(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Speculative tool execution while the LLM is still generating.
+
+With a streaming brain, the tool call of a step is known as soon as its `Action Input:` line
+is complete, but the model may still write a few more tokens before the stream ends (the
+rest of the line, an invented Observation cut off by the client). `SpeculativeActions`
+starts the tool at that point, so the tool runs (for `search_govuk`: the search and the page
+fetches) while the completion finishes. When the API's stop sequence ends the step right after
+the Action Input (the newline is never streamed), the tool starts as soon as the stream reports
+the stop, before the usage chunk and the end of the stream.
+
+When the whole step is parsed, the agent loop claims the speculative call: if the step asks
+for the same action and input, its result is used; otherwise (a multi-line Action Input,
+several numbered actions, a Final Answer) the call is cancelled and the step runs as usual.
+A sync tool already running in a thread cannot be interrupted: its result is then discarded.
+
+Only read-only tools should be run speculatively; interactive tools (`SEQUENTIAL_TOOLS`,
+i.e. `ask_user`) never are.
+
+Example:
+    speculation = SpeculativeActions(tools)
+    brain = StreamingLLMBrain(speculation=speculation)
+    react_agent(question, brain, prompt_template, tools, speculation=speculation)
+    speculation.steps  # per step: whether the speculative call was used, and the seconds saved
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional, Union
+
+from react_agents_from_scratch.async_agent import acall_tool
+from react_agents_from_scratch.react_agent_naive import SEQUENTIAL_TOOLS, call_tool, format_observation, format_tool_error, get_action
+from react_agents_from_scratch.react_parser import ReactOutputParser
+from react_agents_from_scratch.tracing import in_current_context
+from react_agents_from_scratch.utils import is_async_callable
+
+
+class SpeculativeCall:
+    """A tool call started before the end of the LLM completion."""
+
+    def __init__(self, action_name: str, action_input: str):
+        self.action_name = action_name
+        self.action_input = action_input
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        self.pending: Union[Future, asyncio.Task, None] = None
+
+    def _done(self) -> None:
+        self.finished = time.perf_counter()
+
+    def run(self, tool: Callable) -> Any:
+        try:
+            return call_tool(self.action_name, tool, self.action_input)
+        finally:
+            self._done()
+
+    async def arun(self, tool: Callable, executor=None) -> Any:
+        try:
+            return await acall_tool(self.action_name, tool, self.action_input, executor=executor)
+        finally:
+            self._done()
+
+    def cancel(self) -> bool:
+        """Cancel the call; return False if it was already running in a thread (its result is then ignored)."""
+        return self.pending.cancel() if self.pending is not None else False
+
+
+class SpeculativeActions:
+    """
+    Start the action of a streamed step before the completion ends, and hand the call over
+    to the agent loop if the parsed step confirms it.
+
+    Pass the same object to the streaming brain (`speculation=`), which calls `observe` as
+    the completion arrives, and to the agent loop, which calls `claim` (or `aclaim`) on
+    every parsed step.
+    """
+
+    def __init__(self, tools: dict, speculative_tools: Optional[set[str]] = None, executor=None, max_workers: int = 4):
+        """
+        Args:
+            tools: The agent's tools
+            speculative_tools: Names of the tools that may be started early; all the tools
+                but the interactive ones (`SEQUENTIAL_TOOLS`) if None
+            executor: Thread pool for sync tools, from async code; the loop's default one if None
+            max_workers: Threads for sync tools started from sync code
+        """
+        self.tools = tools
+        self.speculative_tools = set(tools) - SEQUENTIAL_TOOLS if speculative_tools is None else set(speculative_tools) - SEQUENTIAL_TOOLS
+        self.executor = executor
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._max_workers = max_workers
+        self._lock = threading.Lock()
+        self._call: Optional[SpeculativeCall] = None
+        self._parser: Optional[ReactOutputParser] = None
+        # one record per claimed step
+        self.steps: list[dict] = []
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="react-speculation")
+        return self._pool
+
+    def observe(self, parser: ReactOutputParser, complete: bool = False) -> bool:
+        """
+        Look at a completion being streamed, and start its action once the Action Input
+        line is complete.
+
+        Args:
+            parser: The parser fed with the completion so far
+            complete: The completion has ended (see `ReactOutputParser.early_action`)
+
+        Returns:
+            bool: True if a speculative call was started by this call
+        """
+        with self._lock:
+            if self._parser is parser:
+                return False
+            early = parser.early_action(complete)
+            if early is None:
+                return False
+            # at most one speculative call per completion
+            self._parser = parser
+            action_name, action_input = get_action({"action": early[0], "action_input": early[1]})
+            tool = self.tools.get(action_name)
+            if action_name not in self.speculative_tools or tool is None:
+                return False
+            if self._call is not None:
+                self._call.cancel()
+            call = SpeculativeCall(action_name, action_input)
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                loop = None
+            if loop is not None:
+                call.pending = loop.create_task(call.arun(tool, self.executor))
+            elif not is_async_callable(tool):
+                call.pending = self._get_pool().submit(in_current_context(call.run), tool)
+            else:
+                # an async tool, streamed from a thread without an event loop: wait for the step
+                return False
+            self._call = call
+            return True
+
+    def _take(self, react_step: dict) -> Optional[SpeculativeCall]:
+        # the speculative call, if the parsed step asks for exactly that action; cancel it otherwise
+        with self._lock:
+            call, self._call = self._call, None
+            self._parser = None
+        if call is None:
+            self.steps.append({"speculated": False, "used": False, "saved": 0.0})
+            return None
+        claimed = time.perf_counter()
+        record = {"speculated": True, "action": call.action_name, "head_start": claimed - call.started}
+        # a step whose observation is already known (see `repeated_actions`) needs no tool call
+        if not react_step.get('observation') and not react_step.get('actions') and react_step.get('action') and not react_step.get('final_answer'):
+            if get_action(react_step) == (call.action_name, call.action_input):
+                record["used"] = True
+                self.steps.append(record)
+                return call
+        record.update({"used": False, "saved": 0.0, "cancelled": call.cancel()})
+        self.steps.append(record)
+        return None
+
+    def _record_saved(self, call: SpeculativeCall) -> None:
+        record = self.steps[-1]
+        tool_time = (call.finished or time.perf_counter()) - call.started
+        record["tool_time"] = tool_time
+        # without speculation, the tool would have started at the claim and taken as long
+        record["saved"] = min(record["head_start"], tool_time)
+
+    def claim(self, react_step: dict) -> bool:
+        """
+        Match a parsed step with the speculative call, and store the call's observation in
+        the step if it is the step's action.
+
+        Returns:
+            bool: True if the step's observation comes from the speculative call; False if the
+                step has to be executed as usual
+        """
+        call = self._take(react_step)
+        if call is None:
+            return False
+        try:
+            if isinstance(call.pending, asyncio.Task):
+                raise RuntimeError("a speculative call started on an event loop must be claimed with aclaim")
+            react_step['observation'] = format_observation(call.pending.result())
+        except Exception as e:
+            react_step['observation'] = format_tool_error(e)
+        self._record_saved(call)
+        return True
+
+    async def aclaim(self, react_step: dict) -> bool:
+        """Async version of `claim`."""
+        call = self._take(react_step)
+        if call is None:
+            return False
+        try:
+            pending = call.pending if isinstance(call.pending, asyncio.Task) else asyncio.wrap_future(call.pending)
+            react_step['observation'] = format_observation(await pending)
+        except Exception as e:
+            react_step['observation'] = format_tool_error(e)
+        self._record_saved(call)
+        return True
+
+    def cancel(self) -> None:
+        """Cancel a speculative call no step will claim (e.g. the loop ended)."""
+        with self._lock:
+            call, self._call = self._call, None
+            self._parser = None
+        if call is not None:
+            call.cancel()
+
+    def total_saved(self) -> float:
+        """Seconds of tool latency saved over all the steps."""
+        return sum(record.get("saved", 0.0) for record in self.steps)
@@ -0,0 +1,25 @@
+"""
+Word terms of a text for lexical scoring and matching.
+
+Shared by the passage scoring of `context_budget`, the BM25 index of `local_search` and the
+repeated-action detection of `repeated_actions`, which must all split text the same way.
+Scoring drops stopwords (`tokenize`); matching must keep them (`words`): "who is universal
+credit for" and "what is universal credit" are different questions.
+"""
+import re
+
+STOPWORDS = frozenset(
+    "a about an and are as at be by can do does for from has have how i if in is it its me my "
+    "of on or so that the their there this to was what when where which who why will with you your".split()
+)
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def words(text: str) -> list[str]:
+    """Lowercase words of a text, without punctuation, all kept (for matching)."""
+    return _WORD.findall(text.lower())
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase word terms of a text, without stopwords, for lexical scoring."""
+    return [word for word in words(text) if word not in STOPWORDS and len(word) > 1]
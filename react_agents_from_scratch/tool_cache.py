@@ -0,0 +1,241 @@
+import inspect
+import json
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from functools import wraps
+from typing import Any, Callable, Optional
+
+from react_agents_from_scratch.tracing import annotate
+
+# Seconds a cached result stays fresh, per tool. GOV.UK guidance changes rarely and the
+# bank holidays JSON about once a year; stale entries with an ETag or Last-Modified are
+# revalidated with a conditional request instead of being refetched.
+DEFAULT_TTLS = {
+    "search_govuk": 6 * 60 * 60,
+    "search_govuk_services": 6 * 60 * 60,
+    "bank_holidays": 7 * 24 * 60 * 60,
+    "page": 24 * 60 * 60,
+}
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    expires_at: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    def revalidation_headers(self) -> dict[str, str]:
+        """Headers for a conditional request (If-None-Match / If-Modified-Since)."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ToolCache:
+    """
+    Two-tier cache for tool results and fetched pages: an in-memory LRU backed by SQLite.
+
+    Entries live in a namespace (the tool name, or "page" for fetched pages) and expire
+    after the namespace's TTL. Expired entries are kept so that they can be revalidated
+    with their ETag / Last-Modified validators; expired entries without validators are
+    deleted on write. When the SQLite tier holds more than `max_rows` entries, those
+    expiring first (the stalest) are evicted.
+
+    Example:
+        cache = ToolCache("tool_cache.sqlite")
+        entry = cache.lookup("page", url)
+        if entry is None or not entry.fresh:
+            ...
+            cache.set("page", url, text, etag=response.headers.get("ETag"))
+        cache.stats()  # {"page": {"hits": ..., "misses": ..., ...}, ...}
+    """
+
+    def __init__(self, path: Optional[str] = "tool_cache.sqlite", memory_items: int = 512, ttls: Optional[dict[str, float]] = None, max_rows: int = 50_000):
+        self.path = path
+        self.memory_items = memory_items
+        self.max_rows = max_rows
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self._memory: OrderedDict[tuple[str, str], CacheEntry] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats: dict[str, dict[str, int]] = defaultdict(lambda: {"hits": 0, "stale": 0, "misses": 0, "revalidated": 0, "disk_hits": 0})
+        self._conn = None
+        if path:
+            import sqlite3  # only when there is a disk tier: keeps `import tools` light
+
+            self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, expires_at REAL NOT NULL, "
+                "etag TEXT, last_modified TEXT, PRIMARY KEY (namespace, key))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at)")
+            self._purge_expired()
+            self._rows = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def ttl(self, namespace: str) -> float:
+        return self.ttls.get(namespace, DEFAULT_TTLS["page"])
+
+    def lookup(self, namespace: str, key: str) -> Optional[CacheEntry]:
+        """Return the entry (fresh or stale), or None if it is not cached at all."""
+        with self._lock:
+            stats = self._stats[namespace]
+            entry = self._memory.get((namespace, key))
+            if entry is not None:
+                self._memory.move_to_end((namespace, key))
+            elif self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT value, expires_at, etag, last_modified FROM entries WHERE namespace = ? AND key = ?",
+                    (namespace, key)
+                ).fetchone()
+                if row is not None:
+                    entry = CacheEntry(json.loads(row[0]), row[1], row[2], row[3])
+                    stats["disk_hits"] += 1
+                    self._remember(namespace, key, entry)
+            if entry is None:
+                stats["misses"] += 1
+            elif entry.fresh:
+                stats["hits"] += 1
+            else:
+                stats["stale"] += 1
+            return entry
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """Return the cached value if it is fresh, None otherwise."""
+        entry = self.lookup(namespace, key)
+        return entry.value if entry is not None and entry.fresh else None
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None, etag: Optional[str] = None, last_modified: Optional[str] = None) -> CacheEntry:
+        expires_at = time.time() + (ttl if ttl is not None else self.ttl(namespace))
+        entry = CacheEntry(value, expires_at, etag, last_modified)
+        with self._lock:
+            self._remember(namespace, key, entry)
+            if self._conn is not None:
+                previous = self._conn.execute("SELECT 1 FROM entries WHERE namespace = ? AND key = ?", (namespace, key)).fetchone()
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO entries (namespace, key, value, expires_at, etag, last_modified) VALUES (?, ?, ?, ?, ?, ?)",
+                    (namespace, key, json.dumps(value, ensure_ascii=False), expires_at, etag, last_modified)
+                )
+                if previous is None:
+                    self._rows += 1
+                self._rows -= self._purge_expired()
+                if self._rows > self.max_rows:
+                    self._evict()
+        return entry
+
+    def _purge_expired(self) -> int:
+        """Delete the expired entries that cannot be revalidated (no ETag or Last-Modified); returns how many."""
+        return self._conn.execute(
+            "DELETE FROM entries WHERE expires_at < ? AND etag IS NULL AND last_modified IS NULL", (time.time(),)
+        ).rowcount
+
+    def _evict(self) -> None:
+        """Delete the entries expiring first until the SQLite tier fits in `max_rows`."""
+        self._rows -= self._conn.execute(
+            "DELETE FROM entries WHERE rowid IN (SELECT rowid FROM entries ORDER BY expires_at LIMIT ?)",
+            (self._rows - self.max_rows,)
+        ).rowcount
+
+    def revalidated(self, namespace: str, key: str, entry: CacheEntry, ttl: Optional[float] = None) -> CacheEntry:
+        """Mark a stale entry as fresh again after a 304 Not Modified response."""
+        with self._lock:
+            self._stats[namespace]["revalidated"] += 1
+        return self.set(namespace, key, entry.value, ttl=ttl, etag=entry.etag, last_modified=entry.last_modified)
+
+    def _remember(self, namespace: str, key: str, entry: CacheEntry) -> None:
+        self._memory[(namespace, key)] = entry
+        self._memory.move_to_end((namespace, key))
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        with self._lock:
+            return {namespace: dict(stats) for namespace, stats in self._stats.items()}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM entries")
+                self._rows = 0
+
+
+_tool_cache: Optional[ToolCache] = None
+_cache_disabled = False
+
+
+def get_tool_cache() -> Optional[ToolCache]:
+    """The process-wide tool cache (created on first use), or None if caching is disabled."""
+    global _tool_cache
+    if _cache_disabled:
+        return None
+    if _tool_cache is None:
+        _tool_cache = ToolCache()
+    return _tool_cache
+
+
+def set_tool_cache(cache: Optional[ToolCache]) -> None:
+    """Replace the process-wide tool cache; pass None to disable caching."""
+    global _tool_cache, _cache_disabled
+    _tool_cache = cache
+    _cache_disabled = cache is None
+
+
+def cached_tool(namespace: str, should_cache: Callable[[Any], bool] = bool, ignore: tuple[str, ...] = ()) -> Callable:
+    """
+    Cache a (sync or async) tool's results in the tool cache, keyed on its arguments.
+
+    Args:
+        namespace: Cache namespace, which also selects the TTL (see `DEFAULT_TTLS`)
+        should_cache: Results for which this returns False (e.g. errors) are not cached
+        ignore: Keyword arguments left out of the key (e.g. an HTTP session)
+    """
+    def _cache_key(args: tuple, kwargs: dict) -> str:
+        kwargs = sorted((name, value) for name, value in kwargs.items() if name not in ignore)
+        return json.dumps([args, kwargs], ensure_ascii=False, default=str)
+
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                cache = get_tool_cache()
+                if cache is None:
+                    return await func(*args, **kwargs)
+                key = _cache_key(args, kwargs)
+                value = cache.get(namespace, key)
+                annotate(tool_cache_hit=value is not None)
+                if value is not None:
+                    return value
+                value = await func(*args, **kwargs)
+                if should_cache(value):
+                    cache.set(namespace, key, value)
+                return value
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            cache = get_tool_cache()
+            if cache is None:
+                return func(*args, **kwargs)
+            key = _cache_key(args, kwargs)
+            value = cache.get(namespace, key)
+            annotate(tool_cache_hit=value is not None)
+            if value is not None:
+                return value
+            value = func(*args, **kwargs)
+            if should_cache(value):
+                cache.set(namespace, key, value)
+            return value
+        return wrapper
+
+    return decorator
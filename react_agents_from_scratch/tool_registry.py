@@ -0,0 +1,136 @@
+"""
+The agent's tools, declared with their metadata and imported on first use.
+
+Importing `tools` loads what its tools need (HTTP clients, HTML and bank holiday parsing, the
+local index, the LLM helpers). The entry points take their tools from this registry instead:
+each tool is a `ToolSpec` naming the function ("module:attribute") and its async version,
+its default arguments, the provider it calls (for rate limits) and whether it waits for the
+user. `load_tools` returns stand-ins which import the function on their first call, so a
+CLI start, a test or a worker fork only pays for the tools a run actually calls.
+
+Example:
+    tools = load_tools(asynchronous=True, search_govuk={"latency_budget": 4})
+    tools['ask_user'] = batch_ask_user
+    await arun(question, llm_brain_call, prompt_template, tools)
+"""
+import importlib
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Callable, Iterable, Optional
+
+
+@dataclass(frozen=True)
+class ToolSpec:
+    name: str
+    # "module:attribute" of the function
+    target: str
+    description: str
+    # "module:attribute" of the async version, for the async loop
+    async_target: Optional[str] = None
+    # default keyword arguments
+    kwargs: dict = field(default_factory=dict)
+    # the service called, for rate limits (see `batch_runner`)
+    provider: Optional[str] = None
+    # waits for the user's answer (see `agent_state`)
+    interactive: bool = False
+
+
+TOOLS = {spec.name: spec for spec in [
+    ToolSpec(
+        "search_govuk", "react_agents_from_scratch.tools:search_govuk",
+        "Search GOV.UK for official UK government guidance",
+        async_target="react_agents_from_scratch.tools:asearch_govuk", kwargs={"min_results": 3}, provider="google_cse",
+    ),
+    ToolSpec(
+        "search_govuk_local", "react_agents_from_scratch.tools:search_govuk_local",
+        "Search a local index of saved GOV.UK pages (an offline search_govuk)",
+        kwargs={"min_results": 3},
+    ),
+    ToolSpec(
+        "search_govuk_services", "react_agents_from_scratch.tools:search_govuk_services",
+        "Search GOV.UK services",
+        kwargs={"page": 1, "top_n_results": 6}, provider="govuk",
+    ),
+    ToolSpec(
+        "uk_bank_holidays", "react_agents_from_scratch.tools:uk_bank_holidays",
+        "Answer questions about UK bank holidays and working days",
+        provider="govuk",
+    ),
+    ToolSpec(
+        "ask_user", "react_agents_from_scratch.tools:ask_user",
+        "Ask the user a question",
+        interactive=True,
+    ),
+]}
+
+# the tools of the agent's prompt
+DEFAULT_TOOLS = ("search_govuk", "search_govuk_services", "uk_bank_holidays", "ask_user")
+
+
+def resolve(target: str) -> Callable:
+    """Import the function named by a "module:attribute" target."""
+    module_name, attribute = target.split(":")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+class LazyTool:
+    """A tool whose function is imported on its first call."""
+
+    def __init__(self, spec: ToolSpec, target: str, kwargs: dict):
+        self.spec = spec
+        self.target = target
+        self.kwargs = kwargs
+        self._func: Optional[Callable] = None
+
+    @property
+    def func(self) -> Callable:
+        if self._func is None:
+            func = resolve(self.target)
+            self._func = partial(func, **self.kwargs) if self.kwargs else func
+        return self._func
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.target!r}, {self.kwargs!r})"
+
+
+class AsyncLazyTool(LazyTool):
+    """The async version of a tool, imported on its first call."""
+
+    async def __call__(self, *args, **kwargs):
+        return await self.func(*args, **kwargs)
+
+
+def load_tool(name: str, asynchronous: bool = False, **kwargs) -> LazyTool:
+    """
+    A stand-in for a registered tool, importing it on its first call.
+
+    Args:
+        name: The tool's name in `TOOLS`
+        asynchronous: Use the tool's async version, if it has one
+        **kwargs: Keyword arguments overriding the tool's defaults
+    """
+    spec = TOOLS[name]
+    if asynchronous and spec.async_target:
+        return AsyncLazyTool(spec, spec.async_target, {**spec.kwargs, **kwargs})
+    return LazyTool(spec, spec.target, {**spec.kwargs, **kwargs})
+
+
+def load_tools(names: Iterable[str] = DEFAULT_TOOLS, asynchronous: bool = False, **tool_kwargs: dict) -> dict[str, LazyTool]:
+    """
+    The tools dictionary for the agent loop, with each tool imported on its first call.
+
+    Args:
+        names: Names of the tools in `TOOLS`
+        asynchronous: Use the async versions of the tools, for the async loop
+        **tool_kwargs: Keyword arguments overriding a tool's defaults, by tool name,
+            e.g. search_govuk={"latency_budget": 4}
+    """
+    return {name: load_tool(name, asynchronous, **tool_kwargs.get(name, {})) for name in names}
+
+
+def interactive_tools(names: Iterable[str] = DEFAULT_TOOLS) -> frozenset:
+    """The names of the tools waiting for the user's answer (see `run_react_loop`)."""
+    return frozenset(name for name in names if TOOLS[name].interactive)
@@ -1,24 +1,37 @@
-from openai import OpenAI
-import requests
 import json
-import asyncio
 import os
+import re
+import time
 import urllib.parse
-from bs4 import BeautifulSoup
+from typing import TYPE_CHECKING, Optional
 
 from dotenv import load_dotenv
 
-from react_agents_from_scratch.utils import parse_several_pages
+from react_agents_from_scratch.bank_holidays import BankHolidayCalendar, answer_bank_holiday_query
+from react_agents_from_scratch.http_client import get_async_session, get_session, request_with_retries
+from react_agents_from_scratch.local_search import get_local_index
+from react_agents_from_scratch.openai_react import call_llm
+from react_agents_from_scratch.tool_cache import DEFAULT_TTLS, cached_tool, get_tool_cache
+from react_agents_from_scratch.tracing import span
+from react_agents_from_scratch.utils import PARTIAL_CONTENT_MARKER, parse_pages_progressive, parse_several_pages, run_coroutine_sync
 from react_agents_from_scratch.utils import restructure_bankholiday_data
 
-load_dotenv(".env")
+if TYPE_CHECKING:
+    import aiohttp
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=OPENAI_API_KEY)
+# requests, aiohttp, bs4 and the OpenAI client are loaded by the tools that use them, on first use
+load_dotenv(".env")
 
 # Set up Google Search API key and engine ID
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 GOOGLE_CSE_ID = os.getenv("GOOGLE_CSE_ID")
+# endpoints, which can point to a local fixture server for offline runs (see benchmarks/bench_agent.py)
+GOOGLE_CSE_URL = os.getenv("GOOGLE_CSE_URL", "https://www.googleapis.com/customsearch/v1")
+GOVUK_BASE_URL = os.getenv("GOVUK_BASE_URL", "https://www.gov.uk")
+# stands in for the content of a result page that could not be fetched (or had no main
+# content), so that the agent can tell, and the result is not cached
+MISSING_CONTENT_MARKER = "[No content: the page could not be fetched]"
+_EMPTY_CONTENT = re.compile(r"\n Content:\s*\n URL: ")
 
 def ask_user(question: str) -> str:
     """
@@ -26,37 +39,113 @@ def ask_user(question: str) -> str:
     """
     return input(f"Agent: {question}\nUser: ")
 
-def search_govuk(query: str, min_results: int=2) -> str:
+def _page_content(content: Optional[str]) -> str:
+    # a failed fetch gives an empty page
+    return content if content and content.strip() else MISSING_CONTENT_MARKER
+
+def _format_search_results(url_title_dicts: dict[str, str], url_content_dicts: dict[str, str]) -> str:
+    # combine url, title, and content into a list of dictionaries
+    url_title_content_dicts = [{"url": url, "title": title, "content": _page_content(url_content_dicts[url])} for url, title in url_title_dicts.items()]
+    # print(f"URL title content dicts: {url_title_content_dicts}")
+    results_list = [f"Title: {_dict['title']}\n Content: {_dict['content']}\n URL: {_dict['url']}" for _dict in url_title_content_dicts]
+    # print(f"Results list: {results_list}")
+    return '\n\n'.join(results_list)
+
+def _is_search_result(result: str) -> bool:
+    # results with pages cut short by a latency budget, or not fetched at all (e.g. a network
+    # error), are not cached: the next identical query fetches them again
+    if not result or result.startswith("Google Search error"):
+        return False
+    return PARTIAL_CONTENT_MARKER not in result and MISSING_CONTENT_MARKER not in result and not _EMPTY_CONTENT.search(result)
+
+async def _parse_result_pages(urls: list[str], min_results: int, latency_budget: Optional[float], session: Optional["aiohttp.ClientSession"] = None) -> dict[str, str]:
+    if latency_budget is None:
+        return await parse_several_pages(urls[:min_results], session=session)
+    return await parse_pages_progressive(urls, target=min_results, latency_budget=latency_budget, session=session)
+
+@cached_tool("search_govuk", should_cache=_is_search_result)
+def search_govuk(query: str, min_results: int=2, latency_budget: Optional[float] = None, extra_candidates: int = 2) -> str:
     """
     Internet searches of the GOV.UK website for official UK government information return the formatted results.
+
+    With a `latency_budget` (seconds), `extra_candidates` more result pages are fetched and the
+    first `min_results` to load are kept (see `utils.parse_pages_progressive`).
     """
-    url = f"https://www.googleapis.com/customsearch/v1?key={GOOGLE_API_KEY}&cx={GOOGLE_CSE_ID}&q={query}"
-    response = requests.get(url)
+    url = f"{GOOGLE_CSE_URL}?key={GOOGLE_API_KEY}&cx={GOOGLE_CSE_ID}&q={query}"
+    with span("search.google_cse", query=query) as search_span:
+        response = get_session().get(url)
+        search_span.set(status=response.status_code)
     if response.status_code == 200:
         results = json.loads(response.text)
         if 'items' in results:
             # [{url: title}, ...]
-            url_title_dicts = {results['items'][i]['link']: results['items'][i]['title'] for i in range(min(min_results, len(results['items'])))}
+            n_candidates = min_results + extra_candidates if latency_budget is not None else min_results
+            url_title_dicts = {item['link']: item['title'] for item in results['items'][:n_candidates]}
             # parse content for each URL
-            url_content_dicts = asyncio.run(parse_several_pages(list(url_title_dicts.keys())))
-            # combine url, title, and content into a list of dictionaries
-            url_title_content_dicts = [{"url": url, "title": title, "content": url_content_dicts[url]} for url, title in url_title_dicts.items()]
-            # print(f"URL title content dicts: {url_title_content_dicts}")
-            results_list = [f"Title: {_dict['title']}\n Content: {_dict['content']}\n URL: {_dict['url']}" for _dict in url_title_content_dicts]
-            # print(f"Results list: {results_list}")
-            formatted_results = '\n\n'.join(results_list)
-
-            return formatted_results
+            url_content_dicts = run_coroutine_sync(_parse_result_pages(list(url_title_dicts.keys()), min_results, latency_budget))
+            url_title_dicts = {url: title for url, title in url_title_dicts.items() if url in url_content_dicts}
+            return _format_search_results(url_title_dicts, url_content_dicts)
         else:
             return "No results found."
     else:
         return f"Google Search error: {response.status_code}"
 
-def get_llm_response(prompt):
-    response = client.chat.completions.create(
+@cached_tool("search_govuk", should_cache=_is_search_result, ignore=("session",))
+async def asearch_govuk(query: str, min_results: int=2, session: Optional["aiohttp.ClientSession"] = None, latency_budget: Optional[float] = None, extra_candidates: int = 2) -> str:
+    """
+    Async version of `search_govuk`, for the async agent loop.
+
+    Args:
+        query: The search query
+        min_results: Number of search results to fetch and parse
+        session: aiohttp session for the search and the page fetches; the shared pooled one if None
+        latency_budget: Seconds allowed for fetching the result pages; no limit if None
+        extra_candidates: Additional result pages fetched under a latency budget, of which
+            the first `min_results` to load are kept
+    """
+    return await _asearch_govuk(query, min_results, session or get_async_session(), latency_budget, extra_candidates)
+
+async def _asearch_govuk(query: str, min_results: int, session: "aiohttp.ClientSession", latency_budget: Optional[float] = None, extra_candidates: int = 2) -> str:
+    params = {'key': GOOGLE_API_KEY, 'cx': GOOGLE_CSE_ID, 'q': query}
+    with span("search.google_cse", query=query) as search_span:
+        response = await request_with_retries(session, "GET", GOOGLE_CSE_URL, params=params)
+        search_span.set(status=response.status)
+        async with response:
+            if response.status != 200:
+                return f"Google Search error: {response.status}"
+            results = await response.json()
+
+    if 'items' in results:
+        n_candidates = min_results + extra_candidates if latency_budget is not None else min_results
+        url_title_dicts = {item['link']: item['title'] for item in results['items'][:n_candidates]}
+        url_content_dicts = await _parse_result_pages(list(url_title_dicts.keys()), min_results, latency_budget, session=session)
+        url_title_dicts = {url: title for url, title in url_title_dicts.items() if url in url_content_dicts}
+        return _format_search_results(url_title_dicts, url_content_dicts)
+    else:
+        return "No results found."
+
+def search_govuk_local(query: str, min_results: int=2) -> str:
+    """
+    Offline version of `search_govuk`: the best matching pages of a local GOV.UK index (see `local_search`).
+    """
+    index = get_local_index()
+    hits = index.search(query, top_k=min_results)
+    if not hits:
+        return "No results found."
+    documents = [index.document(doc_id) for doc_id, _ in hits]
+    url_title_dicts = {url: title for url, title, _ in documents}
+    url_content_dicts = {url: text for url, _, text in documents}
+    return _format_search_results(url_title_dicts, url_content_dicts)
+
+def get_llm_response(prompt, stream=False):
+    system_message = "you are an AI assistant for the UK Government helping users navigate official government guidance and services."
+    if stream:
+        text, _ = call_llm.stream_react_completion(call_llm.get_client(), call_llm.build_messages(prompt, system_message))
+        return text
+    response = call_llm.get_client().chat.completions.create(
         model="gpt-4o-mini",
         messages=[
-            {"role": "system", "content": "you are an AI assistant for the UK Government helping users navigate official government guidance and services."},
+            {"role": "system", "content": system_message},
             {"role": "user", "content": prompt}
         ],
         n=1,
@@ -66,6 +155,7 @@ def get_llm_response(prompt):
     return response.choices[0].message.content.strip()
 
 
+@cached_tool("search_govuk_services")
 def _search_govuk_services(query: str, page: int, top_n_results: int) -> list[dict[str, str]]:
     """
     Search GOV.UK services and return results
@@ -77,7 +167,10 @@ def _search_govuk_services(query: str, page: int, top_n_results: int) -> list[di
     Returns:
         list: List of dictionaries containing service details
     """
-    base_url = "https://www.gov.uk/search/services"
+    import requests
+    from bs4 import BeautifulSoup
+
+    base_url = f"{GOVUK_BASE_URL}/search/services"
     
     # Construct the search URL with parameters
     params = {
@@ -89,7 +182,9 @@ def _search_govuk_services(query: str, page: int, top_n_results: int) -> list[di
 
     
     try:
-        response = requests.get(url)
+        with span("search.govuk", query=query) as search_span:
+            response = get_session().get(url)
+            search_span.set(status=response.status_code)
         response.raise_for_status()
         
         soup = BeautifulSoup(response.text, 'html.parser')
@@ -102,7 +197,7 @@ def _search_govuk_services(query: str, page: int, top_n_results: int) -> list[di
             # extract title and link
             title_element = item.find('a', class_='govuk-link')
             title = title_element.text.strip() if title_element else "No title"
-            link = f"https://www.gov.uk{title_element['href']}" if title_element else None
+            link = f"{GOVUK_BASE_URL}{title_element['href']}" if title_element else None
             
             # extract description
             description_element = item.find('p', class_='gem-c-document-list__item-description')
@@ -118,7 +213,7 @@ def _search_govuk_services(query: str, page: int, top_n_results: int) -> list[di
                     sub_pages.append({
                         'title': sub_title_element.text.strip(),
                         'description': sub_desc_element.text.strip(),
-                        'link': f"https://www.gov.uk{sub_title_element['href']}"
+                        'link': f"{GOVUK_BASE_URL}{sub_title_element['href']}"
                     })
             
             results.append({
@@ -166,11 +261,22 @@ def search_govuk_services(query: str, page=1, top_n_results=5) -> str:
     return "\n".join(output)
 
 def _get_uk_bank_holidays():
-    url = "https://www.gov.uk/bank-holidays.json"
+    import requests
+
+    url = f"{GOVUK_BASE_URL}/bank-holidays.json"
+    # the data changes about once a year: serve it from the cache, revalidating once stale
+    cache = get_tool_cache()
+    entry = cache.lookup("bank_holidays", url) if cache else None
+    if entry is not None and entry.fresh:
+        return entry.value
     try:
-        response = requests.get(url)
+        response = get_session().get(url, headers=entry.revalidation_headers() if entry else {})
+        if response.status_code == 304 and entry is not None:
+            return cache.revalidated("bank_holidays", url, entry).value
         response.raise_for_status()  # raise an error for HTTP issues
         bank_holidays = response.json()
+        if cache is not None:
+            cache.set("bank_holidays", url, bank_holidays, etag=response.headers.get("ETag"), last_modified=response.headers.get("Last-Modified"))
         return bank_holidays
     except requests.exceptions.RequestException as e:
         print(f"Error fetching bank holiday data: {e}")
@@ -185,3 +291,34 @@ def get_uk_bank_holidays_formatted():
         return formatted_holidays
     else:
         return "No bank holiday data available."
+
+_bank_holiday_calendar: Optional[BankHolidayCalendar] = None
+_bank_holiday_calendar_expires_at = 0.0
+
+def get_bank_holiday_calendar() -> Optional[BankHolidayCalendar]:
+    """The bank holiday calendar, built once and rebuilt when the bank holidays data goes stale."""
+    global _bank_holiday_calendar, _bank_holiday_calendar_expires_at
+    if _bank_holiday_calendar is None or time.time() >= _bank_holiday_calendar_expires_at:
+        bank_holidays = _get_uk_bank_holidays()
+        if bank_holidays:
+            _bank_holiday_calendar = BankHolidayCalendar(bank_holidays)
+            _bank_holiday_calendar_expires_at = time.time() + DEFAULT_TTLS["bank_holidays"]
+        # otherwise keep answering from the previous calendar, if any
+    return _bank_holiday_calendar
+
+def uk_bank_holidays(query: str) -> str:
+    """
+    Answer a question about UK bank holidays: whether a date is a bank holiday, the next or
+    previous one, the bank holidays in a year or date range, or the working days between two dates.
+    """
+    calendar = get_bank_holiday_calendar()
+    if calendar is None:
+        return "No bank holiday data available."
+    return answer_bank_holiday_query(calendar, query)
+
+
+def __getattr__(name: str):
+    # the OpenAI client used to be built at import: see `call_llm.get_client`
+    if name == "client":
+        return call_llm.get_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
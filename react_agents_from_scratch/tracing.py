@@ -0,0 +1,307 @@
+"""
+Tracing of the agent loop: where the time of a run goes.
+
+Spans are recorded for each run (`react.run`), iteration (`react.iteration`), LLM call
+(`llm.call`), tool call (`tool.call`), Google search (`search.google_cse`), page fetch
+(`http.fetch`) and page parse (`page.parse`). Each span has a duration and attributes:
+prompt and completion sizes, token usage, cache hits, bytes read, errors. Spans nest through
+a context variable, so the spans of concurrent agent sessions on one event loop stay apart.
+
+Tracing is off by default, and then costs one global lookup per instrumented call. Turn it
+on with one or more exporters:
+
+    configure_tracing(JsonlExporter("traces.jsonl"))       # one JSON object per span
+    collector = InMemoryExporter()                         # e.g. in a notebook or a test
+    configure_tracing(collector)
+    configure_tracing(OpenTelemetryExporter())             # forwards to OpenTelemetry, if installed
+
+An exporter is any object with an `on_end(span)` method, and optionally `on_start(span)`.
+
+Instrumented code adds attributes to the innermost open span with `annotate`, e.g. the
+streaming LLM functions add time to first token and token usage to the `llm.call` span
+opened by the agent loop around the brain.
+"""
+import contextvars
+import inspect
+import json
+import os
+import threading
+import time
+from functools import wraps
+from typing import Any, Callable, Coroutine, Optional
+
+_exporters: tuple = ()
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("react_current_span", default=None)
+
+
+class Span:
+    """A timed operation, with attributes, nested in the span open when it started."""
+
+    __slots__ = ("name", "attributes", "trace_id", "span_id", "parent_id", "start_time", "duration", "error", "_start", "_token")
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: dict):
+        self.name = name
+        self.attributes = attributes
+        self.span_id = os.urandom(8).hex()
+        self.trace_id = parent.trace_id if parent is not None else os.urandom(16).hex()
+        self.parent_id = parent.span_id if parent is not None else None
+        # wall clock time for exporters, and a monotonic clock for the duration
+        self.start_time = time.time()
+        self.duration: Optional[float] = None
+        self.error: Optional[str] = None
+        self._start = time.perf_counter()
+        self._token = None
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def record_error(self, error: BaseException) -> None:
+        self.error = f"{type(error).__name__}: {error}"
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "duration": self.duration,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    """Stands in for a span (and its `with` block) when tracing is off."""
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        return False
+
+    def set(self, **attributes) -> None:
+        pass
+
+    def record_error(self, error: BaseException) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def configure_tracing(*exporters) -> None:
+    """Record spans and send them to `exporters`; with no exporters, turn tracing off."""
+    global _exporters
+    _exporters = tuple(exporters)
+
+
+def tracing_enabled() -> bool:
+    return bool(_exporters)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get() if _exporters else None
+
+
+def annotate(**attributes) -> None:
+    """Add attributes to the innermost open span, if tracing is on."""
+    if _exporters:
+        span = _current_span.get()
+        if span is not None:
+            span.attributes.update(attributes)
+
+
+def start_span(name: str, **attributes) -> Optional[Span]:
+    """Open a span and make it current; close it with `end_span`. Returns None when tracing is off."""
+    if not _exporters:
+        return None
+    span = Span(name, _current_span.get(), attributes)
+    span._token = _current_span.set(span)
+    for exporter in _exporters:
+        on_start = getattr(exporter, "on_start", None)
+        if on_start is not None:
+            on_start(span)
+    return span
+
+
+def end_span(span: Optional[Span], error: Optional[BaseException] = None) -> None:
+    """Close a span opened with `start_span` and export it."""
+    if span is None:
+        return
+    span.duration = time.perf_counter() - span._start
+    if error is not None:
+        span.record_error(error)
+    try:
+        _current_span.reset(span._token)
+    except ValueError:
+        # closed in another context than the one it was opened in
+        pass
+    for exporter in _exporters:
+        try:
+            exporter.on_end(span)
+        except Exception as e:
+            print(f"Trace exporter {type(exporter).__name__} failed: {e!r}")
+
+
+class _SpanBlock:
+    def __init__(self, name: str, attributes: dict):
+        self.name = name
+        self.attributes = attributes
+        self.span: Optional[Span] = None
+
+    def __enter__(self) -> Span:
+        self.span = start_span(self.name, **self.attributes)
+        return self.span
+
+    def __exit__(self, exc_type, exc, traceback) -> bool:
+        end_span(self.span, exc)
+        return False
+
+
+def span(name: str, **attributes):
+    """
+    Record the enclosed `with` block as a span (a no-op span when tracing is off).
+
+    Example:
+        with span("tool.call", tool=action_name) as tool_span:
+            observation = tool(action_input)
+            tool_span.set(observation_chars=len(observation))
+    """
+    if not _exporters:
+        return _NOOP_SPAN
+    return _SpanBlock(name, attributes)
+
+
+def traced(name: str) -> Callable:
+    """Record each call of a (sync or async) function as a span."""
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not _exporters:
+                    return await func(*args, **kwargs)
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _exporters:
+                return func(*args, **kwargs)
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def in_current_context(func: Callable) -> Callable:
+    """
+    `func` bound to the current context, for running it in another thread within the open span.
+
+    Thread pools do not carry context variables over; when tracing is off `func` is returned as it is.
+    """
+    if not _exporters:
+        return func
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(func, *args, **kwargs)
+
+
+def in_current_span(coro: Coroutine) -> Coroutine:
+    """`coro` run within the current span, for running it on another event loop (see `utils.run_coroutine_sync`)."""
+    if not _exporters:
+        return coro
+    parent = _current_span.get()
+
+    async def run():
+        token = _current_span.set(parent)
+        try:
+            return await coro
+        finally:
+            _current_span.reset(token)
+
+    return run()
+
+
+class InMemoryExporter:
+    """Keep finished spans in a list, e.g. to inspect a run in a notebook or a test."""
+
+    def __init__(self):
+        self.spans: list[Span] = []
+        self._lock = threading.Lock()
+
+    def on_end(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def find(self, name: str) -> list[Span]:
+        """The finished spans called `name`, in the order they ended."""
+        with self._lock:
+            return [span for span in self.spans if span.name == name]
+
+    def clear(self) -> None:
+        with self._lock:
+            self.spans.clear()
+
+
+class JsonlExporter:
+    """Append each finished span to a JSONL file, as `Span.to_dict()`."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def on_end(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+class OpenTelemetryExporter:
+    """
+    Forward spans to OpenTelemetry (`pip install opentelemetry-api opentelemetry-sdk`), keeping
+    their nesting, so they can go to any OpenTelemetry backend (Jaeger, Honeycomb, ...).
+    """
+
+    def __init__(self, tracer: Any = None):
+        """
+        Args:
+            tracer: An OpenTelemetry tracer; the global tracer provider's one if None
+        """
+        try:
+            from opentelemetry import trace
+        except ImportError as e:
+            raise ImportError("OpenTelemetryExporter needs the opentelemetry-api package") from e
+        self._trace = trace
+        self.tracer = tracer or trace.get_tracer("react_agents_from_scratch")
+        self._open: dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def on_start(self, span: Span) -> None:
+        with self._lock:
+            parent = self._open.get(span.parent_id)
+        context = self._trace.set_span_in_context(parent) if parent is not None else None
+        otel_span = self.tracer.start_span(span.name, context=context, start_time=int(span.start_time * 1e9))
+        with self._lock:
+            self._open[span.span_id] = otel_span
+
+    def on_end(self, span: Span) -> None:
+        with self._lock:
+            otel_span = self._open.pop(span.span_id, None)
+        if otel_span is None:
+            return
+        for key, value in span.attributes.items():
+            # OpenTelemetry attributes are scalars (or lists of them), never None
+            if value is None:
+                continue
+            otel_span.set_attribute(key, value if isinstance(value, (str, bool, int, float)) else json.dumps(value, default=str))
+        if span.error:
+            otel_span.set_status(self._trace.Status(self._trace.StatusCode.ERROR, span.error))
+        otel_span.end(end_time=int((span.start_time + span.duration) * 1e9))
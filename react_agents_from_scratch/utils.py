@@ -1,60 +1,379 @@
-import requests
-from bs4 import BeautifulSoup
-from collections import defaultdict
-import aiohttp
+from collections import defaultdict, deque
 import asyncio
+import atexit
+import inspect
 import re
+import threading
+import time
+from functools import partial
+from typing import TYPE_CHECKING, Any, Callable, Coroutine, Optional
 
+from react_agents_from_scratch.html_extract import MainEndScanner, extract_main_text
+from react_agents_from_scratch.http_client import close_async_session, get_async_session, get_session, request_with_retries
+from react_agents_from_scratch.parse_executor import parse_off_loop
+from react_agents_from_scratch.tool_cache import ToolCache, get_tool_cache
+from react_agents_from_scratch.tracing import annotate, in_current_span, span, traced
 
-def get_and_parse_page_content(page_url):
-    response = requests.get(page_url)
-    if response.status_code == 200:
+if TYPE_CHECKING:
+    import aiohttp
+
+
+# hard cap on the bytes read per page: the rest of a larger page is never downloaded
+MAX_PAGE_BYTES = 2 * 1024 * 1024
+READ_CHUNK_SIZE = 64 * 1024
+# once reading stops early (after `</main>`), the rest of the page is read and discarded if it
+# is at most this long, so that the keep-alive connection goes back to the pool; a longer rest
+# (or one not read within DRAIN_TIMEOUT seconds) closes the connection instead
+DRAIN_MAX_BYTES = 64 * 1024
+DRAIN_TIMEOUT = 1.0
+
+_fetch_stats_lock = threading.Lock()
+_fetch_stats = {"fetches": 0, "bytes_read": 0, "stopped_after_main": 0, "capped": 0, "drained": 0, "closed_early": 0}
+# most recent fetches: {"url", "bytes_read", "content_length", "stopped_after_main", "capped"}
+_recent_fetches: deque = deque(maxlen=1000)
+
+
+class _PageBody:
+    """The body of a page read so far: reading stops after `</main>` or at `max_bytes`."""
+
+    def __init__(self, url: str, content_length: Optional[int] = None, max_bytes: int = MAX_PAGE_BYTES):
+        self.url = url
+        self.content_length = content_length
+        self.max_bytes = max_bytes
+        self.chunks: list[bytes] = []
+        self.bytes_read = 0
+        self.stopped_after_main = False
+        self.capped = False
+        self._scanner = MainEndScanner()
+
+    def add(self, chunk: bytes) -> bool:
+        """Add the next chunk; return True once nothing more needs to be read."""
+        chunk = chunk[:self.max_bytes - self.bytes_read]
+        self.chunks.append(chunk)
+        self.bytes_read += len(chunk)
+        if self._scanner.feed(chunk):
+            self.stopped_after_main = True
+            return True
+        if self.bytes_read >= self.max_bytes:
+            self.capped = True
+            return True
+        return False
 
-        soup = BeautifulSoup(response.text, 'html.parser')
+    def worth_draining(self, content_encoding: Optional[str]) -> bool:
+        """Whether the rest of the page may be short enough to drain (see `DRAIN_MAX_BYTES`)."""
+        if self.capped:
+            return False
+        # Content-Length counts the compressed bytes: only an uncompressed rest can be told up front
+        if self.content_length is None or content_encoding:
+            return True
+        return self.content_length - self.bytes_read <= DRAIN_MAX_BYTES
 
-        # extract the main content
-        main_content = soup.find('main')
+    def html(self, encoding: Optional[str]) -> str:
+        return b"".join(self.chunks).decode(encoding or "utf-8", errors="replace")
+
+    def record(self, drained: Optional[bool] = None) -> None:
+        """Record the fetch; `drained` tells whether a body read in part was drained (True) or its connection closed (False)."""
+        annotate(bytes_read=self.bytes_read, content_length=self.content_length, stopped_after_main=self.stopped_after_main, capped=self.capped, drained=drained)
+        if self.capped:
+            print(f"Page {self.url} is larger than {self.max_bytes} bytes, only the start was read.")
+        with _fetch_stats_lock:
+            _fetch_stats["fetches"] += 1
+            _fetch_stats["bytes_read"] += self.bytes_read
+            _fetch_stats["stopped_after_main"] += self.stopped_after_main
+            _fetch_stats["capped"] += self.capped
+            _fetch_stats["drained"] += drained is True
+            _fetch_stats["closed_early"] += drained is False
+            _recent_fetches.append({
+                "url": self.url,
+                "bytes_read": self.bytes_read,
+                "content_length": self.content_length,
+                "stopped_after_main": self.stopped_after_main,
+                "capped": self.capped,
+            })
+
+
+def fetch_stats() -> dict:
+    """Page fetch statistics: bytes read, fetches stopped after `</main>` or at the size cap, recent fetches."""
+    with _fetch_stats_lock:
+        fetches = _fetch_stats["fetches"]
+        return {
+            **_fetch_stats,
+            "mean_bytes_read": _fetch_stats["bytes_read"] / fetches if fetches else 0.0,
+            "recent_fetches": list(_recent_fetches),
+        }
+
+
+def _store_page(cache: Optional[ToolCache], url: str, text: str, headers) -> None:
+    if cache is not None and text:
+        cache.set("page", url, text, etag=headers.get("ETag"), last_modified=headers.get("Last-Modified"))
+
+
+@traced("http.fetch")
+def get_and_parse_page_content(page_url):
+    annotate(url=page_url)
+    cache = get_tool_cache()
+    entry = cache.lookup("page", page_url) if cache else None
+    if entry is not None and entry.fresh:
+        annotate(page_cache="fresh")
+        return entry.value
 
-        # clean and print the text
-        if main_content:
-            return main_content.get_text(separator=' ', strip=True)
-        else:
-            print("Main content not found.")
+    # stream the body, to stop reading once the main content is complete
+    with get_session().get(page_url, headers=entry.revalidation_headers() if entry else {}, stream=True) as response:
+        annotate(status=response.status_code)
+        if response.status_code == 304 and entry is not None:
+            annotate(page_cache="revalidated")
+            return cache.revalidated("page", page_url, entry).value
+        if response.status_code != 200:
+            print(f"Failed to fetch page, status code: {response.status_code}")
             return ""
+        content_length = response.headers.get("Content-Length")
+        body = _PageBody(page_url, int(content_length) if content_length else None)
+        drained = None
+        for chunk in response.iter_content(READ_CHUNK_SIZE):
+            if body.add(chunk):
+                # stopped early: read the (short) rest so that the connection can be reused;
+                # otherwise it is closed when the response is
+                drained = _drain_sync(response, body)
+                break
+        body.record(drained)
+        html = body.html(response.encoding)
+
+    with span("page.parse", url=page_url, bytes=len(html)):
+        main_text = extract_main_text(html)
+    if main_text is not None:
+        _store_page(cache, page_url, main_text, response.headers)
+        return main_text
     else:
-        print(f"Failed to fetch page, status code: {response.status_code}")
+        print("Main content not found.")
         return ""
 
-# target_url = "https://www.gov.uk/register-for-self-assessment"
+# target_url = "https://www.gov.uk/register-for-self-assessment"
 # get_and_parse_page_content(target_url)
 
-async def fetch_and_parse(session: aiohttp.ClientSession, url: str) -> str:
-    async with session.get(url) as response:
-        if response.status == 200:
-            html = await response.text()
-            soup = BeautifulSoup(html, 'html.parser')
+# marks page text cut short by a latency budget, so the agent (and the caches) can tell
+PARTIAL_CONTENT_MARKER = "[Partial content"
+# time allowed after the deadline for fetches to parse what they have received
+DEADLINE_GRACE = 0.5
 
-            # Extract the main content
-            main_content = soup.find('main')
 
-            # Clean and return the text
-            if main_content:
-                return main_content.get_text(separator=' ', strip=True)
-            else:
-                print(f"Main content not found for {url}.")
-                return ""
-        else:
+def _partial_content_note(latency_budget: float) -> str:
+    return f"{PARTIAL_CONTENT_MARKER}: the page did not finish loading within the {latency_budget:g}s latency budget]"
+
+
+def _drain_sync(response, body: _PageBody) -> bool:
+    """Read and discard the rest of a page read in part; True if it ended within `DRAIN_MAX_BYTES` and `DRAIN_TIMEOUT`."""
+    if not body.worth_draining(response.headers.get("Content-Encoding")):
+        return False
+    start = time.perf_counter()
+    drained = 0
+    for chunk in response.iter_content(READ_CHUNK_SIZE):
+        drained += len(chunk)
+        if drained > DRAIN_MAX_BYTES or time.perf_counter() - start > DRAIN_TIMEOUT:
+            return False
+    return True
+
+
+async def _drain(response: "aiohttp.ClientResponse", body: _PageBody, timeout: float) -> bool:
+    """Async version of `_drain_sync`, giving up after `timeout` seconds."""
+    if not body.worth_draining(response.headers.get("Content-Encoding")) or timeout <= 0:
+        return False
+
+    async def read_rest() -> None:
+        drained = 0
+        async for chunk in response.content.iter_chunked(READ_CHUNK_SIZE):
+            drained += len(chunk)
+            if drained > DRAIN_MAX_BYTES:
+                return
+
+    try:
+        await asyncio.wait_for(read_rest(), timeout)
+    except asyncio.TimeoutError:
+        return False
+    return response.content.at_eof()
+
+
+async def _read_body(response: "aiohttp.ClientResponse", body: _PageBody) -> None:
+    async for chunk in response.content.iter_chunked(READ_CHUNK_SIZE):
+        if body.add(chunk):
+            break
+
+
+@traced("http.fetch")
+async def _fetch_page(session: "aiohttp.ClientSession", url: str, deadline: Optional[float] = None, latency_budget: Optional[float] = None) -> tuple[str, bool]:
+    # returns the page text and whether the whole page was received before the deadline (event loop time)
+    annotate(url=url)
+    cache = get_tool_cache()
+    entry = cache.lookup("page", url) if cache else None
+    if entry is not None and entry.fresh:
+        annotate(page_cache="fresh")
+        return entry.value, True
+
+    import aiohttp
+    loop = asyncio.get_running_loop()
+    try:
+        request = request_with_retries(session, "GET", url, headers=entry.revalidation_headers() if entry else {})
+        response = await (request if deadline is None else asyncio.wait_for(request, deadline - loop.time()))
+    except asyncio.TimeoutError:
+        if deadline is not None and loop.time() >= deadline:
+            print(f"No response from {url} within the latency budget.")
+            annotate(complete=False)
+            return "", False
+        print(f"Failed to fetch {url}: timed out")
+        return "", True
+    except aiohttp.ClientError as e:
+        print(f"Failed to fetch {url}: {e!r}")
+        return "", True
+    async with response:
+        annotate(status=response.status)
+        if response.status == 304 and entry is not None:
+            annotate(page_cache="revalidated")
+            return cache.revalidated("page", url, entry).value, True
+        if response.status != 200:
             print(f"Failed to fetch {url}, status code: {response.status}")
-            return ""
+            return "", True
+
+        body = _PageBody(url, response.content_length)
+        complete = True
+        try:
+            if deadline is None:
+                await _read_body(response, body)
+            else:
+                await asyncio.wait_for(_read_body(response, body), deadline - loop.time())
+        except asyncio.TimeoutError:
+            complete = False
+        annotate(complete=complete)
+        drained = None
+        if not response.content.at_eof():
+            # stopped early: read the (short) rest so that the keep-alive connection goes back to
+            # the pool; drop the connection if the rest is long or the budget has run out
+            drain_timeout = DRAIN_TIMEOUT if deadline is None else min(DRAIN_TIMEOUT, deadline - loop.time())
+            drained = complete and await _drain(response, body, drain_timeout)
+            if not drained:
+                response.close()
+        body.record(drained)
+        html = body.html(response.charset)
+
+    # parse off the event loop, so other fetches carry on meanwhile
+    main_text = await parse_off_loop(html, url)
+
+    # Clean and return the text
+    if main_text is None:
+        print(f"Main content not found for {url}.")
+        return "", complete
+    if not complete:
+        # never cache a truncated page
+        return f"{_partial_content_note(latency_budget)}\n{main_text}" if main_text else "", False
+    _store_page(cache, url, main_text, response.headers)
+    return main_text, True
+
+
+async def fetch_and_parse(session: "aiohttp.ClientSession", url: str) -> str:
+    # fresh pages come from the cache; stale ones are revalidated with their ETag / Last-Modified
+    text, _ = await _fetch_page(session, url)
+    return text
+
+async def parse_several_pages(urls: list[str], session: Optional["aiohttp.ClientSession"] = None) -> dict[str, str]:
+    # reuse the pooled keep-alive session of the running event loop
+    session = session or get_async_session()
+    tasks = [fetch_and_parse(session, url) for url in urls]
+    results = await asyncio.gather(*tasks)
+
+    # for url, content in zip(urls, results):
+    #     print(f"\nContent from {url}:\n{content}\n")
+    return dict(zip(urls, results))
+
+async def parse_pages_progressive(urls: list[str], target: int, latency_budget: float, session: Optional["aiohttp.ClientSession"] = None) -> dict[str, str]:
+    """
+    Fetch and parse pages under a latency budget, keeping the first `target` pages to finish.
+
+    All `urls` (typically a few more candidates than `target`) are fetched concurrently;
+    once `target` pages have been fully received, the other fetches are cancelled. Pages
+    still loading when the budget runs out fill any remaining places with the text received
+    so far, prefixed with a "[Partial content: ...]" note.
+
+    Args:
+        urls: Candidate page URLs, in order of preference
+        target: Number of pages wanted
+        latency_budget: Seconds allowed for fetching and parsing
+        session: aiohttp session for the fetches; the shared pooled one if None
+
+    Returns:
+        dict[str, str]: Up to `target` URLs and their text, in the order of `urls`
+    """
+    session = session or get_async_session()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + latency_budget
+    tasks = {asyncio.ensure_future(_fetch_page(session, url, deadline, latency_budget)): url for url in urls}
+    complete, partial_pages = {}, {}
+    pending = set(tasks)
+    try:
+        while pending and len(complete) < target:
+            timeout = max(deadline - loop.time(), 0) + DEADLINE_GRACE
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break
+            for task in done:
+                text, finished = task.result()
+                if text:
+                    (complete if finished else partial_pages)[tasks[task]] = text
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    kept = list(complete)[:target]
+    kept += list(partial_pages)[:target - len(kept)]
+    return {url: complete.get(url) or partial_pages[url] for url in urls if url in kept}
+
+
+_background_loop: Optional[asyncio.AbstractEventLoop] = None
+_background_loop_lock = threading.Lock()
+
+
+def _get_background_loop() -> asyncio.AbstractEventLoop:
+    global _background_loop
+    with _background_loop_lock:
+        if _background_loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="react-agents-event-loop", daemon=True).start()
+            atexit.register(_close_background_loop, loop)
+            _background_loop = loop
+    return _background_loop
+
+
+def _close_background_loop(loop: asyncio.AbstractEventLoop) -> None:
+    # close the loop's pooled HTTP session cleanly before the interpreter exits
+    try:
+        asyncio.run_coroutine_threadsafe(close_async_session(), loop).result(timeout=5)
+    except Exception:
+        pass
+    loop.call_soon_threadsafe(loop.stop)
+
+
+def run_coroutine_sync(coro: Coroutine) -> Any:
+    """
+    Run a coroutine to completion from synchronous code.
+
+    The coroutine runs on a long-lived event loop in a background thread, shared by all
+    sync callers. This works even when the calling thread already runs an event loop
+    (Streamlit, Jupyter, async servers), where `asyncio.run` fails, and lets the pooled
+    aiohttp session of that loop be reused across calls.
+    """
+    loop = _get_background_loop()
+    try:
+        running_loop = asyncio.get_running_loop()
+    except RuntimeError:
+        running_loop = None
+    if running_loop is loop:
+        raise RuntimeError("run_coroutine_sync cannot be called from the background event loop; await the coroutine instead")
+    return asyncio.run_coroutine_threadsafe(in_current_span(coro), loop).result()
+
 
-async def parse_several_pages(urls: list[str]) -> list[dict[str, str]]:
-    async with aiohttp.ClientSession() as session:
-        tasks = [fetch_and_parse(session, url) for url in urls]
-        results = await asyncio.gather(*tasks)
-        
-        # for url, content in zip(urls, results):
-        #     print(f"\nContent from {url}:\n{content}\n")
-        return dict(zip(urls, results))
+def is_async_callable(func: Callable) -> bool:
+    """Whether calling `func` returns an awaitable (coroutine functions, partials and callable objects)."""
+    while isinstance(func, partial):
+        func = func.func
+    return inspect.iscoroutinefunction(func) or inspect.iscoroutinefunction(getattr(func, "__call__", None))
 
 
 def restructure_bankholiday_data(data: list[dict[str, str]]) -> list[dict[str, dict[str, str]]]:
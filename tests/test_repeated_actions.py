@@ -0,0 +1,44 @@
+"""
+Repeat detection of `repeated_actions`: the same action written differently is a repeat,
+a different question is not.
+
+Run with `python -m pytest tests`.
+"""
+from react_agents_from_scratch.repeated_actions import ActionMemo, normalise_action
+
+
+def _run(memo: ActionMemo, step: int, action_input: str) -> dict:
+    react_step = {"action": "search_govuk", "action_input": action_input}
+    if not memo.reuse(react_step, step):
+        react_step["observation"] = f"results for {action_input}"
+        memo.record(react_step, step)
+    return react_step
+
+
+def test_case_punctuation_and_spacing_are_folded():
+    assert normalise_action("search_govuk", "Register for Self-Assessment?") == normalise_action("Search_GOVUK ", "register  for self assessment")
+
+
+def test_distinct_questions_are_not_merged():
+    questions = ["what is universal credit", "who is universal credit for", "universal credit", "how do I apply for universal credit"]
+    assert len({normalise_action("search_govuk", question) for question in questions}) == len(questions)
+
+    memo = ActionMemo(max_repeats=1, escalation="stop")
+    steps = [_run(memo, step, question) for step, question in enumerate(questions, start=1)]
+    assert [step["observation"] for step in steps] == [f"results for {question}" for question in questions]
+    assert memo.repeats == 0 and not memo.stopped
+
+
+def test_repeat_reuses_the_observation():
+    memo = ActionMemo(escalation=None)
+    _run(memo, 1, "What is Universal Credit?")
+    step = _run(memo, 2, "what is universal credit")
+    assert step["observation"].endswith("results for What is Universal Credit?")
+    assert memo.repeats == 1
+
+
+if __name__ == "__main__":
+    test_case_punctuation_and_spacing_are_folded()
+    test_distinct_questions_are_not_merged()
+    test_repeat_reuses_the_observation()
+    print("ok")
@@ -0,0 +1,102 @@
+"""
+Speculative tool calls on a streamed step ended by the API's stop sequence.
+
+The API ends a ReAct step on "\nObservation" (`REACT_STOP_SEQUENCES`) and never streams the stop
+sequence itself, so the Action Input line of a streamed step has no trailing newline. These
+tests stream such a step through `StreamingLLMBrain` with a fake OpenAI client.
+
+Run with `python -m pytest tests`.
+"""
+import time
+from types import SimpleNamespace
+
+from react_agents_from_scratch.openai_react.call_llm import REACT_STOP_SEQUENCES, StreamingLLMBrain
+from react_agents_from_scratch.react_parser import ReactOutputParser, parse_react_output
+from react_agents_from_scratch.speculation import SpeculativeActions
+
+COMPLETION = (
+    "Thought: I need to find how to register for Self Assessment.\n"
+    "Action: search_govuk\n"
+    "Action Input: register for self assessment\n"
+    "Observation: the model goes on to invent an observation"
+)
+# time between the end of the step and the usage chunk that closes the stream
+USAGE_DELAY = 0.2
+
+
+def apply_stop_sequences(text: str, stop: list[str]) -> str:
+    """The completion as the API returns it: cut before the first stop sequence."""
+    positions = [text.find(sequence) for sequence in stop if sequence in text]
+    return text[:min(positions)] if positions else text
+
+
+def chunk(content=None, finish_reason=None, usage=None):
+    choices = [] if usage is not None else [SimpleNamespace(delta=SimpleNamespace(content=content), finish_reason=finish_reason)]
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+class FakeStream:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def __iter__(self):
+        return self.chunks
+
+    def close(self):
+        pass
+
+
+class FakeClient:
+    """Streams `completion`, cut by the request's stop sequences, a few characters at a time."""
+
+    def __init__(self, completion: str):
+        self.completion = completion
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, stop=None, **kwargs):
+        return FakeStream(self._chunks(apply_stop_sequences(self.completion, stop or [])))
+
+    def _chunks(self, text):
+        for start in range(0, len(text), 7):
+            yield chunk(text[start:start + 7])
+        yield chunk("", finish_reason="stop")
+        time.sleep(USAGE_DELAY)
+        yield chunk(usage=SimpleNamespace(prompt_tokens=100, completion_tokens=20, total_tokens=120, prompt_tokens_details=None))
+
+
+def test_stop_sequence_swallows_the_newline():
+    text = apply_stop_sequences(COMPLETION, REACT_STOP_SEQUENCES)
+    assert text.endswith("Action Input: register for self assessment")
+    parser = ReactOutputParser()
+    parser.feed(text)
+    assert parser.early_action() is None
+    assert parser.early_action(complete=True) == ("search_govuk", "register for self assessment")
+
+
+def test_speculation_starts_when_the_stream_stops():
+    calls = []
+
+    def search_govuk(query):
+        calls.append((query, time.perf_counter()))
+        return f"results for {query}"
+
+    speculation = SpeculativeActions({"search_govuk": search_govuk})
+    brain = StreamingLLMBrain(FakeClient(COMPLETION), speculation=speculation)
+    text = brain("prompt")
+    timings = brain.timings[0]
+
+    # the tool was started at the stop, before the usage chunk ended the stream
+    assert timings["time_to_speculation"] is not None
+    assert timings["time_to_speculation"] < timings["total_time"] - USAGE_DELAY / 2
+
+    react_step = parse_react_output(text)
+    assert speculation.claim(react_step)
+    assert react_step["observation"] == "results for register for self assessment"
+    assert [query for query, _ in calls] == ["register for self assessment"]
+    assert speculation.steps[-1]["used"]
+
+
+if __name__ == "__main__":
+    test_stop_sequence_swallows_the_newline()
+    test_speculation_starts_when_the_stream_stops()
+    print("ok")